@@ -1,19 +1,53 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, render_template, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.local import LocalProxy
+import click
+import asyncio
+import base64
+import bisect
+import contextvars
+import cProfile
+import hashlib
+import heapq
+import io
+import itertools
 import json
+import logging
+import math
+import marshal
+import mmap
 import os
+import pstats
+import queue
+import re
+import sqlite3
+import struct
+import subprocess
+import sys
+import tempfile
+import urllib.request
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-import schedule
 import time
 import threading
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from dateutil import parser
+from dateutil import parser, tz
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, YEARLY, rrule, rruleset, rrulestr
 import uuid
+from array import array
+from dateutil.relativedelta import relativedelta
 
-app = Flask(__name__)
-CORS(app)
+try:
+    import fcntl
+except ImportError:  # Windows: single_process is ignored and every process runs reminders
+    fcntl = None
+
+api = Blueprint('api', __name__, cli_group=None)
 
 # Configuration
 EVENTS_FILE = 'events.json'
@@ -21,240 +55,4122 @@ EMAIL_CONFIG = {
     'smtp_server': 'smtp.gmail.com',
     'smtp_port': 587,
     'sender_email': 'your-email@gmail.com',  # Update with your email
-    'sender_password': 'your-app-password'   # Update with your app password
+    'sender_password': 'your-app-password',  # Update with your app password
+    'transport': 'smtp',        # 'smtp', or 'local' to keep messages in LOCAL_OUTBOX
+    'workers': 4,               # delivery threads
+    'pool_size': 4,             # persistent authenticated connections shared by the workers
+    'queue_size': 1000,         # messages waiting beyond this are dropped
+    'rate_per_minute': 120,     # sending limit across all workers
+    'max_retries': 3,
+    'retry_backoff': 2.0        # seconds, doubled on each retry
+}
+EVENT_FIELDS = ('id', 'title', 'description', 'start_time', 'end_time', 'recurring', 'exceptions',
+                'recurrence_end', 'reminders', 'recipients', 'timezone', 'created_at')
+EVENT_ARGUMENTS = ('title', 'description', 'start_time', 'end_time', 'recurring', 'reminders', 'exceptions',
+                   'recurrence_end', 'recipients', 'timezone')  # the fields a client may set when creating an event
+RECURRENCE_FIELDS = ('start_time', 'end_time', 'recurring', 'exceptions', 'recurrence_end', 'timezone')
+TIME_FIELDS = ('start_time', 'end_time', 'exceptions', 'recurrence_end', 'timezone')  # normalized together on write
+DEFAULT_PAGE_SIZE = 100
+RECURRENCE_PRESETS = {'daily': DAILY, 'weekly': WEEKLY, 'monthly': MONTHLY, 'yearly': YEARLY}
+RECURRENCE_CACHE_SIZE = 100000  # memoized day-sized expansion windows
+MERGE_INSORT_MAX = 32  # batches smaller than this are insorted into the time and interval indexes one by one
+MERGE_SORT_RATIO = 16  # batches of at least 1/16 of an index are appended and sorted rather than merged
+RECURRENCE_CONFLICT_HORIZON = 365 * 86400  # how far ahead a new recurring event is checked for conflicts
+STATS_MAX_BUCKETS = 100000  # periods (or hours, for busiest hours) one /api/stats request may cover
+STATS_PERIODS = {'day': relativedelta(days=1), 'week': relativedelta(weeks=1), 'month': relativedelta(months=1)}
+CHANGE_FEED_SIZE = 10000  # recent changes kept for /api/events/changes and the SSE stream
+CHANGES_MAX_WAIT = 30  # longest a /api/events/changes?wait= long poll is held open, in seconds
+STREAM_KEEPALIVE = 15  # seconds between keep-alive comments on an idle SSE stream
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+CHANGE_WAIT_PATHS = ('/api/events/changes', '/api/events/stream')  # idle waiters, exempt from max_concurrent
+ICS_PRODID = '-//Event Scheduler//EN'
+REMINDER_CONFIG = {
+    'default_offsets': [60],  # minutes before start, for events without their own 'reminders'
+    'enabled': os.environ.get('REMINDERS_ENABLED', '1') != '0',  # run the reminder loop in this process
+    'single_process': False,  # only the process holding events.json.reminders.lock runs reminders
+    'actions': [              # run in the background for every reminder sent; types are in ACTION_TYPES
+        {'type': 'log'},
+        # {'type': 'email'},
+        # {'type': 'webhook', 'url': 'https://example.com/hooks/reminders', 'timeout': 5},
+        # {'type': 'command', 'args': ['notify-send', 'Reminder'], 'timeout': 10}
+    ]
+}
+ACTION_CONFIG = {
+    'workers': 4,               # threads per action, so a slow target only holds up its own reminders
+    'queue_size': 1000,         # jobs waiting per action; more are parked in the retry queue
+    'timeout': 10,              # seconds per attempt, unless the action sets its own
+    'max_retries': 5,           # attempts after the first; jobs still failing go to events.json.deadletter
+    'retry_backoff': 2.0        # seconds, doubled on each retry
+}
+CALENDAR_CONFIG = {
+    'header': 'X-Calendar',       # request header naming the calendar; ?calendar= works too
+    'default': 'default',         # calendar of requests that name none, stored in events.json itself
+    'directory': 'calendars',     # other calendars get calendars/<name>/events.json next to events.json
+    'max_events': None,           # per calendar; creating more fails with 403 (None for no limit)
+    'requests_per_second': None,  # per calendar, as a token bucket; excess /api/events requests get 429
+    'max_concurrent': 16          # /api/events requests of one calendar handled at once; excess get 429
+}
+CALENDAR_SETTINGS = ('recipients', 'max_events', 'requests_per_second', 'max_concurrent')
+CALENDAR_NAME_RE = re.compile(r'[A-Za-z0-9][A-Za-z0-9_-]{0,63}')
+SNAPSHOT_MAGIC = b'EVSNAP03'
+SNAPSHOT_LEGACY_FIELDS = {  # row positions of the fields older snapshots lack, padded with None in order
+    b'EVSNAP01': (9, 10),   # written before events had recipients and a timezone
+    b'EVSNAP02': (10,)      # written before events had a timezone
+}
+SNAPSHOT_HEADER = struct.Struct('<8sII')  # magic, marshal format version, event count
+STORAGE_CONFIG = {
+    'backend': 'json',          # 'json' keeps events in memory and events.json, 'sqlite' uses an indexed database
+    'sqlite_file': None,        # defaults to events.db next to the events file
+    'mode': 'json',             # 'json' rewrites events.json per change, 'wal' appends to events.json.wal
+    'fsync_batch_size': 64,     # fsync the log after this many records...
+    'fsync_interval': 0.05,     # ...or after this many seconds, whichever comes first
+    'compact_interval': 300,    # seconds between background compactions of the log
+    'compact_threshold': 10000, # compact early once the log holds this many records
+    'snapshot': 'json',         # 'binary' keeps the snapshot in events.json.bin, loaded via mmap
+    'shared': False,            # sqlite only: several processes serve one database, syncing via its change log
+    'sync_interval': 0.5,       # seconds between polls of the shared change log (None: only on requests)
+    'lease_ttl': 10             # seconds the reminder lease of a shared database lasts unless renewed
+}
+CACHE_CONFIG = {
+    'enabled': True,            # cache serialized /api/events, /upcoming and /search responses
+    'max_entries': 1024,
+    'max_bytes': 64 * 1024 * 1024
+}
+LOG_CONFIG = {
+    'level': os.environ.get('LOG_LEVEL', 'INFO'),
+    'format': os.environ.get('LOG_FORMAT', 'text')  # 'text', or 'json' for one JSON object per line
+}
+ASGI_CONFIG = {
+    'threads': 32               # worker threads running Flask views (and so store access) for asgi_app
+}
+PROFILE_CONFIG = {
+    'enabled': os.environ.get('PROFILING') == '1',  # honour X-Profile / ?profile=1 on requests
+    'sort': 'cumulative',
+    'limit': 30                                      # functions listed in the summary
+}
+HISTOGRAM_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+logger = logging.getLogger('event_scheduler')
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as 'time level message key=value...' or as one JSON object per line.
+
+    Fields passed through extra= become the key/value pairs, so call sites log
+    a short message plus the ids and numbers worth filtering on.
+    """
+
+    RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in self.RESERVED}
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if self.json_lines:
+            return json.dumps(entry, default=str)
+        line = ' '.join([entry['time'], f"{record.levelname:<7}", entry['message']] +
+                        [f'{key}={value}' for key, value in fields.items()])
+        if record.exc_info:
+            line += '\n' + entry['exception']
+        return line
+
+
+def configure_logging():
+    """Attach a structured handler to the app logger, once"""
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(json_lines=LOG_CONFIG['format'] == 'json'))
+    logger.addHandler(handler)
+    logger.setLevel(LOG_CONFIG['level'])
+    logger.propagate = False
+
+
+class Metric:
+    """A named metric with label names, rendered in the Prometheus text format"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}  # label values -> value
+        self.lock = threading.Lock()
+
+    def _labels(self, label_values, extra=()):
+        pairs = list(zip(self.labels, label_values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+    def samples(self):
+        with self.lock:
+            return [(self.name + self._labels(labels), value) for labels, value in sorted(self.values.items())]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(f'{name} {format_value(value)}' for name, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, *label_values):
+        with self.lock:
+            self.values[label_values] = value
+        return self
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=HISTOGRAM_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            state = self.values.get(label_values)
+            if state is None:
+                state = self.values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            # Per-bucket counts; rendering makes them cumulative
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f'{self.name}_bucket' + self._labels(labels, [('le', format_value(bound))]),
+                                    cumulative))
+                samples.append((f'{self.name}_bucket' + self._labels(labels, [('le', '+Inf')]), count))
+                samples.append((f'{self.name}_sum' + self._labels(labels), total))
+                samples.append((f'{self.name}_count' + self._labels(labels), count))
+        return samples
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered together by /api/metrics"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, extra=()):
+        lines = []
+        for metric in list(self.metrics) + list(extra):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+REQUEST_LATENCY = metrics.register(Histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by route', ('method', 'route')))
+REQUESTS = metrics.register(Counter(
+    'http_requests_total', 'Requests handled, by route and status', ('method', 'route', 'status')))
+SNAPSHOT_WRITE = metrics.register(Histogram(
+    'store_snapshot_write_seconds', 'Time to write a full snapshot of the JSON store', ('format',)))
+LOG_FSYNC = metrics.register(Histogram(
+    'store_log_fsync_seconds', 'Time to fsync a batch of write-ahead log records'))
+COMPACTION = metrics.register(Histogram(
+    'store_compaction_seconds', 'Time to fold the write-ahead log into a snapshot'))
+REMINDER_LAG = metrics.register(Histogram(
+    'reminder_lag_seconds', 'Actual minus scheduled reminder fire time',
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 60, 300)))
+REMINDERS_SENT = metrics.register(Counter('reminders_sent_total', 'Reminders delivered'))
+EMAIL_SEND = metrics.register(Histogram(
+    'email_send_seconds', 'Time to hand one message to the mail server'))
+ACTION_RUN = metrics.register(Histogram(
+    'reminder_action_seconds', 'Time to run one reminder action attempt', ('action',)))
+ACTIONS = metrics.register(Counter(
+    'reminder_actions_total', 'Reminder action attempts, by outcome', ('action', 'outcome')))
+
+
+@contextmanager
+def atomic_file(path, mode='w'):
+    """Yield a temp file next to path and rename it over path so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json_atomic(path, data, compact=False):
+    """Write JSON atomically"""
+    with atomic_file(path) as f:
+        if compact:
+            json.dump(data, f, separators=(',', ':'), default=json_default)
+        else:
+            json.dump(data, f, indent=2, default=json_default)
+
+
+def write_snapshot(path, events):
+    """Write events atomically as a binary snapshot: a fixed header, then the marshalled rows"""
+    rows = [event.row() for event in events]
+    with atomic_file(path, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, marshal.version, len(rows)))
+        marshal.dump(rows, f)
+
+
+def read_snapshot(path):
+    """Read the events of a binary snapshot, mapping the file instead of copying it into a buffer.
+
+    Rows carry start and end already parsed, so loading neither parses JSON
+    nor datetimes. Raises ValueError if the file is not a readable snapshot.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < SNAPSHOT_HEADER.size:
+            raise ValueError(f'{path} is not an event snapshot')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, version, count = SNAPSHOT_HEADER.unpack_from(mapped)
+            if (magic != SNAPSHOT_MAGIC and magic not in SNAPSHOT_LEGACY_FIELDS) or version > marshal.version:
+                raise ValueError(f'{path} is not an event snapshot for this Python version')
+            with memoryview(mapped) as view:
+                rows = marshal.loads(view[SNAPSHOT_HEADER.size:])
+    if len(rows) != count:
+        raise ValueError(f'{path} is truncated')
+    for position in SNAPSHOT_LEGACY_FIELDS.get(magic, ()):
+        rows = [row[:position] + (None,) + row[position:] for row in rows]
+    return list(map(Event.from_row, rows))
+
+
+class EventLog:
+    """Append-only write-ahead log of event mutations, one compact JSON record per line"""
+
+    def __init__(self, path, fsync_batch_size=64, fsync_interval=0.05):
+        self.path = path
+        self.fsync_batch_size = fsync_batch_size
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.pending = 0   # records written but not yet fsynced
+        self.records = 0   # records in the current log file
+        self.file = open(path, 'a', encoding='utf-8')
+        thread = threading.Thread(target=self._flush_worker, daemon=True)
+        thread.start()
+
+    def append(self, record):
+        """Append a record; fsync once a batch has accumulated"""
+        line = json.dumps(record, separators=(',', ':'), default=json_default)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+            self.pending += 1
+            self.records += 1
+            if self.pending >= self.fsync_batch_size:
+                self._sync()
+
+    def sync(self):
+        """Force pending records to disk"""
+        with self.lock:
+            self._sync()
+
+    def _sync(self):
+        if self.pending:
+            with LOG_FSYNC.time():
+                os.fsync(self.file.fileno())
+            self.pending = 0
+
+    def _flush_worker(self):
+        while True:
+            time.sleep(self.fsync_interval)
+            try:
+                self.sync()
+            except Exception:
+                logger.exception('Error syncing event log')
+
+    def rotate(self):
+        """Move the current log aside and start a fresh one; returns the old path"""
+        old_path = self.path + '.old'
+        with self.lock:
+            self._sync()
+            self.file.close()
+            os.replace(self.path, old_path)
+            self.file = open(self.path, 'a', encoding='utf-8')
+            self.records = 0
+        return old_path
+
+    @staticmethod
+    def replay(path):
+        """Yield records from a log file, stopping at a torn final line"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # partially written record from a crash
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    break
+
+
+class ReadWriteLock:
+    """Lets many readers proceed together while writers get exclusive access.
+
+    Waiting writers block new readers so a steady stream of reads cannot
+    starve them, and readers that queued up behind a writer go next so a
+    busy writer cannot starve reads either. The lock is not reentrant:
+    code holding it must not acquire it again.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writing = False
+        self.waiting_readers = 0
+        self.waiting_writers = 0
+        self.readers_turn = False
+
+    @contextmanager
+    def read(self):
+        with self.condition:
+            self.waiting_readers += 1
+            while self.writing or (self.waiting_writers and not self.readers_turn):
+                self.condition.wait()
+            self.waiting_readers -= 1
+            if not self.waiting_readers:
+                self.readers_turn = False
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writing or self.readers or self.readers_turn:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writing = False
+                self.readers_turn = self.waiting_readers > 0
+                self.condition.notify_all()
+
+
+def parse_datetime(value):
+    """Parse a datetime string, taking the fast path for ISO 8601 before falling back to dateutil"""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parser.parse(value)
+
+
+def to_timestamp(value):
+    """Parse a datetime string into a UTC epoch timestamp (naive values are local time); raises ValueError"""
+    try:
+        return parse_datetime(value).timestamp()
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f'Invalid datetime: {value!r}')
+
+
+def resolve_timezone(name):
+    """The tzinfo of an IANA timezone name such as 'Europe/Berlin'; raises ValueError"""
+    zone = tz.gettz(name) if isinstance(name, str) and name.strip() else None
+    if zone is None:
+        raise ValueError(f'Unknown timezone: {name}')
+    return zone
+
+
+def localize(dt, zone):
+    """A datetime in zone: naive values are wall-clock times there, aware ones are converted.
+
+    A wall-clock time skipped by a DST change moves forward by the gap, and
+    one that happens twice takes its first (pre-change) instant.
+    """
+    if dt.tzinfo is None:
+        return tz.resolve_imaginary(dt.replace(tzinfo=zone))
+    return dt.astimezone(zone)
+
+
+def normalize_times(fields):
+    """The time fields of an event (any of TIME_FIELDS) in canonical form; raises ValueError.
+
+    Values are rewritten as ISO 8601. With a timezone, every time is moved
+    into that zone, so it is stored unambiguously with the offset in force
+    then while still displaying in the zone it was entered in; without one,
+    naive times stay naive (server local time) and offsets are kept.
+    """
+    zone = resolve_timezone(fields['timezone']) if fields.get('timezone') else None
+
+    def normalize(value):
+        try:
+            dt = parse_datetime(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f'Invalid datetime: {value!r}')
+        return (localize(dt, zone) if zone else dt).isoformat()
+
+    normalized = dict(fields)
+    for field in ('start_time', 'end_time', 'recurrence_end'):
+        if fields.get(field) is not None:
+            normalized[field] = normalize(fields[field])
+    if fields.get('exceptions') is not None:
+        normalized['exceptions'] = [normalize(value) for value in fields['exceptions']]
+    return normalized
+
+
+class Event:
+    """One event: its fields in slots plus start and end times parsed once to epoch timestamps.
+
+    Events are immutable once stored (updates build a new one with replace()).
+    Read access by key (event['title'], event.get('recurring')) mirrors the JSON
+    form, which is produced by to_dict() only when an event leaves the process.
+    """
+
+    __slots__ = EVENT_FIELDS + ('start_ts', 'end_ts')
+    TYPES = {
+        'id': str, 'title': str, 'description': str, 'start_time': str, 'end_time': str,
+        'recurring': (str, type(None)), 'exceptions': (list, type(None)), 'recurrence_end': (str, type(None)),
+        'reminders': (list, type(None)), 'recipients': (list, type(None)), 'timezone': (str, type(None)),
+        'created_at': (str, type(None))
+    }
+
+    def __init__(self, id, title, description, start_time, end_time, recurring=None, exceptions=None,
+                 recurrence_end=None, reminders=None, recipients=None, timezone=None, created_at=None):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.start_time = start_time
+        self.end_time = end_time
+        self.recurring = recurring
+        self.exceptions = exceptions
+        self.recurrence_end = recurrence_end
+        self.reminders = reminders
+        self.recipients = recipients
+        self.timezone = timezone
+        self.created_at = created_at
+        self.start_ts = to_timestamp(start_time)
+        self.end_ts = to_timestamp(end_time)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build an event from its JSON form, ignoring unknown keys"""
+        return cls(**{field: data[field] for field in EVENT_FIELDS if field in data})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in EVENT_FIELDS}
+
+    def row(self):
+        """Every slot as a tuple, the binary snapshot form"""
+        return (self.id, self.title, self.description, self.start_time, self.end_time, self.recurring,
+                self.exceptions, self.recurrence_end, self.reminders, self.recipients, self.timezone,
+                self.created_at, self.start_ts, self.end_ts)
+
+    @classmethod
+    def from_row(cls, row):
+        """Rebuild an event from row() without re-parsing its times"""
+        event = object.__new__(cls)
+        (event.id, event.title, event.description, event.start_time, event.end_time, event.recurring,
+         event.exceptions, event.recurrence_end, event.reminders, event.recipients, event.timezone,
+         event.created_at, event.start_ts, event.end_ts) = row
+        return event
+
+    def replace(self, **changes):
+        """A copy with some fields changed; times are re-parsed only if they changed"""
+        event = object.__new__(Event)
+        for field in self.__slots__:
+            setattr(event, field, changes.get(field, getattr(self, field)))
+        if 'start_time' in changes:
+            event.start_ts = to_timestamp(event.start_time)
+        if 'end_time' in changes:
+            event.end_ts = to_timestamp(event.end_time)
+        return event
+
+    def __getitem__(self, key):
+        if key not in EVENT_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in EVENT_FIELDS else default
+
+    def __contains__(self, key):
+        return key in EVENT_FIELDS
+
+    def keys(self):
+        return EVENT_FIELDS
+
+    def __eq__(self, other):
+        if isinstance(other, Event):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'Event({self.to_dict()!r})'
+
+
+def events_from_dicts(items):
+    """Events from their JSON form, skipping (and logging) any that cannot be read, such as bad times"""
+    for data in items:
+        try:
+            yield Event.from_dict(data)
+        except (KeyError, TypeError, ValueError) as e:
+            event_id = data.get('id') if isinstance(data, dict) else None
+            logger.error('Skipping unreadable event: %s', e, extra={'event_id': event_id})
+
+
+def json_default(value):
+    """JSON encoder fallback: events as their dict form, anything else as a string"""
+    if isinstance(value, Event):
+        return value.to_dict()
+    return str(value)
+
+
+class EventJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes Event objects in responses"""
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, Event):
+            return value.to_dict()
+        return DefaultJSONProvider.default(value)
+
+
+def merge_sorted(keys, items):
+    """Merge items into the sorted list keys in place, moving each existing key at most once.
+
+    An insort per item would shift everything after it every time, so a
+    batch landing early in a large index would cost O(n) per item.
+    """
+    if len(items) < MERGE_INSORT_MAX:
+        for item in items:
+            bisect.insort(keys, item)
+        return
+    if len(items) * MERGE_SORT_RATIO >= len(keys):
+        keys.extend(items)
+        keys.sort()  # Timsort merges the two sorted runs in one pass
+        return
+    items = sorted(items)
+    hi = len(keys)
+    keys.extend(items)  # room for the items; the tail is overwritten below
+    # From the largest item down, move the keys above it up by the items still to place
+    for shift in range(len(items), 0, -1):
+        item = items[shift - 1]
+        pos = bisect.bisect_right(keys, item, 0, hi)
+        if pos < hi:
+            keys[pos + shift:hi + shift] = keys[pos:hi]
+        keys[pos + shift - 1] = item
+        hi = pos
+
+
+class TimeIndex:
+    """Events ordered by start time, kept sorted so listing and windows need no per-request sort"""
+
+    def __init__(self):
+        self.keys = []   # sorted (start_ts, event_id)
+        self.times = {}  # event_id -> start_ts
+
+    def rebuild(self, events):
+        """Sort events by their already parsed start times"""
+        self.times = {event.id: event.start_ts for event in events}
+        self.keys = sorted((start, event_id) for event_id, start in self.times.items())
+
+    def add(self, event):
+        self.times[event.id] = event.start_ts
+        bisect.insort(self.keys, (event.start_ts, event.id))
+
+    def add_many(self, events):
+        for event in events:
+            self.times[event.id] = event.start_ts
+        merge_sorted(self.keys, [(event.start_ts, event.id) for event in events])
+
+    def remove(self, event_id):
+        start = self.times.pop(event_id)
+        pos = bisect.bisect_left(self.keys, (start, event_id))
+        del self.keys[pos]
+
+    def ids(self):
+        """All event ids in start time order"""
+        return [event_id for _, event_id in self.keys]
+
+    def key(self, event_id):
+        """The (start_ts, event_id) sort key of an indexed event"""
+        return (self.times[event_id], event_id)
+
+    def iter_ids(self, after=None, chunk_size=500):
+        """Yield ids in start time order after the given key.
+
+        Keys are copied a chunk at a time and the position is re-found by
+        bisect, so concurrent inserts and deletes never invalidate the walk.
+        """
+        while True:
+            lo = 0 if after is None else bisect.bisect_right(self.keys, after)
+            chunk = self.keys[lo:lo + chunk_size]
+            if not chunk:
+                return
+            for _, event_id in chunk:
+                yield event_id
+            after = chunk[-1]
+
+    def range(self, start, end):
+        """Ids of events starting within [start, end], in O(log n + k)"""
+        lo = bisect.bisect_left(self.keys, (start, ''))
+        ids = []
+        for pos in range(lo, len(self.keys)):
+            ts, event_id = self.keys[pos]
+            if ts > end:
+                break
+            ids.append(event_id)
+        return ids
+
+
+class IntervalIndex:
+    """Events bucketed by duration, each bucket sorted by start, for overlap queries.
+
+    An event shorter than 2**c seconds lives in bucket c, so one overlapping
+    [start, end) must start within (start - 2**c, end): each bucket costs one
+    bisect plus the events in that range, O(log n + k) over a few dozen buckets.
+    """
+
+    def __init__(self):
+        self.buckets = {}  # duration class -> sorted [(start_ts, end_ts, event_id)]
+
+    @staticmethod
+    def _entry(event):
+        if not (math.isfinite(event.start_ts) and math.isfinite(event.end_ts)):
+            return None, None  # unparseable times never overlap anything
+        duration = max(0, math.ceil(event.end_ts - event.start_ts))
+        return duration.bit_length(), (event.start_ts, event.end_ts, event.id)
+
+    def rebuild(self, events):
+        self.buckets = {}
+        for event in events:
+            bucket, entry = self._entry(event)
+            if entry:
+                self.buckets.setdefault(bucket, []).append(entry)
+        for entries in self.buckets.values():
+            entries.sort()
+
+    def add(self, event):
+        bucket, entry = self._entry(event)
+        if entry:
+            bisect.insort(self.buckets.setdefault(bucket, []), entry)
+
+    def add_many(self, events):
+        added = {}
+        for event in events:
+            bucket, entry = self._entry(event)
+            if entry:
+                added.setdefault(bucket, []).append(entry)
+        for bucket, entries in added.items():
+            merge_sorted(self.buckets.setdefault(bucket, []), entries)
+
+    def remove(self, event):
+        bucket, entry = self._entry(event)
+        if entry:
+            entries = self.buckets[bucket]
+            del entries[bisect.bisect_left(entries, entry)]
+
+    def overlapping(self, start, end):
+        """Yield (start_ts, end_ts, event_id) of intervals overlapping [start, end), unordered"""
+        for bucket, entries in self.buckets.items():
+            lo = bisect.bisect_right(entries, (start - 2 ** bucket,))
+            hi = bisect.bisect_left(entries, (end,))
+            for entry in entries[lo:hi]:
+                if entry[1] > start:
+                    yield entry
+
+
+class SearchIndex:
+    """Incremental trigram index over titles and descriptions for substring, prefix and AND queries"""
+
+    TOKEN_RE = re.compile(r'\w+')
+
+    def __init__(self):
+        self.grams = {}  # trigram -> set of event ids
+        self.docs = {}   # event_id -> (title, description, title tokens, description tokens), lowercased
+
+    @staticmethod
+    def _grams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def rebuild(self, events):
+        self.grams = {}
+        self.docs = {}
+        for event in events:
+            self.add(event)
+
+    def add(self, event):
+        title, description = event['title'].lower(), event['description'].lower()
+        self.docs[event['id']] = (title, description,
+                                  set(self.TOKEN_RE.findall(title)), set(self.TOKEN_RE.findall(description)))
+        for gram in self._grams(title) | self._grams(description):
+            self.grams.setdefault(gram, set()).add(event['id'])
+
+    def remove(self, event_id):
+        title, description, _, _ = self.docs.pop(event_id)
+        for gram in self._grams(title) | self._grams(description):
+            postings = self.grams[gram]
+            postings.discard(event_id)
+            if not postings:
+                del self.grams[gram]
+
+    def _candidates(self, text):
+        """Ids that contain every trigram of text, or None when text is too short to narrow"""
+        if len(text) < 3:
+            return None
+        postings = sorted((self.grams.get(gram, set()) for gram in self._grams(text)), key=len)
+        result = set(postings[0])
+        for ids in postings[1:]:
+            if not result:
+                break
+            result &= ids
+        return result
+
+    @staticmethod
+    def _term_score(term, tokens):
+        if term in tokens:
+            return 2
+        if any(token.startswith(term) for token in tokens):
+            return 1
+        return 0
+
+    def search(self, query, limit=None):
+        """Return (score, event_id) pairs for the query, best match first.
+
+        An event matches when the whole query is a substring of its title or
+        description, or when every query term is a prefix of one of its words.
+        """
+        query = query.lower()
+        terms = self.TOKEN_RE.findall(query)
+        candidates = self._candidates(query)
+        if candidates is not None and terms:
+            # Narrow AND matches by the terms long enough to have trigrams; all terms are verified below
+            long_terms = [term for term in terms if len(term) >= 3]
+            if not long_terms:
+                candidates = None
+            else:
+                term_candidates = self._candidates(long_terms[0])
+                for term in long_terms[1:]:
+                    term_candidates &= self._candidates(term)
+                candidates = candidates | term_candidates
+        if candidates is None:
+            candidates = self.docs.keys()
+
+        matches = []
+        for event_id in candidates:
+            score = self.score(query, terms, *self.docs[event_id])
+            if score:
+                matches.append((score, event_id))
+        matches.sort(key=lambda match: -match[0])
+        return matches[:limit] if limit is not None else matches
+
+    @classmethod
+    def score(cls, query, terms, title, description, title_tokens, description_tokens):
+        """Rank a lowercased document against a lowercased query; 0 means no match"""
+        if query in title:
+            score = 100
+        elif query in description:
+            score = 50
+        else:
+            score = 0
+        term_scores = [max(2 * cls._term_score(term, title_tokens), cls._term_score(term, description_tokens))
+                       for term in terms]
+        if score or (terms and all(term_scores)):
+            return score + sum(term_scores)
+        return 0
+
+
+class SortedColumn:
+    """Sorted integers in blocks of array('q'), each with its length and sum.
+
+    Inserting or removing shifts at most one block. The count and sum of the
+    values below a point take the totals of the blocks before it plus a
+    bisect into one block and its prefix sums. The prefix sums are rebuilt
+    on first use after the block changes. So both stay fast at millions of
+    values.
+    """
+
+    BLOCK = 1024
+
+    def __init__(self, values=()):
+        values = sorted(values)
+        self.blocks = [array('q', values[i:i + self.BLOCK]) for i in range(0, len(values), self.BLOCK)]
+        self.maxes = [block[-1] for block in self.blocks]
+        self.lengths = [len(block) for block in self.blocks]
+        self.sums = [sum(block) for block in self.blocks]
+        self.prefixes = [None] * len(self.blocks)  # per block: sums of its first 0..len values, or None
+
+    def __len__(self):
+        return sum(self.lengths)
+
+    def add(self, value):
+        if not self.blocks:
+            self.blocks, self.maxes, self.lengths, self.sums = [array('q', [value])], [value], [1], [value]
+            self.prefixes = [None]
+            return
+        i = min(bisect.bisect_left(self.maxes, value), len(self.blocks) - 1)
+        block = self.blocks[i]
+        bisect.insort(block, value)
+        self.maxes[i] = block[-1]
+        self.lengths[i] += 1
+        self.sums[i] += value
+        self.prefixes[i] = None
+        if len(block) > 2 * self.BLOCK:
+            half = array('q', block[self.BLOCK:])
+            del block[self.BLOCK:]
+            self.blocks.insert(i + 1, half)
+            self.maxes[i:i + 1] = [block[-1], half[-1]]
+            self.lengths[i:i + 1] = [len(block), len(half)]
+            self.sums[i:i + 1] = [sum(block), sum(half)]
+            self.prefixes[i:i + 1] = [None, None]
+
+    def remove(self, value):
+        i = bisect.bisect_left(self.maxes, value)
+        block = self.blocks[i]
+        del block[bisect.bisect_left(block, value)]
+        if not block:
+            del self.blocks[i], self.maxes[i], self.lengths[i], self.sums[i], self.prefixes[i]
+            return
+        self.maxes[i] = block[-1]
+        self.lengths[i] -= 1
+        self.sums[i] -= value
+        self.prefixes[i] = None
+
+    def ranks(self, points):
+        """(count, sum) of the values below each of the sorted points"""
+        ranks = []
+        i = count = total = 0
+        for point in points:
+            # Whole blocks below the point are added once, as the sweep passes them
+            while i < len(self.blocks) and self.maxes[i] < point:
+                count += self.lengths[i]
+                total += self.sums[i]
+                i += 1
+            if i < len(self.blocks):
+                block, prefix = self.blocks[i], self.prefixes[i]
+                if prefix is None:
+                    prefix = self.prefixes[i] = array('q', itertools.accumulate(block, initial=0))
+                j = bisect.bisect_left(block, point)
+                ranks.append((count + j, total + prefix[j]))
+            else:
+                ranks.append((count, total))
+        return ranks
+
+
+class StatsProjection:
+    """Start and end times of events as sorted integer millisecond columns, for /api/stats.
+
+    Counting the events that start before t, and summing their booked time
+    up to t, is a rank query on the columns, so every aggregate over a window
+    costs a few rank queries per period, not a walk over the events in it.
+    """
+
+    def __init__(self, spans=()):
+        self.spans = {key: (int(start * 1000), int(end * 1000)) for key, start, end in spans}  # key -> ms
+        self.starts = SortedColumn(start for start, _ in self.spans.values())
+        self.ends = SortedColumn(end for _, end in self.spans.values())
+
+    def __len__(self):
+        return len(self.spans)
+
+    def add(self, event):
+        span = self.spans[event.id] = (int(event.start_ts * 1000), int(event.end_ts * 1000))
+        self.starts.add(span[0])
+        self.ends.add(span[1])
+
+    def remove(self, event_id):
+        span = self.spans.pop(event_id, None)
+        if span is not None:
+            self.starts.remove(span[0])
+            self.ends.remove(span[1])
+
+    def ranks(self, points):
+        """(started, sum of starts, ended, sum of ends) below each of the sorted millisecond points"""
+        return [started + ended for started, ended in zip(self.starts.ranks(points), self.ends.ranks(points))]
+
+
+def from_timestamp(ts, like):
+    """Convert an epoch timestamp to a datetime that is naive or aware like the given one"""
+    if like.tzinfo is not None:
+        return datetime.fromtimestamp(ts, like.tzinfo)
+    return datetime.fromtimestamp(ts)
+
+
+class RecurrenceEngine:
+    """Lazily expands recurring events into occurrences, memoized per day-sized window"""
+
+    WINDOW = 86400
+
+    def __init__(self, cache_size=RECURRENCE_CACHE_SIZE):
+        self.series = {}  # event_id -> (rule set, dtstart, duration, end_ts, version)
+        self.cache = OrderedDict()  # (event_id, version, window) -> occurrence timestamps
+        self.cache_lock = threading.Lock()  # readers share the engine but all update the LRU order
+        self.cursors = {}  # event_id -> (version, next occurrence timestamp, rule set iterator)
+        self.cache_size = cache_size
+        self.version = 0
+
+    @staticmethod
+    def build(event):
+        """Build the rule set of an event, or None if it does not recur; raises ValueError on bad rules.
+
+        'recurring' is a preset ('daily', 'weekly', 'monthly', 'yearly') or an
+        RRULE string such as 'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10'. 'exceptions'
+        lists skipped occurrence start times and 'recurrence_end' ends the series.
+        """
+        recurring = event.get('recurring')
+        if not recurring:
+            return None
+        try:
+            # Series with a timezone expand in it, so they keep their wall-clock time across DST changes
+            zone = resolve_timezone(event['timezone']) if event.get('timezone') else None
+            # rrule drops sub-second precision, so the series starts on the whole second
+            dtstart = parser.parse(event['start_time']).replace(microsecond=0)
+            if zone:
+                dtstart = localize(dtstart, zone)
+            if recurring in RECURRENCE_PRESETS:
+                rules = rruleset()
+                rules.rrule(rrule(RECURRENCE_PRESETS[recurring], dtstart=dtstart))
+            else:
+                rules = rrulestr(recurring, dtstart=dtstart, forceset=True)
+            for value in event.get('exceptions') or []:
+                exdate = parser.parse(value)
+                if zone:
+                    exdate = localize(exdate, zone)
+                elif (exdate.tzinfo is None) != (dtstart.tzinfo is None):
+                    exdate = from_timestamp(exdate.timestamp(), dtstart)
+                rules.exdate(exdate)
+            end_ts = float('inf')
+            if event.get('recurrence_end'):
+                recurrence_end = parser.parse(event['recurrence_end'])
+                end_ts = (localize(recurrence_end, zone) if zone else recurrence_end).timestamp()
+        except Exception as e:
+            raise ValueError(f'Invalid recurring rule: {e}')
+        return rules, dtstart, end_ts
+
+    def rebuild(self, events):
+        self.series = {}
+        with self.cache_lock:
+            self.cache.clear()
+            self.cursors.clear()
+        for event in events:
+            self.add(event)
+
+    def add(self, event):
+        try:
+            built = self.build(event)
+        except ValueError as e:
+            logger.warning('Error expanding recurrence: %s', e, extra={'event_id': event.get('id')})
+            return
+        if built:
+            rules, dtstart, end_ts = built
+            duration = to_timestamp(event['end_time']) - dtstart.timestamp()
+            self.version += 1
+            self.series[event['id']] = (rules, dtstart, duration, end_ts, self.version)
+
+    def remove(self, event_id):
+        self.series.pop(event_id, None)
+        with self.cache_lock:
+            self.cursors.pop(event_id, None)
+
+    def _cached(self, key):
+        with self.cache_lock:
+            occurrences = self.cache.get(key)
+            if occurrences is not None:
+                self.cache.move_to_end(key)
+            return occurrences
+
+    def _expand(self, event_id, first, last):
+        """Occurrence timestamps of windows first..last in one walk over the series, memoized.
+
+        dateutil always iterates a rule set from dtstart, so each series keeps a
+        cursor (version, next timestamp, iterator) that a later walk resumes when
+        it starts at or after the cursor; walking backwards starts over.
+        """
+        rules, dtstart, _, end_ts, version = self.series[event_id]
+        lo, hi = first * self.WINDOW, (last + 1) * self.WINDOW
+        with self.cache_lock:
+            cursor = self.cursors.pop(event_id, None)  # concurrent walks never share an iterator
+        if cursor is None or cursor[0] != version or cursor[1] is None or cursor[1] > lo:
+            cursor = (version, float('-inf'), iter(rules))
+        _, ts, occurrences = cursor
+
+        def advance():
+            dt = next(occurrences, None)
+            return None if dt is None or dt.timestamp() > end_ts else dt.timestamp()
+
+        while ts is not None and ts < lo:
+            ts = advance()
+        windows = {window: [] for window in range(first, last + 1)}
+        while ts is not None and ts < hi:
+            windows[int(ts // self.WINDOW)].append(ts)
+            ts = advance()
+        windows = {window: tuple(found) for window, found in windows.items()}
+        with self.cache_lock:
+            self.cursors[event_id] = (version, ts, occurrences)
+            for window, found in windows.items():
+                self.cache[(event_id, version, window)] = found
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return windows
+
+    def _window(self, event_id, window):
+        """Occurrence timestamps of one series within one day-sized window, memoized"""
+        occurrences = self._cached((event_id, self.series[event_id][4], window))
+        if occurrences is None:
+            occurrences = self._expand(event_id, window, window)[window]
+        return occurrences
+
+    def iter_between(self, event_id, start, end):
+        """Yield occurrence timestamps of a series within [start, end]"""
+        _, dtstart, _, end_ts, version = self.series[event_id]
+        start, end = max(start, dtstart.timestamp()), min(end, end_ts)
+        if start > end:
+            return
+        windows = range(int(start // self.WINDOW), int(end // self.WINDOW) + 1)
+        found = {window: self._cached((event_id, version, window)) for window in windows}
+        missing = [window for window, occurrences in found.items() if occurrences is None]
+        if missing:
+            # one walk covers every uncached window instead of one walk per day
+            found.update(self._expand(event_id, missing[0], missing[-1]))
+        for window in windows:
+            for ts in found[window]:
+                if start <= ts <= end:
+                    yield ts
+
+    def iter_after(self, event_id, start):
+        """Yield occurrence timestamps of a series after start, without bound"""
+        rules, dtstart, _, end_ts, _ = self.series[event_id]
+        for dt in rules.xafter(from_timestamp(start, dtstart)):
+            ts = dt.timestamp()
+            if ts > end_ts:
+                return
+            yield ts
+
+    def is_occurrence(self, event_id, ts):
+        return event_id in self.series and ts in self._window(event_id, int(ts // self.WINDOW))
+
+    def occurrence(self, event, ts):
+        """A copy of a recurring event moved to one of its occurrences"""
+        _, dtstart, duration, _, _ = self.series[event['id']]
+        return dict(event,
+                    start_time=from_timestamp(ts, dtstart).isoformat(),
+                    end_time=from_timestamp(ts + duration, dtstart).isoformat())
+
+
+class SMTPTransport:
+    """A persistent, authenticated SMTP connection that reconnects when dropped"""
+
+    def __init__(self, config):
+        self.config = config
+        self.server = None
+
+    def connect(self):
+        self.server = smtplib.SMTP(self.config['smtp_server'], self.config['smtp_port'], timeout=30)
+        self.server.starttls()
+        self.server.login(self.config['sender_email'], self.config['sender_password'])
+
+    def send(self, sender, recipients, message):
+        if self.server is None:
+            self.connect()
+        try:
+            self.server.sendmail(sender, recipients, message)
+        except smtplib.SMTPServerDisconnected:
+            self.connect()
+            self.server.sendmail(sender, recipients, message)
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+
+LOCAL_OUTBOX = deque(maxlen=1000)
+
+
+class LocalTransport:
+    """In-process stand-in for SMTP that records messages instead of sending them"""
+
+    def __init__(self, outbox=LOCAL_OUTBOX):
+        self.outbox = outbox
+
+    def send(self, sender, recipients, message):
+        self.outbox.append((sender, recipients, message))
+
+    def close(self):
+        pass
+
+
+EMAIL_TRANSPORTS = {
+    'smtp': SMTPTransport,
+    'local': lambda config: LocalTransport()
 }
 
-class EventScheduler:
-    def __init__(self):
-        self.events = []
-        self.load_events()
-        self.start_reminder_thread()
-    
-    def load_events(self):
-        """Load events from JSON file"""
-        try:
-            if os.path.exists(EVENTS_FILE):
-                with open(EVENTS_FILE, 'r') as f:
-                    self.events = json.load(f)
-        except Exception as e:
-            print(f"Error loading events: {e}")
-            self.events = []
-    
-    def save_events(self):
-        """Save events to JSON file"""
-        try:
-            with open(EVENTS_FILE, 'w') as f:
-                json.dump(self.events, f, indent=2, default=str)
-        except Exception as e:
-            print(f"Error saving events: {e}")
-    
-    def add_event(self, title, description, start_time, end_time, recurring=None):
-        """Add a new event"""
-        event = {
-            'id': str(uuid.uuid4()),
-            'title': title,
-            'description': description,
-            'start_time': start_time,
-            'end_time': end_time,
-            'recurring': recurring,
-            'created_at': datetime.now().isoformat()
-        }
-        self.events.append(event)
-        self.save_events()
-        return event
-    
-    def get_all_events(self):
-        """Get all events sorted by start time"""
-        return sorted(self.events, key=lambda x: x['start_time'])
-    
-    def get_event_by_id(self, event_id):
-        """Get event by ID"""
-        for event in self.events:
-            if event['id'] == event_id:
-                return event
-        return None
-    
-    def update_event(self, event_id, **kwargs):
-        """Update an existing event"""
-        event = self.get_event_by_id(event_id)
-        if event:
-            for key, value in kwargs.items():
-                if key in event:
-                    event[key] = value
-            self.save_events()
-            return event
-        return None
-    
-    def delete_event(self, event_id):
-        """Delete an event"""
-        event = self.get_event_by_id(event_id)
-        if event:
-            self.events.remove(event)
-            self.save_events()
-            return True
-        return False
-    
-    def search_events(self, query):
-        """Search events by title or description"""
-        query = query.lower()
-        results = []
-        for event in self.events:
-            if (query in event['title'].lower() or 
-                query in event['description'].lower()):
-                results.append(event)
-        return results
-    
-    def get_upcoming_events(self, hours=1):
-        """Get events due within specified hours"""
-        try:
-            now = datetime.now()
-            upcoming = []
-            for event in self.events:
-                try:
-                    start_time = parser.parse(event['start_time'])
-                    time_diff = start_time - now
-                    # Events that start within the next 'hours' hours and haven't started yet
-                    if timedelta(0) <= time_diff <= timedelta(hours=hours):
-                        upcoming.append(event)
-                except Exception as e:
-                    print(f"❌ Error parsing event time for {event.get('title', 'Unknown')}: {e}")
-                    continue
-            return upcoming
-        except Exception as e:
-            print(f"❌ Error getting upcoming events: {e}")
-            return []
-    
-    def send_email_notification(self, event):
-        """Send email notification for event reminder"""
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = EMAIL_CONFIG['sender_email']
-            msg['To'] = EMAIL_CONFIG['sender_email']  # Send to self for demo
-            msg['Subject'] = f"Event Reminder: {event['title']}"
-            
-            body = f"""
-            Event Reminder!
-            
-            Title: {event['title']}
-            Description: {event['description']}
-            Start Time: {event['start_time']}
-            End Time: {event['end_time']}
-            
-            Don't forget your event!
-            """
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
-            server.starttls()
-            server.login(EMAIL_CONFIG['sender_email'], EMAIL_CONFIG['sender_password'])
-            text = msg.as_string()
-            server.sendmail(EMAIL_CONFIG['sender_email'], EMAIL_CONFIG['sender_email'], text)
-            server.quit()
-            
-            print(f"Email notification sent for event: {event['title']}")
-        except Exception as e:
-            print(f"Error sending email notification: {e}")
-    
-    def check_reminders(self):
-        """Check for upcoming events and send reminders"""
-        try:
-            upcoming = self.get_upcoming_events(1)  # Next hour
-            if upcoming:
-                print(f"\n🔔 REMINDER CHECK - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f"📅 Found {len(upcoming)} upcoming event(s) in the next hour:")
-                for event in upcoming:
-                    start_time = parser.parse(event['start_time'])
-                    time_until = start_time - datetime.now()
-                    minutes_until = int(time_until.total_seconds() / 60)
-                    print(f"   ⏰ {event['title']} - Starts in {minutes_until} minutes")
-                    print(f"      📝 {event['description']}")
-                    print(f"      🕐 {event['start_time']}")
-                    # Uncomment the line below to enable email notifications
-                    # self.send_email_notification(event)
-                print("🔔 End of reminders\n")
-            else:
-                print(f"✅ No upcoming events in the next hour - {datetime.now().strftime('%H:%M:%S')}")
-        except Exception as e:
-            print(f"❌ Error checking reminders: {e}")
+
+class RateLimiter:
+    """Token bucket allowing a number of operations per minute, in bursts of up to burst (default: a minute's)"""
+
+    def __init__(self, per_minute, burst=None):
+        self.capacity = burst or per_minute
+        self.tokens = float(self.capacity)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until an operation is allowed"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """Take a token if one is available; returns the seconds to wait for one otherwise, or 0"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+class EmailDelivery:
+    """Background email delivery: a bounded queue drained by workers sharing a connection pool"""
+
+    def __init__(self, config, transport_factory=None):
+        self.config = config
+        self.transport_factory = transport_factory or (lambda: EMAIL_TRANSPORTS[config['transport']](config))
+        self.queue = queue.Queue(maxsize=config['queue_size'])
+        self.pool = queue.LifoQueue()  # idle connections, most recently used first
+        self.pool_slots = threading.BoundedSemaphore(config['pool_size'])
+        self.limiter = RateLimiter(config['rate_per_minute'])
+        self.lock = threading.Lock()
+        self.counts = {'sent': 0, 'failed': 0, 'retried': 0, 'dropped': 0}
+        self.latencies = deque(maxlen=1000)  # seconds per successful send
+        self.started = False
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        for _ in range(self.config['workers']):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+
+    def submit(self, sender, recipients, message):
+        """Queue a message for delivery; returns False if the queue is full"""
+        self.start()
+        try:
+            self.queue.put_nowait((sender, recipients, message, 0))
+            return True
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+    def _count(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def _acquire_connection(self):
+        self.pool_slots.acquire()
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            try:
+                return self.transport_factory()
+            except Exception:
+                self.pool_slots.release()
+                raise
+
+    def _release_connection(self, transport, healthy):
+        if healthy:
+            self.pool.put(transport)
+        else:
+            transport.close()
+        self.pool_slots.release()
+
+    def _worker(self):
+        while True:
+            sender, recipients, message, attempt = self.queue.get()
+            try:
+                self._deliver(sender, recipients, message, attempt)
+            except Exception:
+                logger.exception('Error in email worker')
+            finally:
+                self.queue.task_done()
+
+    def _deliver(self, sender, recipients, message, attempt):
+        self.limiter.acquire()
+        started = time.perf_counter()
+        transport = None
+        try:
+            transport = self._acquire_connection()
+            transport.send(sender, recipients, message)
+        except Exception as e:
+            if transport is not None:
+                self._release_connection(transport, healthy=False)
+            if attempt < self.config['max_retries']:
+                self._count('retried')
+                delay = self.config['retry_backoff'] * (2 ** attempt)
+                retry = threading.Timer(delay, self._requeue, (sender, recipients, message, attempt + 1))
+                retry.daemon = True
+                retry.start()
+            else:
+                self._count('failed')
+                logger.error('Error sending email notification: %s', e, extra={'attempt': attempt})
+            return
+        self._release_connection(transport, healthy=True)
+        elapsed = time.perf_counter() - started
+        EMAIL_SEND.observe(elapsed)
+        with self.lock:
+            self.latencies.append(elapsed)
+            self.counts['sent'] += 1
+
+    def _requeue(self, sender, recipients, message, attempt):
+        try:
+            self.queue.put_nowait((sender, recipients, message, attempt))
+        except queue.Full:
+            self._count('dropped')
+
+    def metrics(self):
+        """Queue depth, outcome counts and recent send latency"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            metrics = dict(self.counts)
+        metrics['queue_depth'] = self.queue.qsize()
+        if latencies:
+            metrics['latency_ms'] = {
+                'avg': round(sum(latencies) / len(latencies) * 1000, 3),
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+                'max': round(latencies[-1] * 1000, 3)
+            }
+        else:
+            metrics['latency_ms'] = None
+        return metrics
+
+
+email_delivery = EmailDelivery(EMAIL_CONFIG)
+
+
+class LogAction:
+    """Logs the reminder"""
+
+    def __init__(self, config, scheduler):
+        pass
+
+    def run(self, reminder, timeout):
+        event = reminder['event']
+        minutes_until = int((reminder['start_ts'] - time.time()) / 60)
+        logger.info('Reminder: %s starts in %d minutes', event['title'], minutes_until,
+                    extra={'event_id': event['id'], 'start_time': event['start_time'],
+                           'lag': round(time.time() - reminder['fire_ts'], 3)})
+
+
+class EmailAction:
+    """Queues the reminder email on the scheduler's EmailDelivery, which retries sending itself"""
+
+    def __init__(self, config, scheduler):
+        self.scheduler = scheduler
+
+    def run(self, reminder, timeout):
+        if not self.scheduler.send_email_notification(reminder['event']):
+            raise RuntimeError('Email notification not queued')
+
+
+class WebhookAction:
+    """POSTs the reminder as JSON to config['url'] (with any config['headers']); non-2xx responses fail"""
+
+    def __init__(self, config, scheduler):
+        self.url = config['url']
+        self.headers = dict({'Content-Type': 'application/json'}, **config.get('headers', {}))
+
+    def run(self, reminder, timeout):
+        body = json.dumps(reminder, default=json_default).encode()
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method='POST')
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+
+class CommandAction:
+    """Runs config['args'] with the reminder as JSON on stdin; a non-zero exit status fails"""
+
+    def __init__(self, config, scheduler):
+        self.args = config['args']
+
+    def run(self, reminder, timeout):
+        result = subprocess.run(self.args, input=json.dumps(reminder, default=json_default).encode(),
+                                capture_output=True, timeout=timeout)
+        if result.returncode:
+            raise RuntimeError(f'Exit status {result.returncode}: {result.stderr.decode(errors="replace")[-500:]}')
+
+
+ACTION_TYPES = {
+    'log': LogAction,
+    'email': EmailAction,
+    'webhook': WebhookAction,
+    'command': CommandAction
+}
+
+
+class ReminderActions:
+    """Runs the actions of sent reminders on a bounded thread pool per action.
+
+    The reminder loop only submits jobs, so a slow target never delays the
+    next reminder, and each action's own pool keeps it from holding up the
+    others. Timeouts apply per attempt. Failed jobs are retried with
+    exponential backoff from a queue persisted in retry_file, so pending
+    retries survive a restart; jobs out of retries are appended to
+    dead_letter_file, one JSON object per line.
+    """
+
+    def __init__(self, scheduler, actions, retry_file, dead_letter_file, config=None):
+        self.config = dict(ACTION_CONFIG, **(config or {}))
+        self.retry_file = retry_file
+        self.dead_letter_file = dead_letter_file
+        self.actions = {}  # name -> (action, executor, free slots, timeout)
+        for spec in actions:
+            name = spec.get('name') or spec['type']
+            if name in self.actions:
+                name = f"{name}-{len(self.actions)}"
+            self.actions[name] = (ACTION_TYPES[spec['type']](spec, scheduler),
+                                  ThreadPoolExecutor(spec.get('workers', self.config['workers']),
+                                                     thread_name_prefix=f'action-{name}'),
+                                  threading.BoundedSemaphore(self.config['queue_size']),
+                                  spec.get('timeout', self.config['timeout']))
+        self.lock = threading.Lock()
+        self.retries = {}  # job id -> job, waiting for its next attempt
+        if os.path.exists(retry_file):
+            try:
+                with open(retry_file, 'r') as f:
+                    self.retries = {job['id']: job for job in json.load(f)}
+            except Exception as e:
+                logger.warning('Error loading reminder action retries: %s', e)
+        for job in self.retries.values():
+            self._schedule_retry(job)
+
+    def submit(self, reminder):
+        """Queue every action for a reminder (a JSON-serializable dict); never blocks"""
+        for name in self.actions:
+            self._submit({'id': str(uuid.uuid4()), 'action': name, 'reminder': reminder, 'attempt': 0})
+
+    def _submit(self, job):
+        entry = self.actions.get(job['action'])
+        if entry is None:
+            self._dead_letter(job, 'Action is no longer configured')
+            return
+        action, executor, slots, timeout = entry
+        if not slots.acquire(blocking=False):
+            self._failed(job, 'Action queue full')
+            return
+        executor.submit(self._run, job, action, slots, timeout)
+
+    def _run(self, job, action, slots, timeout):
+        try:
+            with ACTION_RUN.time(job['action']):
+                action.run(job['reminder'], timeout)
+        except Exception as e:
+            self._failed(job, f'{type(e).__name__}: {e}')
+        else:
+            ACTIONS.inc(job['action'], 'succeeded')
+            with self.lock:
+                if self.retries.pop(job['id'], None) is not None:
+                    self._save()
+        finally:
+            slots.release()
+
+    def _failed(self, job, error):
+        if job['attempt'] >= self.config['max_retries']:
+            self._dead_letter(job, error)
+            return
+        ACTIONS.inc(job['action'], 'retried')
+        delay = self.config['retry_backoff'] * (2 ** job['attempt'])
+        job = dict(job, attempt=job['attempt'] + 1, due=time.time() + delay, error=error)
+        with self.lock:
+            self.retries[job['id']] = job
+            self._save()
+        self._schedule_retry(job)
+
+    def _schedule_retry(self, job):
+        retry = threading.Timer(max(job['due'] - time.time(), 0), self._retry, (job['id'],))
+        retry.daemon = True
+        retry.start()
+
+    def _retry(self, job_id):
+        with self.lock:
+            job = self.retries.get(job_id)
+        if job is not None:
+            self._submit(job)
+
+    def _dead_letter(self, job, error):
+        ACTIONS.inc(job['action'], 'dead_lettered')
+        logger.error('Reminder action failed for good: %s', error,
+                     extra={'action': job['action'], 'event_id': job['reminder']['event']['id'],
+                            'attempt': job['attempt']})
+        with self.lock:
+            self.retries.pop(job['id'], None)
+            self._save()
+            with open(self.dead_letter_file, 'a') as f:
+                f.write(json.dumps(dict(job, error=error, failed_at=time.time()), default=json_default) + '\n')
+
+    def _save(self):
+        """Persist the retry queue (callers hold self.lock)"""
+        write_json_atomic(self.retry_file, list(self.retries.values()), compact=True)
+
+    def metrics(self):
+        with self.lock:
+            return {'retrying': len(self.retries)}
+
+
+class ChangeFeed:
+    """Monotonically numbered log of recent changes for deltas and push streams"""
+
+    def __init__(self, maxlen=CHANGE_FEED_SIZE):
+        # Start from the wall clock in milliseconds so sequence numbers keep
+        # increasing across restarts and stale client tokens are detected
+        self.seq = int(time.time() * 1000)
+        self.changes = deque(maxlen=maxlen)
+        self.condition = threading.Condition()
+        self.waiters = set()  # (loop, asyncio.Event) of coroutines in wait_async
+
+    def record(self, op, event, seq=None):
+        """Number and remember a change, waking any stream waiting for it; a shared store passes its own seq"""
+        with self.condition:
+            self.seq = self.seq + 1 if seq is None else seq
+            change = {'seq': self.seq, 'op': op}
+            if op == 'delete':
+                change['id'] = event['id']
+            else:
+                change['event'] = dict(event)
+            self.changes.append(change)
+            self.condition.notify_all()
+            for loop, woken in self.waiters:
+                loop.call_soon_threadsafe(woken.set)
+            return self.seq
+
+    def reset(self, seq):
+        """Forget the retained changes and continue from seq, so clients holding older ones reload"""
+        with self.condition:
+            self.seq = seq
+            self.changes.clear()
+            self.condition.notify_all()
+            for loop, woken in self.waiters:
+                loop.call_soon_threadsafe(woken.set)
+
+    def since(self, seq):
+        """Changes after seq, or None when they are no longer retained and the client must reload"""
+        with self.condition:
+            if seq > self.seq:
+                return None
+            if seq == self.seq:
+                return []
+            oldest = self.changes[0]['seq'] if self.changes else self.seq + 1
+            if seq < oldest - 1:
+                return None
+            return list(itertools.islice(self.changes, seq - oldest + 1, None))
+
+    def wait(self, seq, timeout):
+        """Block until a change after seq is recorded or the timeout passes"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.seq > seq, timeout)
+
+    async def wait_async(self, seq, timeout):
+        """Like wait(), but suspends the calling coroutine instead of blocking a thread"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.condition:
+            if self.seq > seq:
+                return True
+            self.waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.condition:
+                self.waiters.discard(waiter)
+        return self.seq > seq
+
+
+class ReminderDispatcher:
+    """Fires reminders from a heap of deadlines, sleeping until the earliest one is due.
+
+    The loop runs either in a thread (run) or as an asyncio task (run_async);
+    both wait for the same heap and are woken by schedule_event.
+    """
+
+    def __init__(self, scheduler, fired_file):
+        self.scheduler = scheduler
+        self.fired_file = fired_file
+        self.heap = []  # (fire_ts, event_id, offset, start_ts); stale entries are skipped when popped
+        self.condition = threading.Condition()
+        self.loop = None    # the event loop of run_async, and the event that wakes it
+        self.wakeup = None
+        self.fired = {}  # key -> start_ts of reminders already sent, persisted so restarts don't repeat them
+        if os.path.exists(fired_file):
+            try:
+                with open(fired_file, 'r') as f:
+                    self.fired = json.load(f)
+            except Exception as e:
+                logger.warning('Error loading fired reminders: %s', e)
+
+    @staticmethod
+    def _key(event_id, start_ts, offset):
+        return f'{event_id}@{start_ts}-{offset}'
+
+    def _offsets(self, event):
+        offsets = event.get('reminders')
+        return REMINDER_CONFIG['default_offsets'] if offsets is None else offsets
+
+    def _occurrence_entries(self, event, start_ts, now):
+        for offset in self._offsets(event):
+            if start_ts > now and self._key(event['id'], start_ts, offset) not in self.fired:
+                yield (start_ts - offset * 60, event['id'], offset, start_ts)
+
+    def _entries(self, event, start_ts, now):
+        recurrence = self.scheduler.recurrence
+        if not self._offsets(event):
+            return []
+        if event['id'] not in recurrence.series:
+            return list(self._occurrence_entries(event, start_ts, now))
+        # Recurring events queue only their next occurrence that still has unsent reminders
+        for occurrence_ts in itertools.islice(recurrence.iter_after(event['id'], now), 1000):
+            entries = list(self._occurrence_entries(event, occurrence_ts, now))
+            if entries:
+                return entries
+        return []
+
+    def rebuild(self):
+        """Rebuild the heap from every indexed event"""
+        now = time.time()
+        store = self.scheduler.store
+        if self.scheduler.shared:
+            self.fired = store.fired_reminders()  # including those other processes sent while leading
+        heap = [entry for start_ts, event in store.range(now, float('inf'))
+                for entry in self._entries(event, start_ts, now)]
+        heap.extend(entry for event_id in self.scheduler.recurrence.series
+                    for entry in self._entries(store.get(event_id), None, now))
+        heapq.heapify(heap)
+        with self.condition:
+            self.heap = heap
+            self._notify()
+
+    def schedule_event(self, event):
+        """Queue reminders for an added or updated event"""
+        start_ts = self.scheduler.store.start_ts(event['id'])
+        with self.condition:
+            earliest = self.heap[0][0] if self.heap else float('inf')
+            for entry in self._entries(event, start_ts, time.time()):
+                heapq.heappush(self.heap, entry)
+            if self.heap and self.heap[0][0] < earliest:
+                self._notify()
+
+    def _notify(self):
+        """Wake the dispatch loop, thread or task (callers hold self.condition)"""
+        self.condition.notify()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def _pop_due(self):
+        """Pop the earliest reminder if due: (entry, None), else (None, seconds until it is, or None if empty)"""
+        with self.condition:
+            if not self.heap:
+                return None, None
+            delay = self.heap[0][0] - time.time()
+            if delay > 0:
+                return None, delay
+            return heapq.heappop(self.heap), None
+
+    def _next_due(self):
+        """Block until the earliest reminder is due and pop it"""
+        with self.condition:
+            while True:
+                entry, delay = self._pop_due()
+                if entry:
+                    return entry
+                self.condition.wait(delay)
+
+    def _is_current(self, event, offset, start_ts):
+        """Whether a popped entry still matches the event (it may have moved or been deleted)"""
+        if event is None or offset not in self._offsets(event):
+            return False
+        if event['id'] in self.scheduler.recurrence.series:
+            return self.scheduler.recurrence.is_occurrence(event['id'], start_ts)
+        return self.scheduler.store.start_ts(event['id']) == start_ts
+
+    def _mark_fired(self, key, start_ts):
+        """Record a reminder as sent; False if another process sharing the store already sent it"""
+        claimed = not self.scheduler.shared or self.scheduler.store.claim_reminder(key, start_ts)
+        self.fired[key] = start_ts
+        # Reminders for events that started more than a day ago can no longer fire
+        cutoff = time.time() - 86400
+        self.fired = {k: ts for k, ts in self.fired.items() if ts >= cutoff}
+        if not self.scheduler.shared:
+            write_json_atomic(self.fired_file, self.fired)
+        return claimed
+
+    def _fire(self, entry):
+        """Send a popped reminder unless it is stale, was already sent or this process lost the lease"""
+        fire_ts, event_id, offset, start_ts = entry
+        key = self._key(event_id, start_ts, offset)
+        with self.scheduler.lock.read():
+            event = self.scheduler.store.get(event_id)
+            if not self._is_current(event, offset, start_ts) or key in self.fired:
+                return
+            if not self.scheduler.leads_reminders():
+                return  # left to the leader; the heap is rebuilt if this process leads again
+            claimed = self._mark_fired(key, start_ts)
+            if event_id in self.scheduler.recurrence.series:
+                self.schedule_event(event)  # queue the next occurrence
+                event = self.scheduler.recurrence.occurrence(event, start_ts)
+        if not claimed:
+            return
+        REMINDER_LAG.observe(max(time.time() - fire_ts, 0.0))
+        self.scheduler.send_reminder(event, start_ts, fire_ts)
+        REMINDERS_SENT.inc()
+
+    def run(self):
+        while True:
+            try:
+                self._fire(self._next_due())
+            except Exception:
+                logger.exception('Error in reminder thread')
+
+    async def run_async(self):
+        """The dispatch loop as an asyncio task: it waits on the event loop and fires in a worker thread"""
+        self.wakeup = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        while True:
+            # Cleared before looking at the heap, so a reminder queued after the look still wakes us
+            self.wakeup.clear()
+            entry, delay = self._pop_due()
+            if entry is None:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.loop.run_in_executor(None, self._fire, entry)
+            except Exception:
+                logger.exception('Error in reminder task')
+
+
+class JSONStore:
+    """Events held in memory with id, time and text indexes, persisted to events.json"""
+
+    def __init__(self, events_file, storage_config):
+        self.events_file = events_file
+        self.binary = storage_config.get('snapshot') == 'binary'
+        self.snapshot_file = events_file + '.bin' if self.binary else events_file
+        self.wal_file = events_file + '.wal'
+        self.storage_config = storage_config
+        self.lock = ReadWriteLock()
+        self.events = []
+        self.index = {}  # event id -> position in self.events
+        self.time_index = TimeIndex()
+        self.interval_index = IntervalIndex()
+        self.search_index = None  # built on the first search, the slowest index to build
+        self.search_lock = threading.Lock()
+        self.log = None
+        self.batching = False
+        self.pending = []  # events inserted in the current batch, not yet in the time and interval indexes
+        self.load_events()
+        if storage_config['mode'] == 'wal':
+            self.log = EventLog(self.wal_file,
+                                storage_config['fsync_batch_size'],
+                                storage_config['fsync_interval'])
+            self.start_compaction_thread()
+
+    @staticmethod
+    def read(events_file, binary=False):
+        """Read the events of a snapshot and any write-ahead log next to it.
+
+        When both events.json and a binary snapshot (events.json.bin) exist,
+        the newer one wins, and the configured format on a tie, so switching
+        formats in either direction reads the last snapshot written.
+        """
+        events = []
+        candidates = [events_file + '.bin', events_file] if binary else [events_file, events_file + '.bin']
+        existing = [path for path in candidates if os.path.exists(path)]
+        snapshot = max(existing, key=os.path.getmtime) if existing else None
+        if snapshot == events_file + '.bin':
+            events = read_snapshot(snapshot)
+        elif snapshot:
+            with open(snapshot, 'r') as f:
+                events = list(events_from_dicts(json.load(f)))
+        by_id = {event.id: event for event in events}
+        for path in (events_file + '.wal.old', events_file + '.wal'):
+            for record in EventLog.replay(path):
+                if record['op'] == 'put':
+                    for event in events_from_dicts([record['event']]):
+                        by_id[event.id] = event
+                elif record['op'] == 'delete':
+                    by_id.pop(record['id'], None)
+        return list(by_id.values())
+
+    def write_snapshot(self, events):
+        with SNAPSHOT_WRITE.time('binary' if self.binary else 'json'):
+            if self.binary:
+                write_snapshot(self.snapshot_file, events)
+            elif self.log:
+                write_json_atomic(self.snapshot_file, events, compact=True)
+            else:
+                write_json_atomic(self.snapshot_file, events)
+        if not self.binary and os.path.exists(self.events_file + '.bin'):
+            # A binary snapshot left from before switching to json is stale now
+            os.remove(self.events_file + '.bin')
+
+    def load_events(self):
+        """Load events from the snapshot, replaying any write-ahead log left next to it.
+
+        A log left aside by an interrupted compaction is folded into a fresh
+        snapshot; so is the live log in json mode, which no longer appends to it.
+        """
+        try:
+            self.events = self.read(self.events_file, self.binary)
+            logs = [self.wal_file + '.old']
+            if self.storage_config['mode'] != 'wal':
+                logs.append(self.wal_file)
+            logs = [path for path in logs if os.path.exists(path)]
+            if logs:
+                # Finish folding before the old log can be overwritten
+                self.write_snapshot(self.events)
+                for path in logs:
+                    os.remove(path)
+        except Exception:
+            logger.exception('Error loading events')
+            self.events = []
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        """Rebuild the id -> position and time indexes from self.events; the text index follows lazily"""
+        self.index = {event.id: pos for pos, event in enumerate(self.events)}
+        self.time_index.rebuild(self.events)
+        self.interval_index.rebuild(self.events)
+        self.search_index = None
+
+    def _search_index(self):
+        """The text index, built on first use (callers hold at least the read lock)"""
+        if self.search_index is None:
+            with self.search_lock:
+                if self.search_index is None:
+                    search_index = SearchIndex()
+                    search_index.rebuild(self.events)
+                    self.search_index = search_index
+        return self.search_index
+
+    def save_events(self):
+        """Save events to JSON file (callers hold the write lock)"""
+        try:
+            if self.log:
+                old_log = self.log.rotate()
+                self.write_snapshot(self.events)
+                os.remove(old_log)
+            else:
+                self.write_snapshot(self.events)
+        except Exception:
+            logger.exception('Error saving events')
+
+    def _persist(self, op, event):
+        """Persist a single mutation"""
+        if not self.log:
+            if not self.batching:
+                self.save_events()
+            return
+        try:
+            if op == 'delete':
+                self.log.append({'op': 'delete', 'id': event['id']})
+            else:
+                self.log.append({'op': 'put', 'event': event})
+            if self.log.records >= self.storage_config['compact_threshold']:
+                self._compact_requested.set()
+        except Exception:
+            logger.exception('Error writing event log')
+
+    @contextmanager
+    def batch(self):
+        """Persist the mutations made inside the block once, when it exits (callers hold the write lock)"""
+        self.batching = True
+        try:
+            yield
+        finally:
+            self.batching = False
+            self._index_pending()
+            if self.log:
+                self.log.sync()
+            else:
+                self.save_events()
+
+    def compact(self):
+        """Fold the write-ahead log into a fresh snapshot"""
+        # Rotating and copying together keeps the snapshot and the new log consistent;
+        # event dicts are never modified in place, so serializing can happen unlocked
+        with COMPACTION.time():
+            with self.lock.read():
+                old_log = self.log.rotate()
+                events = list(self.events)
+            self.write_snapshot(events)
+            os.remove(old_log)
+
+    def start_compaction_thread(self):
+        """Start background thread that periodically compacts the log"""
+        self._compact_requested = threading.Event()
+
+        def compaction_worker():
+            while True:
+                self._compact_requested.wait(self.storage_config['compact_interval'])
+                self._compact_requested.clear()
+                try:
+                    if self.log.records:
+                        self.compact()
+                except Exception:
+                    logger.exception('Error compacting event log')
+
+        thread = threading.Thread(target=compaction_worker, daemon=True)
+        thread.start()
+
+    def __len__(self):
+        return len(self.events)
+
+    def index_sizes(self):
+        """Entries held by each in-memory index; the text index counts 0 until first built"""
+        search_index = self.search_index
+        return {
+            'id': len(self.index),
+            'time': len(self.time_index.keys),
+            'interval': sum(len(entries) for entries in self.interval_index.buckets.values()),
+            'search_trigrams': len(search_index.grams) if search_index else 0
+        }
+
+    def get(self, event_id):
+        pos = self.index.get(event_id)
+        if pos is None:
+            return None
+        return self.events[pos]
+
+    def _index_pending(self):
+        """Merge the events inserted in a batch into the time and interval indexes in one pass each"""
+        if self.pending:
+            self.time_index.add_many(self.pending)
+            self.interval_index.add_many(self.pending)
+            self.pending = []
+
+    def insert(self, event):
+        self.index[event['id']] = len(self.events)
+        self.events.append(event)
+        if self.batching:
+            self.pending.append(event)
+        else:
+            self.time_index.add(event)
+            self.interval_index.add(event)
+        if self.search_index is not None:
+            self.search_index.add(event)
+        self._persist('put', event)
+
+    def update(self, event, changed):
+        """Replace an event with an updated copy, reindexing the fields in changed"""
+        self._index_pending()
+        pos = self.index[event.id]
+        old, self.events[pos] = self.events[pos], event
+        if 'start_time' in changed or 'end_time' in changed:
+            self.time_index.remove(event.id)
+            self.time_index.add(event)
+            self.interval_index.remove(old)
+            self.interval_index.add(event)
+        if self.search_index is not None and ('title' in changed or 'description' in changed):
+            self.search_index.remove(event['id'])
+            self.search_index.add(event)
+        self._persist('put', event)
+
+    def delete(self, event_id):
+        pos = self.index.pop(event_id, None)
+        if pos is None:
+            return None
+        self._index_pending()
+        event = self.events[pos]
+        self.time_index.remove(event_id)
+        self.interval_index.remove(event)
+        if self.search_index is not None:
+            self.search_index.remove(event_id)
+        # Swap the last event into the freed slot so removal is O(1)
+        last = self.events.pop()
+        if last is not event:
+            self.events[pos] = last
+            self.index[last['id']] = pos
+        self._persist('delete', event)
+        return event
+
+    def start_ts(self, event_id):
+        return self.events[self.index[event_id]].start_ts  # also right for an event still pending in a batch
+
+    def key(self, event_id):
+        return self.time_index.key(event_id)
+
+    def iter_events(self, after=None):
+        for event_id in self.time_index.iter_ids(after):
+            event = self.get(event_id)
+            if event is not None:
+                yield event
+
+    def range(self, start_ts, end_ts):
+        return [(self.time_index.times[event_id], self.events[self.index[event_id]])
+                for event_id in self.time_index.range(start_ts, end_ts)]
+
+    def overlapping(self, start_ts, end_ts):
+        """(start_ts, end_ts, event) of every event overlapping [start_ts, end_ts)"""
+        return [(start, end, self.events[self.index[event_id]])
+                for start, end, event_id in self.interval_index.overlapping(start_ts, end_ts)]
+
+    def search(self, query, limit=None):
+        return [self.events[self.index[event_id]] for _, event_id in self._search_index().search(query, limit)]
+
+    def iter_recurring(self):
+        return (event for event in self.events if event.get('recurring'))
+
+    def iter_spans(self):
+        """(id, start_ts, end_ts) of every event"""
+        return ((event.id, event.start_ts, event.end_ts) for event in self.events)
+
+
+class SQLiteStore:
+    """Events in an SQLite database in WAL mode, indexed on id and start time, searched with FTS5"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            id TEXT PRIMARY KEY,
+            start_ts REAL NOT NULL,
+            end_ts REAL,
+            recurring TEXT,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS events_start ON events (start_ts, id);
+        CREATE INDEX IF NOT EXISTS events_recurring ON events (recurring) WHERE recurring IS NOT NULL;
+    """
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_words USING fts5(
+            title, description, content='events', content_rowid='rowid');
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_grams USING fts5(
+            title, description, content='events', content_rowid='rowid', tokenize='trigram');
+        CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_words (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+            INSERT INTO events_grams (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+            INSERT INTO events_words (events_words, rowid, title, description)
+                VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO events_grams (events_grams, rowid, title, description)
+                VALUES ('delete', old.rowid, old.title, old.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE ON events BEGIN
+            INSERT INTO events_words (events_words, rowid, title, description)
+                VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO events_grams (events_grams, rowid, title, description)
+                VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO events_words (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+            INSERT INTO events_grams (rowid, title, description) VALUES (new.rowid, new.title, new.description);
+        END;
+    """
+    SPAN_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_spans USING rtree(id, start_ts, end_ts);
+        CREATE TRIGGER IF NOT EXISTS events_spans_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_spans VALUES (new.rowid, MIN(new.start_ts, new.end_ts), MAX(new.start_ts, new.end_ts));
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_spans_delete AFTER DELETE ON events BEGIN
+            DELETE FROM events_spans WHERE id = old.rowid;
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_spans_update AFTER UPDATE OF start_ts, end_ts ON events BEGIN
+            DELETE FROM events_spans WHERE id = old.rowid;
+            INSERT INTO events_spans VALUES (new.rowid, MIN(new.start_ts, new.end_ts), MAX(new.start_ts, new.end_ts));
+        END;
+    """
+    UPSERT = """
+        INSERT INTO events (id, start_ts, end_ts, recurring, title, description, data) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET start_ts = excluded.start_ts, end_ts = excluded.end_ts,
+            recurring = excluded.recurring, title = excluded.title, description = excluded.description,
+            data = excluded.data
+    """
+    SHARED_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT NOT NULL,
+            id TEXT NOT NULL,
+            data TEXT,
+            origin TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS reminders_fired (
+            key TEXT PRIMARY KEY,
+            start_ts REAL NOT NULL
+        );
+    """
+    ACQUIRE_LEASE = """
+        INSERT INTO leases (name, holder, expires) VALUES (?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires
+        WHERE leases.holder = excluded.holder OR leases.expires < ?
+    """
+    CHUNK_SIZE = 500
+
+    def __init__(self, events_file, storage_config):
+        self.path = storage_config.get('sqlite_file') or os.path.splitext(events_file)[0] + '.db'
+        self.lock = ReadWriteLock()
+        self.local = threading.local()  # one connection per thread, reused across requests
+        # A shared database logs every change, tagged with the writing store, for the other processes to replay
+        self.shared = storage_config.get('shared', False)
+        self.origin = str(uuid.uuid4())
+        conn = self.connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(self.SCHEMA)
+        if self.shared:
+            self._create_change_log(conn)
+        try:
+            conn.executescript(self.FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5 (or trigram support); search falls back to LIKE scans
+            logger.warning('FTS5 unavailable, using unindexed search: %s', e)
+            self.fts = False
+        self._migrate_end_ts(conn)
+        try:
+            created = not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'events_spans'").fetchone()
+            with conn:
+                conn.executescript(self.SPAN_SCHEMA)
+                if created:
+                    conn.execute('INSERT INTO events_spans SELECT rowid, MIN(start_ts, end_ts), MAX(start_ts, end_ts) '
+                                 'FROM events')
+            self.rtree = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without R*Tree; overlap queries fall back to scanning start times
+            logger.warning('R*Tree unavailable, using unindexed overlap queries: %s', e)
+            self.rtree = False
+
+    def _create_change_log(self, conn):
+        conn.executescript(self.SHARED_SCHEMA)
+        with conn:
+            # Numbered from the wall clock in milliseconds, like ChangeFeed, so a recreated database
+            # never reuses sequence numbers clients may still hold; IMMEDIATE so workers starting
+            # together seed it once
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) SELECT 'changes', ? "
+                         "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'changes')",
+                         (int(time.time() * 1000),))
+
+    @staticmethod
+    def _migrate_end_ts(conn):
+        """Add and fill the end_ts column in databases created before it existed"""
+        if any(column[1] == 'end_ts' for column in conn.execute('PRAGMA table_info(events)')):
+            return
+        with conn:
+            conn.execute('ALTER TABLE events ADD COLUMN end_ts REAL')
+            rows = conn.execute('SELECT id, data FROM events').fetchall()
+            conn.executemany('UPDATE events SET end_ts = ? WHERE id = ?',
+                             ((Event.from_dict(json.loads(data)).end_ts, event_id) for event_id, data in rows))
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # Statements are prepared once per connection and reused from its statement cache
+            conn = sqlite3.connect(self.path, timeout=30, cached_statements=256)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(event):
+        return (event.id, event.start_ts, event.end_ts, event.recurring or None, event.title, event.description,
+                json.dumps(event.to_dict(), default=str))
+
+    @property
+    def events(self):
+        """All events in storage order"""
+        return [Event.from_dict(json.loads(data))
+                for data, in self.connection().execute('SELECT data FROM events ORDER BY rowid')]
+
+    def __len__(self):
+        return self.connection().execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+    def index_sizes(self):
+        """The indexes live inside SQLite, so there is nothing in memory to report"""
+        return {}
+
+    def get(self, event_id):
+        row = self.connection().execute('SELECT data FROM events WHERE id = ?', (event_id,)).fetchone()
+        return Event.from_dict(json.loads(row[0])) if row else None
+
+    @contextmanager
+    def transaction(self):
+        """Commit on exit, unless running inside batch() which commits once for the whole block"""
+        conn = self.connection()
+        if getattr(self.local, 'batching', False):
+            yield conn
+        else:
+            with conn:
+                yield conn
+
+    @contextmanager
+    def batch(self):
+        """Run the mutations made inside the block in a single transaction"""
+        with self.connection():
+            self.local.batching = True
+            try:
+                yield
+            finally:
+                self.local.batching = False
+
+    def _log_changes(self, conn, changes):
+        """Append (op, id, data) changes to the change log of a shared database, in the caller's transaction"""
+        if self.shared:
+            conn.executemany('INSERT INTO changes (op, id, data, origin) VALUES (?, ?, ?, ?)',
+                             ((op, event_id, data, self.origin) for op, event_id, data in changes))
+
+    def insert(self, event):
+        with self.transaction() as conn:
+            row = self._row(event)
+            conn.execute(self.UPSERT, row)
+            self._log_changes(conn, [('put', event.id, row[-1])])
+
+    def update(self, event, changed):
+        self.insert(event)
+
+    def import_events(self, events):
+        """Insert or replace many events in a single transaction; returns the count"""
+        rows = [self._row(event) for event in events]
+        with self.connection() as conn:
+            cursor = conn.executemany(self.UPSERT, rows)
+            count = cursor.rowcount
+            self._log_changes(conn, (('put', row[0], row[-1]) for row in rows))
+        return count
+
+    def delete(self, event_id):
+        with self.transaction() as conn:
+            row = conn.execute('SELECT data FROM events WHERE id = ?', (event_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM events WHERE id = ?', (event_id,))
+            self._log_changes(conn, [('delete', event_id, None)])
+        return Event.from_dict(json.loads(row[0]))
+
+    def change_seq(self):
+        """The sequence number of the latest change logged by any process"""
+        row = self.connection().execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def changes_since(self, seq):
+        """(seq, op, id, event or None, origin) of each logged change after seq, in order"""
+        rows = self.connection().execute('SELECT seq, op, id, data, origin FROM changes WHERE seq > ? ORDER BY seq',
+                                         (seq,))
+        return [(seq, op, event_id, Event.from_dict(json.loads(data)) if data else None, origin)
+                for seq, op, event_id, data, origin in rows]
+
+    def trim_changes(self, keep):
+        """Drop all but the latest keep changes from the log, and fired reminders over a day old"""
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM changes WHERE seq <= ?', (self.change_seq() - keep,))
+            conn.execute('DELETE FROM reminders_fired WHERE start_ts < ?', (time.time() - 86400,))
+
+    def acquire_lease(self, name, ttl):
+        """Take or renew the named lease for this store unless another holds it unexpired; its expiry, or None"""
+        now = time.time()
+        conn = self.connection()
+        row = conn.execute('SELECT holder, expires FROM leases WHERE name = ?', (name,)).fetchone()
+        if row and row[0] != self.origin and row[1] >= now:
+            return None  # checked first so standby processes only read while the holder is alive
+        expires = now + ttl
+        with self.transaction() as conn:
+            acquired = conn.execute(self.ACQUIRE_LEASE, (name, self.origin, expires, now)).rowcount
+        return expires if acquired else None
+
+    def fired_reminders(self):
+        """key -> start_ts of the reminders any process sharing the database has sent"""
+        return dict(self.connection().execute('SELECT key, start_ts FROM reminders_fired'))
+
+    def claim_reminder(self, key, start_ts):
+        """Record a reminder as sent; False if some process sharing the database already sent it"""
+        with self.transaction() as conn:
+            return conn.execute('INSERT OR IGNORE INTO reminders_fired (key, start_ts) VALUES (?, ?)',
+                                (key, start_ts)).rowcount == 1
+
+    def start_ts(self, event_id):
+        row = self.connection().execute('SELECT start_ts FROM events WHERE id = ?', (event_id,)).fetchone()
+        return row[0] if row else None
+
+    def key(self, event_id):
+        return (self.start_ts(event_id), event_id)
+
+    def iter_events(self, after=None):
+        conn = self.connection()
+        while True:
+            if after is None:
+                rows = conn.execute('SELECT start_ts, id, data FROM events ORDER BY start_ts, id LIMIT ?',
+                                    (self.CHUNK_SIZE,)).fetchall()
+            else:
+                rows = conn.execute('SELECT start_ts, id, data FROM events WHERE (start_ts, id) > (?, ?) '
+                                    'ORDER BY start_ts, id LIMIT ?', (after[0], after[1], self.CHUNK_SIZE)).fetchall()
+            if not rows:
+                return
+            for _, _, data in rows:
+                yield Event.from_dict(json.loads(data))
+            after = rows[-1][:2]
+
+    def range(self, start_ts, end_ts):
+        rows = self.connection().execute(
+            'SELECT start_ts, data FROM events WHERE start_ts BETWEEN ? AND ? ORDER BY start_ts, id',
+            (start_ts, end_ts))
+        return [(ts, Event.from_dict(json.loads(data))) for ts, data in rows]
+
+    def overlapping(self, start_ts, end_ts):
+        """(start_ts, end_ts, event) of every event overlapping [start_ts, end_ts)"""
+        if self.rtree:
+            # R*Tree bounds are rounded outwards to 32-bit floats, so candidates are re-checked exactly
+            rows = self.connection().execute(
+                'SELECT data FROM events WHERE rowid IN '
+                '(SELECT id FROM events_spans WHERE start_ts <= ? AND end_ts >= ?)', (end_ts, start_ts))
+        else:
+            rows = self.connection().execute('SELECT data FROM events WHERE start_ts < ? AND end_ts > ?',
+                                             (end_ts, start_ts))
+        events = (Event.from_dict(json.loads(data)) for data, in rows)
+        return [(event.start_ts, event.end_ts, event) for event in events
+                if event.start_ts < end_ts and event.end_ts > start_ts]
+
+    def search(self, query, limit=None):
+        query = query.lower()
+        terms = SearchIndex.TOKEN_RE.findall(query)
+        conn = self.connection()
+        if self.fts and len(query) >= 3:
+            # Substring candidates from the trigram table, all-terms-prefix candidates from the word table
+            phrase = '"' + query.replace('"', '""') + '"'
+            sql = 'SELECT rowid FROM events_grams WHERE events_grams MATCH ?'
+            params = [phrase]
+            if terms:
+                sql += ' UNION SELECT rowid FROM events_words WHERE events_words MATCH ?'
+                params.append(' AND '.join(f'"{term}"*' for term in terms))
+            rows = conn.execute(f'SELECT title, description, data FROM events WHERE rowid IN ({sql})', params)
+        else:
+            rows = conn.execute('SELECT title, description, data FROM events')
+        matches = []
+        for title, description, data in rows:
+            title, description = title.lower(), description.lower()
+            score = SearchIndex.score(query, terms, title, description,
+                                      set(SearchIndex.TOKEN_RE.findall(title)),
+                                      set(SearchIndex.TOKEN_RE.findall(description)))
+            if score:
+                matches.append((score, data))
+        matches.sort(key=lambda match: -match[0])
+        if limit is not None:
+            matches = matches[:limit]
+        return [Event.from_dict(json.loads(data)) for _, data in matches]
+
+    def iter_recurring(self):
+        for data, in self.connection().execute('SELECT data FROM events WHERE recurring IS NOT NULL'):
+            yield Event.from_dict(json.loads(data))
+
+    def iter_spans(self):
+        """(id, start_ts, end_ts) of every event, read from the indexed columns without decoding events"""
+        return self.connection().execute('SELECT id, start_ts, end_ts FROM events')
+
+
+STORAGE_BACKENDS = {
+    'json': JSONStore,
+    'sqlite': SQLiteStore
+}
+
+
+class ConflictError(ValueError):
+    """Raised when an event would overlap existing events; carries them in .events"""
+
+    def __init__(self, events):
+        super().__init__('Event conflicts with existing events')
+        self.events = events
+
+
+class QuotaError(ValueError):
+    """Raised when a write would take a calendar past its max_events quota"""
+
+
+class EventScheduler:
+    def __init__(self, events_file=None, storage_config=None, email=None, lazy=False, run_reminders=None,
+                 calendar=None, settings=None):
+        self.events_file = events_file or EVENTS_FILE
+        self.calendar = calendar or CALENDAR_CONFIG['default']
+        self.settings = settings or {}  # per-calendar recipients and quotas; replaced whole, never mutated
+        self.email = email or email_delivery
+        self.storage_config = dict(STORAGE_CONFIG, **(storage_config or {}))
+        self.shared = self.storage_config['shared']
+        if self.shared and self.storage_config['backend'] != 'sqlite':
+            raise ValueError('A shared store needs the sqlite backend')
+        self.run_reminders = REMINDER_CONFIG['enabled'] if run_reminders is None else run_reminders
+        self.recurrence = RecurrenceEngine()
+        self.changes = ChangeFeed()
+        self.reminders = None  # the dispatcher, in the process that runs reminders
+        self.actions = None    # and the pools running the actions of the reminders it sends
+        self.projection = None  # columnar start and end times for /api/stats, built on first use
+        self._projection_lock = threading.Lock()
+        self.count = None  # events in the store for quota checks, counted once and then kept under the write lock
+        self.loop = None  # when serving ASGI, the event loop reminders run on as a task
+        self.reminder_task = None
+        self._store = None
+        self._load_lock = threading.Lock()
+        self._reminder_lock_file = None
+        self.lease_expires = 0  # when this process's reminder lease on a shared store runs out
+        if not lazy:
+            self.load()
+    
+    @property
+    def store(self):
+        store = self._store
+        if store is None:
+            store = self.load()
+        return store
+    
+    @property
+    def lock(self):
+        """The store's reader-writer lock: readers share it, writers are serialized"""
+        return self.store.lock
+    
+    def load(self):
+        """Open the store and build the recurrence and reminder state; later calls return the store"""
+        with self._load_lock:
+            if self._store is None:
+                store = STORAGE_BACKENDS[self.storage_config['backend']](self.events_file, self.storage_config)
+                if self.shared:
+                    # Read first: changes logged while the state below is built are replayed again by sync()
+                    self.changes.reset(store.change_seq())
+                self.recurrence.rebuild(store.iter_recurring())
+                if self._claim_reminders(store):
+                    self.reminders = ReminderDispatcher(self, self.events_file + '.reminders')
+                # Writers wait until the heap is rebuilt, so none of their changes is missed
+                with store.lock.read():
+                    self._store = store
+                    if self.reminders:
+                        self.reminders.rebuild()
+                if self.reminders:
+                    self.start_reminder_thread()
+                if self.shared and self.storage_config['sync_interval']:
+                    threading.Thread(target=self._sync_loop, daemon=True).start()
+        return self._store
+    
+    def _claim_reminders(self, store):
+        """Whether this process runs reminders; with single_process only the holder of the lock file does,
+        and with a shared store only the holder of its lease"""
+        if not self.run_reminders:
+            return False
+        if self.shared:
+            return self._renew_lease(store)
+        if not REMINDER_CONFIG['single_process'] or fcntl is None:
+            return True
+        lock_file = open(self.events_file + '.reminders.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            logger.info('Reminders run in another process')
+            return False
+        self._reminder_lock_file = lock_file  # held until the process exits
+        return True
+    
+    def _renew_lease(self, store):
+        expires = store.acquire_lease('reminders', self.storage_config['lease_ttl'])
+        self.lease_expires = expires or 0
+        return expires is not None
+    
+    def leads_reminders(self):
+        """Whether this process may send reminders now: always, unless it shares a store without holding its lease"""
+        return not self.shared or time.time() < self.lease_expires
+    
+    def _lead_reminders(self):
+        """Renew the reminder lease halfway through its term, or take it over once it expires.
+
+        A process that becomes the leader rebuilds its heap from the database,
+        since the reminders it skipped while on standby were never queued.
+        """
+        leading, held = self.leads_reminders(), self.lease_expires > 0
+        if leading and time.time() < self.lease_expires - self.storage_config['lease_ttl'] / 2:
+            return
+        if not self._renew_lease(self.store):
+            if held:
+                logger.warning('Lost the reminder lease', extra={'calendar': self.calendar})
+            return
+        if leading:
+            return  # renewed in time; a lapsed lease, even if retaken, dropped reminders meanwhile
+        logger.info('Took over reminders', extra={'calendar': self.calendar})
+        started = self.reminders is None
+        if started:
+            self.reminders = ReminderDispatcher(self, self.events_file + '.reminders')
+        with self.lock.read():
+            self.reminders.rebuild()
+        if started:
+            self.start_reminder_thread()
+    
+    def sync(self):
+        """Apply the changes other processes made to a shared store since the last sync (loading it first)"""
+        if not self.shared or self.store.change_seq() <= self.changes.seq:
+            return
+        with self.lock.write():
+            self._sync()
+    
+    def _sync(self):
+        """Replay the shared change log into the change feed, recurrence and reminders (callers hold the write lock).
+
+        This process's own changes are already applied and only join the feed
+        here, so every process numbers the feed alike, by the log's seq.
+        """
+        changes = self.store.changes_since(self.changes.seq)
+        if changes and changes[0][0] != self.changes.seq + 1:
+            # Fell behind further than the log is kept: rebuild, and clients reload
+            logger.warning('Change log trimmed past this process, reloading', extra={'calendar': self.calendar})
+            self.recurrence.rebuild(self.store.iter_recurring())
+            self.projection = self.count = None
+            if self.reminders:
+                self.reminders.rebuild()
+            self.changes.reset(changes[-1][0])
+            return
+        for seq, op, event_id, event, origin in changes:
+            if origin != self.store.origin:
+                self.count = None  # a put may be an insert or an update
+                self.recurrence.remove(event_id)
+                if op == 'put':
+                    self.recurrence.add(event)
+                    if self.reminders:
+                        self.reminders.schedule_event(event)
+                self._reproject(event_id, event)
+            self.changes.record(op, event or {'id': event_id}, seq)
+    
+    def _sync_loop(self):
+        """Poll the shared change log, hold or contend for the reminder lease, and trim the log now and then"""
+        trimmed = time.time()
+        while True:
+            time.sleep(self.storage_config['sync_interval'])
+            try:
+                self.sync()
+                if self.run_reminders:
+                    self._lead_reminders()
+                if time.time() - trimmed > self.storage_config['compact_interval']:
+                    self.store.trim_changes(CHANGE_FEED_SIZE)
+                    trimmed = time.time()
+            except Exception:
+                logger.exception('Error syncing the shared store')
+    
+    @contextmanager
+    def _writing(self):
+        """The write lock; on a shared store, caught up with other processes' changes before and after the write"""
+        with self.lock.write():
+            if self.shared:
+                self._sync()
+            yield
+            if self.shared:
+                self._sync()
+    
+    @property
+    def events(self):
+        """All events in storage order"""
+        with self.lock.read():
+            return list(self.store.events)
+    
+    def _record_change(self, op, event):
+        """Publish a mutation to the change feed (a shared store's is fed by _sync) and reminders"""
+        if not self.shared:
+            self.changes.record(op, event)
+        if op == 'put' and self.reminders:
+            self.reminders.schedule_event(event)
+    
+    @staticmethod
+    def _new_event(title, description, start_time, end_time, recurring=None, reminders=None,
+                   exceptions=None, recurrence_end=None, recipients=None, timezone=None):
+        times = normalize_times({'start_time': start_time, 'end_time': end_time, 'exceptions': exceptions,
+                                 'recurrence_end': recurrence_end, 'timezone': timezone})
+        return Event(
+            id=str(uuid.uuid4()),
+            title=title,
+            description=description,
+            start_time=times['start_time'],
+            end_time=times['end_time'],
+            recurring=recurring,
+            exceptions=times['exceptions'],
+            recurrence_end=times['recurrence_end'],
+            reminders=reminders,
+            recipients=recipients,
+            timezone=timezone,
+            created_at=datetime.now().isoformat()
+        )
+    
+    def _check_quota(self, adding):
+        """Raise QuotaError unless the calendar can hold adding more events (callers hold the write lock)"""
+        limit = self.settings.get('max_events')
+        if limit is None:
+            return
+        if self.count is None:
+            self.count = len(self.store)  # a full scan on SQLite, so only when the count is unknown
+        if self.count + adding > limit:
+            raise QuotaError(f'Calendar quota exceeded: at most {limit} events')
+    
+    def _reproject(self, event_id, event=None):
+        """Keep the stats projection, once built, in step with a changed or deleted event (under the write lock)"""
+        if self.projection is None:
+            return
+        self.projection.remove(event_id)
+        if event is not None and event_id not in self.recurrence.series:
+            self.projection.add(event)
+    
+    def _insert(self, event):
+        self.store.insert(event)
+        if self.count is not None:
+            self.count += 1
+        self.recurrence.add(event)
+        self._reproject(event.id, event)
+        self._record_change('put', event)
+    
+    def add_event(self, title, description, start_time, end_time, recurring=None, reminders=None,
+                  exceptions=None, recurrence_end=None, recipients=None, timezone=None, reject_conflicts=False):
+        """Add a new event; with reject_conflicts, raise ConflictError instead if it overlaps another"""
+        event = self._new_event(title, description, start_time, end_time, recurring, reminders,
+                                exceptions, recurrence_end, recipients, timezone)
+        if reject_conflicts:
+            # Expanding a new series against a year of events is slow, so candidates are found
+            # under the read lock and only what changed since is re-checked under the write lock
+            spans = self._candidate_spans(event)
+            window = (spans[0][0], spans[-1][1]) if spans else (0, 0)
+            with self.lock.read():
+                seq = self.changes.seq
+                conflicts = self._conflicts_with(spans, self._overlapping(*window)) if spans else {}
+        with self._writing():
+            self._check_quota(1)
+            if reject_conflicts and spans:
+                changes = self.changes.since(seq)
+                if changes is None:
+                    conflicts = self._conflicts_with(spans, self._overlapping(*window))
+                for event_id in {change.get('id') or change['event']['id'] for change in changes or ()}:
+                    conflicts.pop(event_id, None)
+                    other = self.store.get(event_id)
+                    if other is not None:
+                        conflicts.update(self._conflicts_with(spans, self._event_spans(other, *window)))
+                if conflicts:
+                    raise ConflictError(list(conflicts.values()))
+            self._insert(event)
+        return event
+    
+    def add_events(self, items):
+        """Add many events (dicts of add_event arguments) under one lock, persisting once"""
+        events = [self._new_event(**item) for item in items]
+        with self._writing():
+            self._check_quota(len(events))
+            with self.store.batch():
+                for event in events:
+                    self._insert(event)
+        return events
+    
+    def import_events(self, events):
+        """Insert or replace events by id under one lock, persisting once.
+
+        Returns the ids (created, updated, unchanged); an event whose
+        client-settable fields already match is left alone, so importing the
+        same data again changes nothing and records no change.
+        """
+        created, updated, unchanged = [], [], []
+        with self._writing():
+            self._check_quota(sum(1 for event in events if self.store.get(event['id']) is None))
+            with self.store.batch():
+                for event in events:
+                    existing = self.store.get(event['id'])
+                    if existing is None:
+                        self._insert(event)
+                        created.append(event['id'])
+                        continue
+                    changes = {field: event[field] for field in EVENT_ARGUMENTS if event[field] != existing[field]}
+                    if changes:
+                        self._update(event['id'], changes)
+                        updated.append(event['id'])
+                    else:
+                        unchanged.append(event['id'])
+        return created, updated, unchanged
+    
+    def get_all_events(self):
+        """Get all events sorted by start time"""
+        with self.lock.read():
+            return list(self.store.iter_events())
+    
+    def iter_events(self, after=None, chunk_size=500):
+        """Lazily yield events in start time order after a (start_ts, id) key.
+
+        The read lock is held only while each chunk is fetched, so a slow
+        consumer such as a streaming response never blocks writers.
+        """
+        while True:
+            with self.lock.read():
+                chunk = list(itertools.islice(self.store.iter_events(after), chunk_size))
+                if chunk:
+                    after = self.store.key(chunk[-1]['id'])
+            if not chunk:
+                return
+            yield from chunk
+    
+    def get_events_page(self, after=None, limit=DEFAULT_PAGE_SIZE):
+        """Get one page of events after a (start_ts, id) key and the key to continue from"""
+        with self.lock.read():
+            events = list(itertools.islice(self.store.iter_events(after), limit + 1))
+            if len(events) <= limit:
+                return events, None
+            events = events[:limit]
+            return events, self.store.key(events[-1]['id'])
+    
+    def get_event_by_id(self, event_id):
+        """Get event by ID"""
+        with self.lock.read():
+            return self.store.get(event_id)
+    
+    def _update(self, event_id, changes):
+        event = self.store.get(event_id)
+        if not event:
+            return None
+        # Only client-settable fields change; id and created_at are read-only
+        changes = {key: value for key, value in changes.items() if key in EVENT_ARGUMENTS}
+        if any(field in changes for field in TIME_FIELDS):
+            # A new timezone re-expresses the times in it: naive ones were wall-clock times
+            times = normalize_times({field: changes.get(field, event[field]) for field in TIME_FIELDS})
+            if 'timezone' in changes:
+                changes.update(times)
+            else:
+                changes.update((field, times[field]) for field in changes if field in TIME_FIELDS)
+        changed = set(changes)
+        # Copy on write: readers holding the old event keep a consistent snapshot
+        event = event.replace(**changes)
+        self.store.update(event, changed)
+        if changed.intersection(RECURRENCE_FIELDS):
+            self.recurrence.remove(event_id)
+            self.recurrence.add(event)
+            self._reproject(event_id, event)
+        self._record_change('put', event)
+        return event
+    
+    def update_event(self, event_id, **kwargs):
+        """Update an existing event"""
+        with self._writing():
+            return self._update(event_id, kwargs)
+    
+    def update_events(self, updates):
+        """Apply many (event_id, changes) updates under one lock, persisting once; None marks a missing event"""
+        with self._writing(), self.store.batch():
+            return [self._update(event_id, changes) for event_id, changes in updates]
+    
+    def _delete(self, event_id):
+        event = self.store.delete(event_id)
+        if event is None:
+            return False
+        if self.count is not None:
+            self.count -= 1
+        self.recurrence.remove(event_id)
+        self._reproject(event_id)
+        self._record_change('delete', event)
+        return True
+    
+    def delete_event(self, event_id):
+        """Delete an event"""
+        with self._writing():
+            return self._delete(event_id)
+    
+    def delete_events(self, event_ids):
+        """Delete many events under one lock, persisting once; returns whether each one existed"""
+        with self._writing(), self.store.batch():
+            return [self._delete(event_id) for event_id in event_ids]
+    
+    def search_events(self, query, limit=None):
+        """Search events by title or description, best matches first"""
+        with self.lock.read():
+            return self.store.search(query, limit)
+    
+    def get_occurrences(self, start_ts, end_ts):
+        """Get events and expanded recurring occurrences starting within [start_ts, end_ts], in order"""
+        with self.lock.read():
+            series = self.recurrence.series
+            occurrences = [(ts, event) for ts, event in self.store.range(start_ts, end_ts)
+                           if event['id'] not in series]
+            for event_id in list(series):
+                event = self.store.get(event_id)
+                if event is None:
+                    continue
+                occurrences.extend((ts, self.recurrence.occurrence(event, ts))
+                                   for ts in self.recurrence.iter_between(event_id, start_ts, end_ts))
+        occurrences.sort(key=lambda item: item[0])
+        return [event for _, event in occurrences]
+    
+    def _event_spans(self, event, start_ts, end_ts):
+        """(start_ts, end_ts, event) of a stored event, or of its occurrences, overlapping [start_ts, end_ts)"""
+        series = self.recurrence.series.get(event['id'])
+        if series is None:
+            if event.start_ts < end_ts and event.end_ts > start_ts:
+                yield event.start_ts, event.end_ts, event
+            return
+        duration = series[2]
+        for ts in self.recurrence.iter_between(event['id'], start_ts - duration, end_ts):
+            if ts < end_ts and ts + duration > start_ts:
+                yield ts, ts + duration, self.recurrence.occurrence(event, ts)
+    
+    def _overlapping(self, start_ts, end_ts):
+        """(start_ts, end_ts, event) of events and occurrences overlapping [start_ts, end_ts), in order"""
+        series = self.recurrence.series
+        spans = [span for span in self.store.overlapping(start_ts, end_ts) if span[2]['id'] not in series]
+        for event_id in list(series):
+            event = self.store.get(event_id)
+            if event is not None:
+                spans.extend(self._event_spans(event, start_ts, end_ts))
+        spans.sort(key=lambda span: (span[0], span[2]['id']))
+        return spans
+    
+    @staticmethod
+    def _candidate_spans(event):
+        """(start_ts, end_ts) of a new event, or of each occurrence within RECURRENCE_CONFLICT_HORIZON, in order"""
+        try:
+            built = RecurrenceEngine.build(event)
+        except ValueError:
+            built = None
+        if not built:
+            return [(event.start_ts, event.end_ts)]
+        rules, dtstart, end_ts = built
+        duration = event.end_ts - dtstart.timestamp()
+        horizon = min(end_ts, dtstart.timestamp() + RECURRENCE_CONFLICT_HORIZON)
+        return [(start.timestamp(), start.timestamp() + duration)
+                for start in rules.between(dtstart, from_timestamp(horizon, dtstart), inc=True)]
+    
+    @staticmethod
+    def _conflicts_with(spans, others):
+        """Events of other (start_ts, end_ts, event) spans overlapping any of spans, by id.
+
+        spans come from _candidate_spans: sorted and all one length, so the
+        last span starting before another ends is the only one that can reach it.
+        """
+        starts = [start for start, _ in spans]
+        conflicts = {}
+        for start, end, other in others:
+            i = bisect.bisect_left(starts, end) - 1
+            if i >= 0 and spans[i][1] > start:
+                conflicts.setdefault(other['id'], other)
+        return conflicts
+    
+    def find_conflicts(self, start_ts, end_ts):
+        """Events and occurrences overlapping [start_ts, end_ts), in start time order"""
+        with self.lock.read():
+            return [event for _, _, event in self._overlapping(start_ts, end_ts)]
+    
+    def get_busy(self, start_ts, end_ts):
+        """Merged (start_ts, end_ts) busy intervals within [start_ts, end_ts), in order"""
+        with self.lock.read():
+            spans = self._overlapping(start_ts, end_ts)
+        busy = []
+        for start, end, _ in spans:
+            start, end = max(start, start_ts), min(end, end_ts)
+            if busy and start <= busy[-1][1]:
+                busy[-1][1] = max(busy[-1][1], end)
+            else:
+                busy.append([start, end])
+        return [tuple(interval) for interval in busy]
+    
+    def _stats_projection(self):
+        """The stats projection of the events that don't recur, built on first use (callers hold the read lock)"""
+        if self.projection is None:
+            with self._projection_lock:
+                if self.projection is None:
+                    series = self.recurrence.series
+                    self.projection = StatsProjection(span for span in self.store.iter_spans()
+                                                      if span[0] not in series)
+        return self.projection
+    
+    def _occurrence_spans(self, start_ts, end_ts):
+        """((id, start_ts), start_ts, end_ts) of occurrences overlapping [start_ts, end_ts]"""
+        for event_id, series in list(self.recurrence.series.items()):
+            duration = series[2]
+            for ts in self.recurrence.iter_between(event_id, start_ts - duration, end_ts):
+                yield (event_id, ts), ts, ts + duration
+    
+    def span_stats(self, boundaries):
+        """(events starting, booked seconds) between each pair of consecutive sorted epoch boundaries.
+
+        Occurrences of recurring events count as events. Booked time is the
+        part of each event inside the period, so overlapping events each count.
+        """
+        points = [int(ts * 1000) for ts in boundaries]
+        with self.lock.read():
+            totals = self._stats_projection().ranks(points)
+            occurrences = StatsProjection(self._occurrence_spans(boundaries[0], boundaries[-1]))
+        if occurrences:
+            totals = [[a + b for a, b in zip(*at_point)] for at_point in zip(totals, occurrences.ranks(points))]
+        # Time booked before t: what started before t runs until t, less what had already ended by then
+        booked = [t * started - starts - t * ended + ends for t, (started, starts, ended, ends) in zip(points, totals)]
+        return [(totals[i + 1][0] - totals[i][0], (booked[i + 1] - booked[i]) / 1000) for i in range(len(points) - 1)]
+    
+    def stats(self):
+        """Sizes of the store, indexes and reminder state; empty until the store is loaded"""
+        store = self._store
+        if store is None:
+            return {}
+        with store.lock.read():
+            stats = {'events': len(store), 'index_sizes': store.index_sizes()}
+        stats['recurring_series'] = len(self.recurrence.series)
+        stats['recurrence_cache'] = len(self.recurrence.cache)
+        stats['change_seq'] = self.changes.seq
+        if self.projection is not None:
+            stats['stats_projection'] = len(self.projection)
+        if self.shared:
+            stats['reminders_leader'] = self.leads_reminders()
+        if self.reminders:
+            stats['reminders_pending'] = len(self.reminders.heap)
+            stats['reminders_fired'] = len(self.reminders.fired)
+        if self.actions:
+            stats['reminder_actions_retrying'] = self.actions.metrics()['retrying']
+        return stats
+    
+    def get_upcoming_events(self, hours=1):
+        """Get events due within specified hours"""
+        try:
+            now = time.time()
+            # Events (and occurrences) that start within the next 'hours' hours and haven't started yet
+            return self.get_occurrences(now, now + hours * 3600)
+        except Exception:
+            logger.exception('Error getting upcoming events')
+            return []
+    
+    def send_email_notification(self, event):
+        """Queue an email notification for event reminder; returns whether it was queued"""
+        try:
+            # The event's own recipients, else the calendar's, else the sender itself (the demo default)
+            recipients = event.get('recipients') or self.settings.get('recipients') or [EMAIL_CONFIG['sender_email']]
+            msg = MIMEMultipart()
+            msg['From'] = EMAIL_CONFIG['sender_email']
+            msg['To'] = ', '.join(recipients)
+            msg['Subject'] = f"Event Reminder: {event['title']}"
+            
+            body = f"""
+            Event Reminder!
+            
+            Title: {event['title']}
+            Description: {event['description']}
+            Start Time: {event['start_time']}
+            End Time: {event['end_time']}
+            
+            Don't forget your event!
+            """
+            
+            msg.attach(MIMEText(body, 'plain'))
+            
+            text = msg.as_string()
+            if self.email.submit(EMAIL_CONFIG['sender_email'], recipients, text):
+                logger.info('Email notification queued', extra={'event_id': event['id']})
+                return True
+            logger.warning('Email queue full, dropped notification', extra={'event_id': event['id']})
+        except Exception:
+            logger.exception('Error sending email notification')
+        return False
+    
+    def send_reminder(self, event, start_ts, fire_ts):
+        """Hand a due reminder to the actions in REMINDER_CONFIG['actions'], which run in the background"""
+        self.actions.submit({'calendar': self.calendar, 'event': dict(event), 'start_ts': start_ts,
+                             'fire_ts': fire_ts})
+    
+    def check_reminders(self):
+        """Check for upcoming events and send reminders"""
+        try:
+            upcoming = self.get_upcoming_events(1)  # Next hour
+            logger.info('Reminder check found %d upcoming event(s) in the next hour', len(upcoming))
+            for event in upcoming:
+                minutes_until = int((to_timestamp(event['start_time']) - time.time()) / 60)
+                logger.info('Upcoming: %s starts in %d minutes', event['title'], minutes_until,
+                            extra={'event_id': event['id'], 'start_time': event['start_time']})
+        except Exception:
+            logger.exception('Error checking reminders')
+    
+    def start_reminder_thread(self):
+        """Start dispatching reminders as they fall due: as a task on self.loop if set, else in a thread"""
+        if self.actions is None:
+            self.actions = ReminderActions(self, REMINDER_CONFIG['actions'], self.events_file + '.actions',
+                                           self.events_file + '.deadletter')
+        if self.loop is not None:
+            self.reminder_task = asyncio.run_coroutine_threadsafe(self.reminders.run_async(), self.loop)
+        else:
+            thread = threading.Thread(target=self.reminders.run, daemon=True)
+            thread.start()
+        logger.info('Reminder system initialized', extra={'calendar': self.calendar})
+
+
+class Calendars:
+    """One EventScheduler per calendar, each with its own store, indexes, change feed and reminders.
+
+    The default calendar lives in events.json itself, so existing data stays
+    where it is; any other calendar is a shard under calendars/<name>/ and is
+    opened on first use, so a request for one calendar never touches another.
+    A shard is only created by adding events to it or configuring it; naming
+    an unknown calendar otherwise finds nothing. Settings changed through the
+    API (recipients, quotas) are kept in events.calendars.json.
+    """
+
+    def __init__(self, events_file=None, storage_config=None, run_reminders=None, email=None):
+        self.events_file = events_file or EVENTS_FILE
+        self.storage_config = storage_config or {}
+        self.run_reminders = REMINDER_CONFIG['enabled'] if run_reminders is None else run_reminders
+        self.email = email
+        self.root = os.path.join(os.path.dirname(self.events_file), CALENDAR_CONFIG['directory'])
+        self.settings_file = os.path.splitext(self.events_file)[0] + '.calendars.json'
+        self.schedulers = {}  # name -> EventScheduler
+        self.limits = {}      # name -> (RateLimiter or None, BoundedSemaphore or None)
+        self.overrides = None  # name -> settings changed through the API, read on first use
+        self.discovered = False
+        self.loop = None  # set by asgi_app, so calendars opened later run reminders as tasks on it
+        self.lock = threading.Lock()
+
+    def path(self, name):
+        """The events file of a calendar"""
+        if name == CALENDAR_CONFIG['default']:
+            return self.events_file
+        return os.path.join(self.root, name, os.path.basename(self.events_file))
+
+    def _overrides(self):
+        """Settings changed through the API (callers hold self.lock)"""
+        if self.overrides is None:
+            self.overrides = {}
+            if os.path.exists(self.settings_file):
+                try:
+                    with open(self.settings_file, 'r') as f:
+                        self.overrides = json.load(f)
+                except Exception:
+                    logger.exception('Error loading calendar settings')
+        return self.overrides
+
+    def _settings(self, name):
+        settings = {key: CALENDAR_CONFIG.get(key) for key in CALENDAR_SETTINGS}
+        settings.update(self._overrides().get(name, {}))
+        return settings
+
+    def _limits(self, settings):
+        rate, concurrent = settings['requests_per_second'], settings['max_concurrent']
+        return (RateLimiter(rate * 60, burst=rate) if rate else None,
+                threading.BoundedSemaphore(concurrent) if concurrent else None)
+
+    def settings(self, name):
+        with self.lock:
+            return self._settings(name)
+
+    def _exists(self, name):
+        """Whether a calendar is the default, already open, configured or has a shard (callers hold self.lock)"""
+        return (name == CALENDAR_CONFIG['default'] or name in self.schedulers or name in self._overrides()
+                or os.path.isdir(os.path.join(self.root, name)))
+
+    def exists(self, name):
+        if name in self.schedulers:
+            return True
+        with self.lock:
+            return self._exists(name)
+
+    def get(self, name, create=False):
+        """The scheduler of a calendar, opened (but not loaded) on first use.
+
+        Returns None for a calendar that does not exist yet unless create is
+        set, so reads naming an unknown calendar leave no shard behind.
+        """
+        scheduler = self.schedulers.get(name)
+        if scheduler is not None:
+            return scheduler
+        with self.lock:
+            scheduler = self.schedulers.get(name)
+            if scheduler is None:
+                if not create and not self._exists(name):
+                    return None
+                path = self.path(name)
+                storage_config = dict(self.storage_config)
+                if name != CALENDAR_CONFIG['default']:
+                    storage_config.pop('sqlite_file', None)  # each calendar gets the database next to its file
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                settings = self._settings(name)
+                scheduler = EventScheduler(path, storage_config, email=self.email, lazy=True,
+                                           run_reminders=self.run_reminders, calendar=name, settings=settings)
+                scheduler.loop = self.loop
+                self.limits[name] = self._limits(settings)
+                self.schedulers[name] = scheduler
+        return scheduler
+
+    def discover(self):
+        """On the first request, open every calendar in the background so all of their reminders run"""
+        if self.discovered or not self.run_reminders:
+            return
+        with self.lock:
+            if self.discovered:
+                return
+            self.discovered = True
+        threading.Thread(target=self.load, daemon=True).start()
+
+    def use_loop(self, loop):
+        """Run the reminders of calendars opened from now on as tasks on loop (None goes back to threads)"""
+        with self.lock:
+            self.loop = loop
+            for scheduler in self.schedulers.values():
+                scheduler.loop = loop
+
+    def names(self):
+        """Every calendar: the default, those with a shard on disk, configured ones and those opened since"""
+        names = {CALENDAR_CONFIG['default']}
+        if os.path.isdir(self.root):
+            names.update(name for name in os.listdir(self.root)
+                         if CALENDAR_NAME_RE.fullmatch(name) and os.path.isdir(os.path.join(self.root, name)))
+        with self.lock:
+            names.update(self._overrides())
+        names.update(self.schedulers)
+        return sorted(names)
+
+    def load(self):
+        """Open every calendar, so each one's reminders start"""
+        self.discovered = True
+        for name in self.names():
+            self.get(name).load()
+
+    def configure(self, name, changes):
+        """Create or change a calendar's settings, persisting them and applying them to its scheduler; returns them"""
+        scheduler = self.get(name, create=True)
+        with self.lock:
+            overrides = self._overrides()
+            overrides[name] = dict(overrides.get(name, {}), **changes)
+            write_json_atomic(self.settings_file, overrides)
+            settings = self._settings(name)
+            scheduler.settings = settings
+            self.limits[name] = self._limits(settings)
+        return settings
+
+    def admit(self, name, concurrent=True):
+        """Take one of the calendar's request slots.
+
+        Returns (slot, 0), where slot is the semaphore to release when the
+        request ends (or None when concurrency is unlimited), or (None, seconds)
+        when the calendar is over its rate or concurrency quota. Requests that
+        are not concurrent (they mostly wait) only count against the rate.
+        """
+        self.get(name)
+        limiter, slots = self.limits[name]
+        if limiter:
+            wait = limiter.try_acquire()
+            if wait:
+                return None, wait
+        if not concurrent:
+            return None, 0
+        if slots and not slots.acquire(blocking=False):
+            return None, 1
+        return slots, 0
+
+
+class ResponseCache:
+    """LRU cache of serialized read responses, bounded by entry count and total bytes.
+
+    Each entry records the version of the data it was built from: the
+    calendar's change feed and its seq. Any write to that calendar bumps the
+    seq, so its entries go stale at once while other calendars' stay valid.
+    Time-relative entries also carry an expiry.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (endpoint, calendar, params) -> (version, expires, body)
+        self.bytes = 0
+        self.evictions = 0
+        self.counts = {}  # endpoint -> {'hit': n, 'miss': n}
+        self.lock = threading.Lock()
+
+    def _count(self, endpoint, result):
+        counts = self.counts.setdefault(endpoint, {'hit': 0, 'miss': 0})
+        counts[result] += 1
+
+    def _discard(self, key):
+        _, _, body = self.entries.pop(key)
+        self.bytes -= len(body)
+
+    def get(self, key, version):
+        """The cached body for key if it was built from this version and has not expired, else None"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                cached_version, expires, body = entry
+                if cached_version == version and (expires is None or now < expires):
+                    self.entries.move_to_end(key)
+                    self._count(key[0], 'hit')
+                    return body
+                self._discard(key)
+            self._count(key[0], 'miss')
+            return None
+
+    def put(self, key, version, body, expires=None):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._discard(key)
+            self.entries[key] = (version, expires, body)
+            self.bytes += len(body)
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._discard(next(iter(self.entries)))
+                self.evictions += 1
+
+    def metrics(self):
+        """Entries, bytes, evictions and hit/miss counts per endpoint"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'evictions': self.evictions,
+                'endpoints': {endpoint: dict(counts) for endpoint, counts in self.counts.items()}
+            }
+
+
+def create_app(events_file=None, storage_config=None, run_reminders=None):
+    """Build the Flask app; each calendar's scheduler opens its store on first use, so startup does no I/O"""
+    app = Flask(__name__)
+    CORS(app)
+    app.json = EventJSONProvider(app)
+    calendars = Calendars(events_file, storage_config, run_reminders)
+    app.extensions['calendars'] = calendars
+    app.extensions['scheduler'] = calendars.get(CALENDAR_CONFIG['default'])
+    app.extensions['response_cache'] = (ResponseCache(CACHE_CONFIG['max_entries'], CACHE_CONFIG['max_bytes'])
+                                        if CACHE_CONFIG['enabled'] else None)
+    app.config['PROFILING'] = PROFILE_CONFIG['enabled']
+    app.before_request(start_request_timer)
+    app.before_request(admit_calendar)
+    app.after_request(release_calendar_slot)
+    app.after_request(record_request)
+    app.teardown_request(release_calendar_slot)
+    app.register_blueprint(api)
+    configure_logging()
+    return app
+
+
+def start_request_timer():
+    """Time the request, and profile it when profiling is on and the request asks for it"""
+    g.request_started = time.perf_counter()
+    g.profiler = None
+    if current_app.config['PROFILING'] and (request.headers.get('X-Profile') or request.args.get('profile') == '1'):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def admit_calendar():
+    """Pick the request's calendar and apply its rate and concurrency quotas to /api/events requests"""
+    name = (request.headers.get(CALENDAR_CONFIG['header']) or request.args.get('calendar')
+            or CALENDAR_CONFIG['default'])
+    if not CALENDAR_NAME_RE.fullmatch(name):
+        return jsonify({'success': False, 'error': 'Invalid calendar name'}), 400
+    g.calendar = name
+    calendars = current_app.extensions['calendars']
+    calendars.discover()
+    if not calendars.exists(name):
+        # Only adding or importing events creates a calendar implicitly; anything else finds nothing
+        if not (request.method == 'POST' and request.path.startswith(('/api/events', '/api/calendar/import'))):
+            return jsonify({'success': False, 'error': 'Calendar not found'}), 404
+        calendars.get(name, create=True)
+    scheduler.sync()  # pick up other processes' writes to a shared store before answering
+    if not request.path.startswith('/api/events'):
+        return None
+    # Long polls and streams sit idle waiting for changes, so they would use up max_concurrent
+    slot, retry_after = calendars.admit(name, concurrent=request.path not in CHANGE_WAIT_PATHS)
+    if retry_after:
+        return (jsonify({'success': False, 'error': 'Calendar request quota exceeded'}), 429,
+                {'Retry-After': str(math.ceil(retry_after))})
+    g.calendar_slot = slot
+
+
+def release_calendar_slot(response_or_error=None):
+    """Give back the request's calendar slot once the handler is done (streamed bodies don't hold it)"""
+    slot = g.pop('calendar_slot', None)
+    if slot is not None:
+        slot.release()
+    return response_or_error
+
+
+def record_request(response):
+    """Record latency by route; a profiled request gets the cProfile summary instead of its body"""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - started, request.method, route)
+    REQUESTS.inc(request.method, route, str(response.status_code))
+    profiler = g.get('profiler')
+    if profiler is None:
+        return response
+    profiler.disable()
+    g.profiler = None
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats(PROFILE_CONFIG['sort']).print_stats(PROFILE_CONFIG['limit'])
+    profiled = Response(output.getvalue(), mimetype='text/plain')
+    profiled.headers['X-Profiled-Status'] = str(response.status_code)
+    return profiled
+
+
+def current_scheduler():
+    """The scheduler of the calendar named by the current request, or the default calendar in CLI commands"""
+    return current_app.extensions['calendars'].get(g.get('calendar', CALENDAR_CONFIG['default']))
+
+
+scheduler = LocalProxy(current_scheduler)
+
+
+def cached_json(endpoint, params, build, seq=None, expires=None):
+    """Serve the JSON payload of build() through the response cache.
+
+    Entries are keyed by endpoint, calendar and normalized params. The seq is
+    read before building (or passed in by a caller that already read it), so
+    a racing write can only leave a stale entry behind, never a wrong one.
+    """
+    cache = current_app.extensions['response_cache']
+    feed = scheduler.changes
+    version = (feed, feed.seq if seq is None else seq)
+    key = (endpoint, g.get('calendar', CALENDAR_CONFIG['default']), params)
+    body = cache.get(key, version) if cache else None
+    if body is None:
+        body = current_app.json.response(build()).get_data()
+        if cache:
+            cache.put(key, version, body, expires)
+    return current_app.response_class(body, mimetype='application/json')
+
+
+def params_etag(seq, *params):
+    """An ETag for a response built from seq, distinct per calendar and normalized params"""
+    digest = hashlib.sha1(repr((g.get('calendar', CALENDAR_CONFIG['default']), params)).encode()).hexdigest()
+    return f'{seq}-{digest[:16]}'
+
+
+def encode_cursor(key):
+    """Encode a (start_ts, id) key as an opaque URL-safe cursor"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back to a (start_ts, id) key; raises ValueError if malformed"""
+    try:
+        start_ts, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (float(start_ts), str(event_id))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def parse_limit(value):
+    """Parse a positive integer limit parameter; raises ValueError if invalid"""
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('Invalid limit')
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    return limit
+
+
+def parse_wait(value):
+    """Parse a long poll wait in seconds, 0 when absent; raises ValueError if invalid"""
+    if value is None:
+        return 0
+    try:
+        wait = float(value)
+    except ValueError:
+        raise ValueError('Invalid wait')
+    if not 0 <= wait <= CHANGES_MAX_WAIT:
+        raise ValueError(f'Invalid wait: expected 0 to {CHANGES_MAX_WAIT} seconds')
+    return wait
+
+
+def change_stream_start():
+    """The change feed of the request's calendar and the seq its stream starts after; raises ValueError"""
+    since = request.args.get('since', request.headers.get('Last-Event-ID'))
+    feed = scheduler.changes
+    try:
+        return feed, int(since) if since is not None else feed.seq
+    except ValueError:
+        raise ValueError('Invalid since')
+
+
+def sse_changes(feed, since):
+    """The Server-Sent Events text for the changes after since, and the seq to continue from"""
+    changes = feed.since(since)
+    if changes is None:
+        since = feed.seq
+        return f'id: {since}\nevent: reset\ndata: {{}}\n\n', since
+    text = ''.join(f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change, default=json_default)}\n\n"
+                   for change in changes)
+    return text, changes[-1]['seq'] if changes else since
+
+
+def validate_reminders(value):
+    """Check a reminders value is null or a list of non-negative minute offsets; raises ValueError"""
+    if value is None:
+        return
+    if not isinstance(value, list) or not all(
+            isinstance(offset, (int, float)) and not isinstance(offset, bool) and offset >= 0
+            for offset in value):
+        raise ValueError('Invalid reminders: expected a list of minutes before start')
+
+
+def validate_recipients(value):
+    """Check a recipients value is null or a list of email addresses; raises ValueError"""
+    if value is None:
+        return
+    if not isinstance(value, list) or not all(isinstance(address, str) and '@' in address for address in value):
+        raise ValueError('Invalid recipients: expected a list of email addresses')
+
+
+def parse_window(args):
+    """Parse the start and end query parameters of a time window; raises ValueError"""
+    try:
+        start = parse_datetime(args['start'])
+        end = parse_datetime(args['end'])
+    except (KeyError, TypeError, ValueError, OverflowError):
+        raise ValueError('start and end datetimes are required')
+    if start.timestamp() > end.timestamp():
+        raise ValueError('Start time must be before end time')
+    return start, end
+
+
+def parse_stats_window(args):
+    """The window and period of a /api/stats request, in its ?timezone= (default: the server's); raises ValueError"""
+    start, end = parse_window(args)
+    zone = resolve_timezone(args['timezone']) if args.get('timezone') else tz.tzlocal()
+    period = args.get('period', 'day')
+    if period not in STATS_PERIODS:
+        raise ValueError(f"period must be one of: {', '.join(STATS_PERIODS)}")
+    return localize(start, zone), localize(end, zone), period
+
+
+def period_boundaries(start, end, period):
+    """Local starts of the periods overlapping [start, end), and their boundaries clipped to it; raises ValueError"""
+    zone, start_ts, end_ts = start.tzinfo, start.timestamp(), end.timestamp()
+    first = start.replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    if period == 'week':
+        first -= timedelta(days=first.weekday())
+    elif period == 'month':
+        first = first.replace(day=1)
+    labels, boundaries = [], []
+    # Stepping from the first wall-clock start keeps periods aligned across DST changes and month lengths
+    while True:
+        label = localize(first + STATS_PERIODS[period] * len(labels), zone)
+        label_ts = label.timestamp()
+        if label_ts >= end_ts:
+            break
+        if len(labels) == STATS_MAX_BUCKETS:
+            raise ValueError(f'Window spans more than {STATS_MAX_BUCKETS} periods')
+        labels.append(label)
+        boundaries.append(max(label_ts, start_ts))
+    boundaries.append(end_ts)
+    return labels, boundaries
+
+
+def hour_boundaries(start, end):
+    """Hour of day of each local hour overlapping [start, end), and their boundaries clipped to it; raises ValueError"""
+    zone, start_ts, end_ts = start.tzinfo, start.timestamp(), end.timestamp()
+    day = start.replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    stamps = []  # (hour of day, start of that hour)
+    day_ts = localize(day, zone).timestamp()
+    while day_ts < end_ts:
+        if len(stamps) >= STATS_MAX_BUCKETS:
+            raise ValueError(f'Window spans more than {STATS_MAX_BUCKETS} hours')
+        next_day = day + timedelta(days=1)
+        next_ts = localize(next_day, zone).timestamp()
+        if next_ts - day_ts == 86400:
+            stamps.extend((hour, day_ts + hour * 3600) for hour in range(24))
+        else:  # a DST change: an hour is skipped or repeated
+            stamps.extend((hour, localize(day + timedelta(hours=hour), zone).timestamp()) for hour in range(24))
+        day, day_ts = next_day, next_ts
+    hours, boundaries = [], []
+    for (hour, ts), (_, next_ts) in zip(stamps, stamps[1:] + [(None, float('inf'))]):
+        if next_ts > start_ts and ts < end_ts:
+            hours.append(hour)
+            boundaries.append(max(ts, start_ts))
+    boundaries.append(end_ts)
+    return hours, boundaries
+
+
+def period_stats(endpoint, build):
+    """Serve build(labels, boundaries, stats) for the periods of a /api/stats request, through the response cache"""
+    try:
+        start, end, period = parse_stats_window(request.args)
+        labels, boundaries = period_boundaries(start, end, period)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    params = (start.isoformat(), end.isoformat(), request.args.get('timezone'), period)
+    return cached_json(endpoint, params, lambda: dict(
+        {'success': True, 'period': period, 'timezone': request.args.get('timezone') or 'local'},
+        **build(labels, boundaries, scheduler.span_stats(boundaries))))
+
+
+def validate_types(data):
+    """Check every client-settable field present in data has its declared type; raises ValueError"""
+    for field in EVENT_ARGUMENTS:
+        if field in data and not isinstance(data[field], Event.TYPES[field]):
+            raise ValueError(f'Invalid type for field: {field}')
+
+
+def validate_event(data):
+    """Check the fields of a new event; raises ValueError with the first problem found"""
+    if not isinstance(data, dict):
+        raise ValueError('Expected an event object')
+    for field in ('title', 'description', 'start_time', 'end_time'):
+        if field not in data:
+            raise ValueError(f'Missing required field: {field}')
+    validate_types(data)
+    zone = resolve_timezone(data['timezone']) if data.get('timezone') else None
+    try:
+        start_time = parse_datetime(data['start_time'])
+        end_time = parse_datetime(data['end_time'])
+    except Exception:
+        raise ValueError('Invalid datetime format')
+    if zone:
+        start_time, end_time = localize(start_time, zone), localize(end_time, zone)
+    try:
+        if start_time >= end_time:
+            raise ValueError('Start time must be before end time')
+    except TypeError:
+        raise ValueError('Start and end time must both have a timezone or neither')
+    validate_reminders(data.get('reminders'))
+    validate_recipients(data.get('recipients'))
+    RecurrenceEngine.build(data)
+
+
+def validate_changes(existing, data):
+    """Check the fields of an update to an existing event (or None); raises ValueError.
+
+    id and created_at are accepted so a client can send back a whole event,
+    but they are read-only and ignored; any other unknown field is an error.
+    """
+    for field in data:
+        if field not in EVENT_FIELDS:
+            raise ValueError(f'Unknown field: {field}')
+    validate_types(data)
+    if data.get('timezone'):
+        resolve_timezone(data['timezone'])
+    for field in ('start_time', 'end_time'):
+        if field in data:
+            try:
+                parse_datetime(data[field])
+            except Exception:
+                raise ValueError(f'Invalid {field} format')
+    validate_reminders(data.get('reminders'))
+    validate_recipients(data.get('recipients'))
+    if existing and any(key in data for key in ('start_time', 'end_time', 'timezone')):
+        # A change to one bound is checked against the other, stored one, as update_event will apply it
+        times = normalize_times({field: data.get(field, existing[field]) for field in TIME_FIELDS})
+        if parse_datetime(times['start_time']).timestamp() >= parse_datetime(times['end_time']).timestamp():
+            raise ValueError('Start time must be before end time')
+    if existing and any(key in data for key in RECURRENCE_FIELDS):
+        RecurrenceEngine.build(dict(existing, **data))
+
+
+def iter_lines(stream, chunk_size=65536):
+    """Yield the lines of a byte stream, reading it in large chunks"""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def ics_escape(text):
+    """Escape a TEXT value for an iCalendar content line"""
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def ics_unescape(text):
+    """Undo ics_escape"""
+    return re.sub(r'\\([\\;,nN])', lambda m: '\n' if m.group(1) in 'nN' else m.group(1), text)
+
+
+def ics_line(line):
+    """A content line folded at 75 octets as RFC 5545 requires, with its CRLF"""
+    data = line.encode()
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts, limit = [], 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:  # never split a UTF-8 sequence
+            cut -= 1
+        parts.append(data[:cut].decode())
+        data, limit = data[cut:], 74  # continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def ics_datetime(value, like=None):
+    """Format a datetime string as an iCalendar DATE-TIME: UTC if it has an offset, floating if naive.
+
+    With like (a datetime), the value is first moved to like's awareness, as
+    RRULE UNTIL must match DTSTART.
+    """
+    dt = parse_datetime(value)
+    if like is not None and (dt.tzinfo is None) != (like.tzinfo is None):
+        dt = from_timestamp(dt.timestamp(), like)
+    if dt.tzinfo is None:
+        return dt.strftime('%Y%m%dT%H%M%S')
+    return dt.astimezone(tz.UTC).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ics_duration(minutes):
+    """A VALARM trigger for a reminder offset in minutes before the start"""
+    seconds = round(minutes * 60)
+    return f'-PT{seconds // 60}M' if seconds % 60 == 0 else f'-PT{seconds}S'
+
+
+def event_to_ics(event):
+    """The VEVENT of an event; a recurring one as a single VEVENT with its RRULE and EXDATEs.
+
+    Times of an event with a timezone are wall-clock times with its TZID, so
+    subscribers expand the series across DST changes as we do.
+    """
+    zone = resolve_timezone(event['timezone']) if event['timezone'] else None
+
+    def when(name, value):
+        if zone:
+            return f"{name};TZID={event['timezone']}:{localize(parse_datetime(value), zone):%Y%m%dT%H%M%S}"
+        return f'{name}:{ics_datetime(value)}'
+
+    lines = ['BEGIN:VEVENT', f"UID:{event['id']}",
+             # DTSTAMP must be UTC; created_at is naive server time
+             f"DTSTAMP:{ics_datetime(event['created_at'] or datetime.now().isoformat(), like=datetime.now(tz.UTC))}",
+             when('DTSTART', event['start_time']), when('DTEND', event['end_time']),
+             f"SUMMARY:{ics_escape(event['title'])}"]
+    if event['description']:
+        lines.append(f"DESCRIPTION:{ics_escape(event['description'])}")
+    recurring = event['recurring']
+    if recurring:
+        rule = (f'FREQ={recurring.upper()}' if recurring in RECURRENCE_PRESETS
+                else re.sub(r'^RRULE:', '', recurring.strip(), flags=re.IGNORECASE))
+        if event['recurrence_end'] and not re.search(r'\b(UNTIL|COUNT)=', rule, re.IGNORECASE):
+            rule += ';UNTIL=' + ics_datetime(event['recurrence_end'], parse_datetime(event['start_time']))
+        lines.append(f'RRULE:{rule}')
+        lines.extend(when('EXDATE', value) for value in event['exceptions'] or [])
+    lines.extend(f'ATTENDEE:mailto:{address}' for address in event['recipients'] or [])
+    for offset in event['reminders'] or []:
+        lines += ['BEGIN:VALARM', 'ACTION:DISPLAY', f"DESCRIPTION:{ics_escape(event['title'])}",
+                  f'TRIGGER:{ics_duration(offset)}', 'END:VALARM']
+    lines.append('END:VEVENT')
+    return ''.join(ics_line(line) for line in lines)
+
+
+def parse_ics_datetime(value, params):
+    """An iCalendar DATE or DATE-TIME as an ISO 8601 string; raises ValueError.
+
+    UTC values get a +00:00 offset, TZID values the zone's offset at that
+    time, floating values stay naive (local time) and dates start at midnight.
+    """
+    try:
+        if params.get('VALUE') == 'DATE' or len(value) == 8:
+            return datetime.strptime(value, '%Y%m%d').isoformat()
+        dt = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+    except ValueError:
+        raise ValueError(f'Invalid date-time: {value}')
+    if value.endswith('Z'):
+        dt = dt.replace(tzinfo=tz.UTC)
+    elif 'TZID' in params:
+        zone = tz.gettz(params['TZID'].strip('"'))
+        if zone is None:
+            raise ValueError(f"Unknown TZID: {params['TZID']}")
+        dt = dt.replace(tzinfo=zone)
+    return dt.isoformat()
+
+
+def parse_ics_duration(value):
+    """An iCalendar DURATION in seconds (negative before the start); raises ValueError"""
+    match = re.fullmatch(r'([+-]?)P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?', value)
+    if not match or value.endswith(('P', 'T')):
+        raise ValueError(f'Invalid duration: {value}')
+    weeks, days, hours, minutes, seconds = (int(part or 0) for part in match.groups()[1:])
+    total = (((weeks * 7 + days) * 24 + hours) * 60 + minutes) * 60 + seconds
+    return -total if match.group(1) == '-' else total
+
+
+def iter_ics_events(lines):
+    """Yield the properties of each VEVENT in a stream of iCalendar lines, one event in memory at a time.
+
+    Properties are (name, params, value) tuples with folded lines joined;
+    those of a nested VALARM come as one ('VALARM', {}, properties) entry.
+    """
+    def content_lines():
+        current = None
+        for raw in lines:
+            line = raw.decode('utf-8', 'replace').rstrip('\r')
+            if line[:1] in (' ', '\t') and current is not None:
+                current += line[1:]
+                continue
+            if current:
+                yield current
+            current = line
+        if current:
+            yield current
     
-    def start_reminder_thread(self):
-        """Start background thread for checking reminders"""
-        def reminder_worker():
-            print("🔔 Reminder thread started - checking every minute")
-            schedule.every().minute.do(self.check_reminders)
-            while True:
-                try:
-                    schedule.run_pending()
-                    time.sleep(60)
-                except Exception as e:
-                    print(f"❌ Error in reminder thread: {e}")
-                    time.sleep(60)  # Continue trying
-        
-        thread = threading.Thread(target=reminder_worker, daemon=True)
-        thread.start()
-        print("🔔 Reminder system initialized successfully")
+    event = alarm = None
+    for line in content_lines():
+        match = re.match(r'((?:[^:";]|"[^"]*")*?)((?:;(?:[^:"]|"[^"]*")*)?):(.*)', line)
+        if not match:
+            continue
+        name, params, value = match.group(1).upper(), {}, match.group(3)
+        for param in re.findall(r';([^=;]+)=((?:[^;"]|"[^"]*")*)', match.group(2)):
+            params[param[0].upper()] = param[1]
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event = []
+        elif name == 'BEGIN' and value.upper() == 'VALARM' and event is not None:
+            alarm = []
+        elif name == 'END' and value.upper() == 'VALARM' and alarm is not None:
+            event.append(('VALARM', {}, alarm))
+            alarm = None
+        elif name == 'END' and value.upper() == 'VEVENT' and event is not None:
+            yield event
+            event = None
+        elif alarm is not None:
+            alarm.append((name, params, value))
+        elif event is not None:
+            event.append((name, params, value))
+
+
+def ics_to_event(properties):
+    """The event fields of a parsed VEVENT, with its id; raises ValueError.
+
+    The event id is the UID when that is already one of our ids, as in our
+    own feed, or else a UUID derived from it, so importing a file twice
+    updates the same events instead of adding copies.
+    """
+    first = {}
+    for name, params, value in properties:
+        first.setdefault(name, (params, value))
+    if 'UID' not in first:
+        raise ValueError('Missing UID')
+    if 'RECURRENCE-ID' in first:
+        raise ValueError('Changed occurrences of a series (RECURRENCE-ID) are not supported')
+    if 'DTSTART' not in first:
+        raise ValueError('Missing DTSTART')
+    uid = first['UID'][1]
+    try:
+        event_id = str(uuid.UUID(uid))
+    except ValueError:
+        event_id = str(uuid.uuid5(uuid.NAMESPACE_URL, uid))
+    start_time = parse_ics_datetime(first['DTSTART'][1], first['DTSTART'][0])
+    if 'DTEND' in first:
+        end_time = parse_ics_datetime(first['DTEND'][1], first['DTEND'][0])
+    else:
+        duration = parse_ics_duration(first['DURATION'][1]) if 'DURATION' in first else (
+            86400 if len(first['DTSTART'][1]) == 8 else 0)
+        end_time = (parse_datetime(start_time) + timedelta(seconds=duration)).isoformat()
+    data = {
+        'title': ics_unescape(first.get('SUMMARY', ({}, ''))[1]),
+        'description': ics_unescape(first.get('DESCRIPTION', ({}, ''))[1]),
+        'start_time': start_time,
+        'end_time': end_time,
+        'recurring': None,
+        'exceptions': [parse_ics_datetime(value, params) for name, params, values in properties
+                       if name == 'EXDATE' for value in values.split(',')] or None,
+        'recurrence_end': None,
+        'recipients': [value[7:] for name, _, value in properties
+                       if name == 'ATTENDEE' and value.lower().startswith('mailto:')] or None,
+        'reminders': None,
+        'timezone': first['DTSTART'][0]['TZID'].strip('"') if 'TZID' in first['DTSTART'][0] else None
+    }
+    if 'RRULE' in first:
+        rule = first['RRULE'][1]
+        preset = rule.upper()[len('FREQ='):].lower() if rule.upper().startswith('FREQ=') else None
+        data['recurring'] = preset if preset in RECURRENCE_PRESETS else rule
+    triggers = [dict((name, value) for name, _, value in alarm).get('TRIGGER')
+                for name, _, alarm in properties if name == 'VALARM']
+    offsets = [-parse_ics_duration(trigger) / 60 for trigger in triggers if trigger and trigger[:2] in ('-P', 'P', '+P')]
+    if offsets:
+        data['reminders'] = [int(offset) if offset == int(offset) else offset
+                             for offset in dict.fromkeys(offsets) if offset >= 0] or None
+    validate_event(data)
+    return event_id, normalize_times(data)
+
+
+def read_bulk_items():
+    """Yield (index, item) pairs from a JSON array body or an NDJSON stream, one item per line.
+
+    NDJSON is parsed line by line as it arrives; a line that is not valid
+    JSON yields a ValueError in place of the item so it is reported per item.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        index = 0
+        for line in iter_lines(request.stream):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError:
+                yield index, ValueError('Invalid JSON')
+            index += 1
+        return
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError('Expected a JSON array or an NDJSON body')
+    yield from enumerate(items)
+
+
+def bulk_response(key, done, errors, status=200):
+    """Build the per-item result of a bulk request; fails with 400 only if nothing was applied"""
+    if errors and not done:
+        status = 400
+    return jsonify({'success': not errors, key: done, 'errors': errors}), status
+
 
-# Initialize the scheduler
-scheduler = EventScheduler()
+def parse_fields(value):
+    """Parse a comma separated fields parameter; raises ValueError on unknown fields"""
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    for field in fields:
+        if field not in EVENT_FIELDS:
+            raise ValueError(f'Unknown field: {field}')
+    return fields
+
+
+def project(event, fields):
+    """Return only the requested fields of an event"""
+    if not fields:
+        return event
+    return {field: event.get(field) for field in fields}
 
 # Web Interface Route
-@app.route('/')
+@api.route('/')
 def index():
     """Serve the main web interface"""
     return render_template('index.html')
 
-@app.route('/favicon.ico')
+@api.route('/favicon.ico')
 def favicon():
     """Serve favicon to prevent 404 errors"""
     return '', 204  # No content response
 
 # API Routes
-@app.route('/api/events', methods=['GET'])
+@api.route('/api/events', methods=['GET'])
 def get_events():
-    """Get all events"""
+    """Get all events, optionally paginated, projected or streamed as NDJSON"""
     try:
-        events = scheduler.get_all_events()
-        return jsonify({'success': True, 'events': events})
+        try:
+            fields = parse_fields(request.args.get('fields', ''))
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            limit = request.args.get('limit')
+            limit = parse_limit(limit) if limit is not None else None
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        seq = scheduler.changes.seq
+        etag = params_etag(seq, tuple(fields), after, limit, request.args.get('format'))
+        headers = {'Vary': CALENDAR_CONFIG['header']}
+        if request.if_none_match.contains(etag):
+            return '', 304, dict(headers, ETag=f'"{etag}"')
+        
+        if request.args.get('format') == 'ndjson':
+            events = scheduler.iter_events(after)
+            if limit is not None:
+                events = itertools.islice(events, limit)
+            
+            def generate():
+                for event in events:
+                    yield json.dumps(project(event, fields), default=json_default) + '\n'
+            
+            response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        elif limit is None and after is None:
+            def build():
+                events = scheduler.get_all_events()
+                return {'success': True, 'seq': seq, 'events': [project(event, fields) for event in events]}
+            
+            response = cached_json('events', (tuple(fields),), build, seq)
+        else:
+            def build():
+                events, next_key = scheduler.get_events_page(after, limit or DEFAULT_PAGE_SIZE)
+                return {
+                    'success': True,
+                    'seq': seq,
+                    'events': [project(event, fields) for event in events],
+                    'next_cursor': encode_cursor(next_key) if next_key else None
+                }
+            
+            response = cached_json('events', (tuple(fields), after, limit or DEFAULT_PAGE_SIZE), build, seq)
+        response.set_etag(etag)
+        response.headers.update(headers)
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/events', methods=['POST'])
+@api.route('/api/events', methods=['POST'])
 def create_event():
     """Create a new event"""
     try:
         data = request.get_json()
+        try:
+            validate_event(data)
+            if not isinstance(data.get('reject_conflicts', False), bool):
+                raise ValueError('Invalid type for field: reject_conflicts')
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        # Validate required fields
-        required_fields = ['title', 'description', 'start_time', 'end_time']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'success': False, 'error': f'Missing required field: {field}'}), 400
+        try:
+            event = scheduler.add_event(
+                title=data['title'],
+                description=data['description'],
+                start_time=data['start_time'],
+                end_time=data['end_time'],
+                recurring=data.get('recurring'),
+                reminders=data.get('reminders'),
+                exceptions=data.get('exceptions'),
+                recurrence_end=data.get('recurrence_end'),
+                recipients=data.get('recipients'),
+                timezone=data.get('timezone'),
+                reject_conflicts=data.get('reject_conflicts', False)
+            )
+        except ConflictError as e:
+            return jsonify({'success': False, 'error': str(e), 'conflicts': e.events}), 409
+        except QuotaError as e:
+            return jsonify({'success': False, 'error': str(e)}), 403
         
-        # Validate datetime format
+        return jsonify({'success': True, 'event': event}), 201
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/events/bulk', methods=['POST'])
+def create_events_bulk():
+    """Create many events from a JSON array or NDJSON stream, reporting errors per item"""
+    try:
+        items, indexes, errors = [], [], []
         try:
-            start_time = parser.parse(data['start_time'])
-            end_time = parser.parse(data['end_time'])
-        except:
-            return jsonify({'success': False, 'error': 'Invalid datetime format'}), 400
+            for index, data in read_bulk_items():
+                try:
+                    if isinstance(data, Exception):
+                        raise data
+                    validate_event(data)
+                except ValueError as e:
+                    errors.append({'index': index, 'error': str(e)})
+                    continue
+                items.append({field: data.get(field) for field in EVENT_ARGUMENTS})
+                indexes.append(index)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if not items and not errors:
+            return jsonify({'success': False, 'error': 'No events provided'}), 400
         
-        # Validate time logic
-        if start_time >= end_time:
-            return jsonify({'success': False, 'error': 'Start time must be before end time'}), 400
+        try:
+            events = scheduler.add_events(items)
+        except QuotaError as e:
+            return jsonify({'success': False, 'error': str(e)}), 403
+        created = [{'index': index, 'id': event['id']} for index, event in zip(indexes, events)]
+        return bulk_response('created', created, errors, 201)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/events/bulk', methods=['PUT'])
+def update_events_bulk():
+    """Update many events, each item an object with an id and the fields to change"""
+    try:
+        updates, indexes, errors = [], [], []
+        try:
+            for index, data in read_bulk_items():
+                try:
+                    if isinstance(data, Exception):
+                        raise data
+                    if not isinstance(data, dict) or not isinstance(data.get('id'), str):
+                        raise ValueError('Missing required field: id')
+                    changes = {key: value for key, value in data.items() if key != 'id'}
+                    validate_changes(scheduler.get_event_by_id(data['id']), changes)
+                except ValueError as e:
+                    errors.append({'index': index, 'error': str(e)})
+                    continue
+                updates.append((data['id'], changes))
+                indexes.append(index)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if not updates and not errors:
+            return jsonify({'success': False, 'error': 'No events provided'}), 400
         
-        event = scheduler.add_event(
-            title=data['title'],
-            description=data['description'],
-            start_time=data['start_time'],
-            end_time=data['end_time'],
-            recurring=data.get('recurring')
-        )
+        updated = []
+        for index, (event_id, _), event in zip(indexes, updates, scheduler.update_events(updates)):
+            if event:
+                updated.append({'index': index, 'id': event_id})
+            else:
+                errors.append({'index': index, 'error': 'Event not found'})
+        errors.sort(key=lambda error: error['index'])
+        return bulk_response('updated', updated, errors)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/events/bulk', methods=['DELETE'])
+def delete_events_bulk():
+    """Delete many events, each item an id or an object with an id"""
+    try:
+        event_ids, indexes, errors = [], [], []
+        try:
+            for index, data in read_bulk_items():
+                if isinstance(data, dict):
+                    data = data.get('id')
+                if not isinstance(data, str):
+                    errors.append({'index': index, 'error': 'Expected an event id'})
+                    continue
+                event_ids.append(data)
+                indexes.append(index)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if not event_ids and not errors:
+            return jsonify({'success': False, 'error': 'No events provided'}), 400
         
-        return jsonify({'success': True, 'event': event}), 201
+        deleted = []
+        for index, event_id, existed in zip(indexes, event_ids, scheduler.delete_events(event_ids)):
+            if existed:
+                deleted.append({'index': index, 'id': event_id})
+            else:
+                errors.append({'index': index, 'error': 'Event not found'})
+        errors.sort(key=lambda error: error['index'])
+        return bulk_response('deleted', deleted, errors)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/events/export', methods=['GET'])
+def export_events():
+    """Stream every event as NDJSON (default) or a JSON array, in start time order"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'json'):
+        return jsonify({'success': False, 'error': 'Invalid format: expected ndjson or json'}), 400
+    
+    def generate():
+        if export_format == 'ndjson':
+            for event in scheduler.iter_events():
+                yield json.dumps(event, default=json_default) + '\n'
+            return
+        separator = '['
+        for event in scheduler.iter_events():
+            yield separator + json.dumps(event, default=json_default)
+            separator = ',\n'
+        yield '[]' if separator == '[' else ']'
+    
+    mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=events.{export_format}'})
+
+@api.route('/api/calendar.ics', methods=['GET'])
+def export_ics():
+    """Stream the calendar as iCalendar, recurring events as one VEVENT with their RRULE"""
+    seq = scheduler.changes.seq
+    etag = params_etag(seq, 'ics')
+    headers = {'Vary': CALENDAR_CONFIG['header'], 'ETag': f'"{etag}"'}
+    if request.if_none_match.contains(etag):
+        return '', 304, headers
+    
+    def generate():
+        yield ics_line('BEGIN:VCALENDAR') + ics_line('VERSION:2.0') + ics_line(f'PRODID:{ICS_PRODID}')
+        yield ics_line(f"X-WR-CALNAME:{g.get('calendar', CALENDAR_CONFIG['default'])}")
+        for event in scheduler.iter_events():
+            yield event_to_ics(event)
+        yield ics_line('END:VCALENDAR')
+    
+    return Response(stream_with_context(generate()), mimetype='text/calendar',
+                    headers=dict(headers, **{'Content-Disposition': 'attachment; filename=calendar.ics'}))
+
+@api.route('/api/calendar/import', methods=['POST'])
+def import_ics():
+    """Import an iCalendar file, parsed as it streams in and applied in one batch; repeating it is a no-op"""
+    try:
+        events, errors = {}, []
+        created_at = datetime.now().isoformat()
+        for index, properties in enumerate(iter_ics_events(iter_lines(request.stream))):
+            try:
+                event_id, data = ics_to_event(properties)
+            except ValueError as e:
+                uid = next((value for name, _, value in properties if name == 'UID'), None)
+                errors.append({'index': index, 'uid': uid, 'error': str(e)})
+                continue
+            events[event_id] = Event(id=event_id, created_at=created_at, **data)  # a repeated UID keeps the last
+        if not events and not errors:
+            return jsonify({'success': False, 'error': 'No events found in the calendar'}), 400
+        
+        try:
+            created, updated, unchanged = scheduler.import_events(list(events.values()))
+        except QuotaError as e:
+            return jsonify({'success': False, 'error': str(e)}), 403
+        status = 400 if errors and not events else 200
+        return jsonify({'success': not errors, 'created': created, 'updated': updated,
+                        'unchanged': unchanged, 'errors': errors}), status
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/events/<event_id>', methods=['GET'])
+@api.cli.command('import-json')
+@click.argument('source', default=EVENTS_FILE)
+@click.option('--target', default=None, help='SQLite database to import into (default: events.db next to SOURCE)')
+def import_json(source, target):
+    """Import events.json (and any write-ahead log) into the SQLite backend"""
+    events = JSONStore.read(source)
+    store = SQLiteStore(source, {'sqlite_file': target})
+    count = store.import_events(events)
+    click.echo(f"Imported {count} event(s) from {source} into {store.path}")
+
+@api.route('/api/events/<event_id>', methods=['GET'])
 def get_event(event_id):
     """Get a specific event"""
     try:
@@ -266,24 +4182,16 @@ def get_event(event_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/events/<event_id>', methods=['PUT'])
+@api.route('/api/events/<event_id>', methods=['PUT'])
 def update_event(event_id):
     """Update an existing event"""
     try:
         data = request.get_json()
         
-        # Validate datetime format if provided
-        if 'start_time' in data:
-            try:
-                parser.parse(data['start_time'])
-            except:
-                return jsonify({'success': False, 'error': 'Invalid start_time format'}), 400
-        
-        if 'end_time' in data:
-            try:
-                parser.parse(data['end_time'])
-            except:
-                return jsonify({'success': False, 'error': 'Invalid end_time format'}), 400
+        try:
+            validate_changes(scheduler.get_event_by_id(event_id), data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         event = scheduler.update_event(event_id, **data)
         if event:
@@ -293,7 +4201,7 @@ def update_event(event_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/events/<event_id>', methods=['DELETE'])
+@api.route('/api/events/<event_id>', methods=['DELETE'])
 def delete_event(event_id):
     """Delete an event"""
     try:
@@ -305,7 +4213,56 @@ def delete_event(event_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/events/search', methods=['GET'])
+@api.route('/api/events/changes', methods=['GET'])
+def get_event_changes():
+    """Get changes recorded after a sequence number"""
+    try:
+        since = request.args.get('since')
+        if since is None:
+            return jsonify({'success': True, 'seq': scheduler.changes.seq, 'changes': []})
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid since'}), 400
+        try:
+            wait = parse_wait(request.args.get('wait'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if wait and not g.get('change_wait_done'):
+            # Long poll: hold the request until something changes or the wait runs out
+            # (asgi_app does the waiting on its event loop before calling the view)
+            scheduler.changes.wait(since, wait)
+        seq = scheduler.changes.seq
+        changes = scheduler.changes.since(since)
+        if changes is None:
+            # Too old (or from before a restart): the client must reload the full list
+            return jsonify({'success': True, 'seq': seq, 'reset': True, 'changes': []})
+        return jsonify({'success': True, 'seq': changes[-1]['seq'] if changes else since,
+                        'reset': False, 'changes': changes})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/events/stream', methods=['GET'])
+def stream_event_changes():
+    """Push changes to the client as Server-Sent Events"""
+    try:
+        feed, since = change_stream_start()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    def generate(since):
+        yield 'retry: 3000\n\n'
+        while True:
+            if not feed.wait(since, timeout=STREAM_KEEPALIVE):
+                yield ': keep-alive\n\n'
+                continue
+            text, since = sse_changes(feed, since)
+            yield text
+    
+    return Response(stream_with_context(generate(since)), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@api.route('/api/events/search', methods=['GET'])
 def search_events():
     """Search events by title or description"""
     try:
@@ -313,31 +4270,267 @@ def search_events():
         if not query:
             return jsonify({'success': False, 'error': 'Search query is required'}), 400
         
-        results = scheduler.search_events(query)
-        return jsonify({'success': True, 'events': results})
+        limit = request.args.get('limit')
+        if limit is not None:
+            try:
+                limit = parse_limit(limit)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+        
+        # Both backends match case-insensitively, so queries differing only in case share an entry
+        return cached_json('search', (query.lower(), limit),
+                           lambda: {'success': True, 'events': scheduler.search_events(query, limit)})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/events/upcoming', methods=['GET'])
+@api.route('/api/events/upcoming', methods=['GET'])
 def get_upcoming_events():
     """Get upcoming events within specified hours"""
     try:
         hours = int(request.args.get('hours', 1))
-        events = scheduler.get_upcoming_events(hours)
+        # The window moves with the clock, so entries also expire at the next minute
+        return cached_json('upcoming', (hours,),
+                           lambda: {'success': True, 'events': scheduler.get_upcoming_events(hours)},
+                           expires=(math.floor(time.time() / 60) + 1) * 60)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/events/occurrences', methods=['GET'])
+def get_event_occurrences():
+    """Get events with recurring series expanded into occurrences within a window"""
+    try:
+        try:
+            start, end = parse_window(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        events = scheduler.get_occurrences(start.timestamp(), end.timestamp())
         return jsonify({'success': True, 'events': events})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/events/conflicts', methods=['GET'])
+def get_event_conflicts():
+    """Get events and occurrences overlapping a window"""
+    try:
+        try:
+            start, end = parse_window(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        events = scheduler.find_conflicts(start.timestamp(), end.timestamp())
+        return jsonify({'success': True, 'free': not events, 'events': events})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/events/freebusy', methods=['GET'])
+def get_free_busy():
+    """Get merged busy intervals and the free gaps between them within a window"""
+    try:
+        try:
+            start, end = parse_window(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        busy = scheduler.get_busy(start.timestamp(), end.timestamp())
+        free, cursor = [], start.timestamp()
+        for busy_start, busy_end in busy:
+            if busy_start > cursor:
+                free.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < end.timestamp():
+            free.append((cursor, end.timestamp()))
+        
+        def intervals(spans):
+            return [{'start': from_timestamp(lo, start).isoformat(), 'end': from_timestamp(hi, start).isoformat()}
+                    for lo, hi in spans]
+        
+        return jsonify({'success': True, 'busy': intervals(busy), 'free': intervals(free)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/stats/events', methods=['GET'])
+def get_event_counts():
+    """Count events and occurrences starting in each day, week or month of a window"""
+    try:
+        return period_stats('stats-events', lambda labels, boundaries, stats: {
+            'total': sum(events for events, _ in stats),
+            'buckets': [{'start': label.isoformat(), 'events': events} for label, (events, _) in zip(labels, stats)]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/stats/booked', methods=['GET'])
+def get_booked_time():
+    """Total time booked by events and occurrences in each day, week or month of a window"""
+    try:
+        return period_stats('stats-booked', lambda labels, boundaries, stats: {
+            'total_booked_seconds': sum(booked for _, booked in stats),
+            'buckets': [{'start': label.isoformat(), 'booked_seconds': booked}
+                        for label, (_, booked) in zip(labels, stats)]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/stats/utilization', methods=['GET'])
+def get_utilization():
+    """Share of each day, week or month of a window that is booked; overlapping events can take it past 1"""
+    def build(labels, boundaries, stats):
+        length = boundaries[-1] - boundaries[0]
+        booked = sum(seconds for _, seconds in stats)
+        return {
+            'utilization': round(booked / length, 4) if length else None,
+            'buckets': [{'start': label.isoformat(), 'booked_seconds': seconds,
+                         'utilization': round(seconds / (hi - lo), 4) if hi > lo else None}
+                        for label, (_, seconds), lo, hi in zip(labels, stats, boundaries, boundaries[1:])]
+        }
+    
+    try:
+        return period_stats('stats-utilization', build)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/stats/busiest-hours', methods=['GET'])
+def get_busiest_hours():
+    """Events starting, and time booked, in each hour of the day over a window, busiest first"""
+    try:
+        try:
+            start, end, _ = parse_stats_window(request.args)
+            hours, boundaries = hour_boundaries(start, end)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        def build():
+            totals = {hour: [0, 0.0] for hour in range(24)}
+            for hour, (events, booked) in zip(hours, scheduler.span_stats(boundaries)):
+                totals[hour][0] += events
+                totals[hour][1] += booked
+            ranked = sorted(totals.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+            return {'success': True, 'timezone': request.args.get('timezone') or 'local',
+                    'hours': [{'hour': hour, 'events': events, 'booked_seconds': booked}
+                              for hour, (events, booked) in ranked]}
+        
+        return cached_json('stats-hours', (start.isoformat(), end.isoformat(), request.args.get('timezone')), build)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({'success': True, 'status': 'healthy', 'message': 'Event Scheduler API is running'})
 
-@app.route('/api/test-reminders', methods=['GET'])
+@api.route('/api/email/metrics', methods=['GET'])
+def email_metrics():
+    """Email delivery queue depth, outcomes and send latency"""
+    return jsonify({'success': True, 'metrics': scheduler.email.metrics()})
+
+@api.route('/api/calendars', methods=['GET'])
+def list_calendars():
+    """List calendars with their settings, and event counts for those already open"""
+    calendars = current_app.extensions['calendars']
+    result = []
+    for name in calendars.names():
+        entry = dict(calendars.settings(name), name=name)
+        stats = calendars.get(name).stats()
+        if stats:
+            entry['events'] = stats['events']
+        result.append(entry)
+    return jsonify({'success': True, 'calendars': result})
+
+@api.route('/api/calendars/<name>', methods=['GET'])
+def get_calendar(name):
+    """Get a calendar's reminder recipients and quotas"""
+    if not CALENDAR_NAME_RE.fullmatch(name):
+        return jsonify({'success': False, 'error': 'Invalid calendar name'}), 400
+    calendars = current_app.extensions['calendars']
+    if not calendars.exists(name):
+        return jsonify({'success': False, 'error': 'Calendar not found'}), 404
+    return jsonify({'success': True, 'calendar': dict(calendars.settings(name), name=name)})
+
+@api.route('/api/calendars/<name>', methods=['PUT'])
+def update_calendar(name):
+    """Set a calendar's reminder recipients and quotas (null lifts a quota)"""
+    try:
+        data = request.get_json(silent=True)
+        try:
+            if not CALENDAR_NAME_RE.fullmatch(name):
+                raise ValueError('Invalid calendar name')
+            if not isinstance(data, dict) or not data:
+                raise ValueError('No settings provided')
+            for field, value in data.items():
+                if field not in CALENDAR_SETTINGS:
+                    raise ValueError(f'Unknown field: {field}')
+                if field == 'recipients':
+                    validate_recipients(value)
+                elif value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+                    raise ValueError(f'Invalid {field}: expected a positive integer or null')
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        settings = current_app.extensions['calendars'].configure(name, data)
+        return jsonify({'success': True, 'calendar': dict(settings, name=name)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api.route('/api/cache/metrics', methods=['GET'])
+def cache_metrics():
+    """Response cache size, evictions and hit/miss counts per endpoint"""
+    cache = current_app.extensions['response_cache']
+    return jsonify({'success': True, 'enabled': cache is not None, 'metrics': cache.metrics() if cache else None})
+
+@api.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request latency, per-calendar store and reminder state, and email metrics in the Prometheus text format"""
+    labels = ('calendar',)
+    events = Gauge('events', 'Events in the store', labels)
+    index_size = Gauge('index_entries', 'Entries held by each in-memory index', ('calendar', 'index'))
+    series = Gauge('recurring_series', 'Recurring events expanded by the engine', labels)
+    cache = Gauge('recurrence_cache_entries', 'Cached occurrence windows', labels)
+    seq = Gauge('change_feed_seq', 'Sequence number of the latest change', labels)
+    pending = Gauge('reminders_pending', 'Reminders queued to fire', labels)
+    leader = Gauge('reminders_leader', 'Whether this process holds the reminder lease of a shared store', labels)
+    # Only calendars already open are reported, so a scrape never loads a store
+    for name, calendar in list(current_app.extensions['calendars'].schedulers.items()):
+        stats = calendar.stats()
+        if not stats:
+            continue
+        events.set(stats['events'], name)
+        for index, size in stats['index_sizes'].items():
+            index_size.set(size, name, index)
+        series.set(stats['recurring_series'], name)
+        cache.set(stats['recurrence_cache'], name)
+        seq.set(stats['change_seq'], name)
+        if 'reminders_pending' in stats:
+            pending.set(stats['reminders_pending'], name)
+        if 'reminders_leader' in stats:
+            leader.set(int(stats['reminders_leader']), name)
+    email = scheduler.email.metrics()
+    queue_depth = Gauge('email_queue_depth', 'Messages waiting for a delivery worker').set(email['queue_depth'])
+    outcomes = Counter('email_messages_total', 'Email delivery outcomes', ('outcome',))
+    for outcome in ('sent', 'failed', 'retried', 'dropped'):
+        outcomes.inc(outcome, amount=email[outcome])
+    gauges = [events, index_size, series, cache, seq, pending, leader, queue_depth, outcomes]
+    response_cache = current_app.extensions['response_cache']
+    if response_cache:
+        stats = response_cache.metrics()
+        gauges.append(Gauge('response_cache_entries', 'Responses held by the cache').set(stats['entries']))
+        gauges.append(Gauge('response_cache_bytes', 'Size of the cached response bodies').set(stats['bytes']))
+        evictions = Counter('response_cache_evictions_total', 'Entries evicted to stay within bounds')
+        evictions.inc(amount=stats['evictions'])
+        gauges.append(evictions)
+        lookups = Counter('response_cache_requests_total', 'Cache lookups by endpoint and result',
+                          ('endpoint', 'result'))
+        for endpoint, counts in stats['endpoints'].items():
+            for result, count in counts.items():
+                lookups.inc(endpoint, result, amount=count)
+        gauges.append(lookups)
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/test-reminders', methods=['GET'])
 def test_reminders():
     """Test the reminder system manually"""
     try:
-        print("\n🧪 MANUAL REMINDER TEST TRIGGERED")
+        logger.info('Manual reminder test triggered')
         scheduler.check_reminders()
         return jsonify({
             'success': True, 
@@ -347,11 +4540,235 @@ def test_reminders():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+class ASGIApp:
+    """ASGI entry point serving the same routes as a Flask app, for many long-lived connections.
+
+    Ordinary requests run the Flask view in a worker thread, since store and
+    index access block, so every route behaves exactly as under WSGI. Waiting
+    is done on the event loop instead: an idle /api/events/stream connection
+    or a /api/events/changes?wait= long poll holds a coroutine, not a thread.
+    Reminders run as asyncio tasks once the server sends lifespan startup.
+    """
+
+    def __init__(self, app, threads=None):
+        self.app = app
+        self.threads = threads or ASGI_CONFIG['threads']
+        self.executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.threads, thread_name_prefix='asgi')
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        calendars = self.app.extensions['calendars']
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                calendars.use_loop(asyncio.get_running_loop())
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                calendars.use_loop(None)
+                for scheduler in list(calendars.schedulers.values()):
+                    if scheduler.reminder_task:
+                        scheduler.reminder_task.cancel()
+                if self.executor:
+                    self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        if scope['method'] == 'GET' and scope['path'] == '/api/events/stream':
+            await self.serve_waiting(scope, receive, send, self.open_stream)
+        elif scope['method'] == 'GET' and scope['path'] == '/api/events/changes':
+            await self.serve_waiting(scope, receive, send, self.open_long_poll)
+        else:
+            await self.call_wsgi(scope, receive, send)
+
+    @staticmethod
+    async def read_body(receive):
+        """The whole request body, or None if the client went away first"""
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                return bytes(body)
+
+    def runner(self):
+        """Run calls in the worker threads, all in one copied context so a request context survives between them"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return lambda *call: loop.run_in_executor(self.executor, context.run, *call)
+
+    def open_request(self, ctx):
+        """Push the request context and run the before_request hooks (calendar, quotas, timing)"""
+        ctx.push()
+        return self.app.preprocess_request()
+
+    def dispatch(self):
+        try:
+            return self.app.dispatch_request()
+        except Exception as e:
+            return self.app.handle_user_exception(e)
+
+    def open_stream(self):
+        """The stream's (feed, since) to wait on, or None with the view's answer (an error) to send"""
+        try:
+            return change_stream_start(), None
+        except ValueError as e:
+            return None, (jsonify({'success': False, 'error': str(e)}), 400)
+
+    def open_long_poll(self):
+        """A long poll's (feed, since, wait) to wait on first, or None to let the view answer at once"""
+        try:
+            since, wait = int(request.args['since']), parse_wait(request.args.get('wait'))
+        except (KeyError, ValueError):
+            return None, None  # no wait, or the view reports the bad parameter
+        g.change_wait_done = True  # the view must not block its worker thread again
+        feed = scheduler.changes
+        return ((feed, since, wait) if wait and feed.since(since) == [] else None), None
+
+    async def serve_waiting(self, scope, receive, send, open_wait):
+        """Serve a route that waits for changes: hooks and views run in worker threads, the wait on the loop.
+
+        The request goes through the same before/after_request hooks as
+        under WSGI (calendar quotas, CORS, metrics); only the idle time
+        between changes is spent as a coroutine rather than a blocked thread.
+        """
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        run = self.runner()
+        ctx = self.app.request_context(self.environ(scope, body))
+        try:
+            rv = await run(self.open_request, ctx)
+            if rv is None:
+                waiting, rv = await run(open_wait)
+                if open_wait == self.open_stream and waiting:
+                    feed, since = waiting
+                    head = Response(mimetype='text/event-stream', headers=SSE_HEADERS)
+                    await self.send_head(send, await run(self.app.finalize_request, head))
+                    await self.push_changes(feed, since, receive, send)
+                    return
+                if waiting:
+                    feed, since, wait = waiting
+                    await feed.wait_async(since, wait)
+                if rv is None:
+                    rv = await run(self.dispatch)
+            response = await run(self.app.finalize_request, rv)
+            await self.send_head(send, response)
+            await send({'type': 'http.response.body', 'body': await run(response.get_data)})
+        finally:
+            await run(ctx.pop)
+
+    @staticmethod
+    async def send_head(send, response):
+        await send({'type': 'http.response.start', 'status': response.status_code,
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                for name, value in response.headers.to_wsgi_list()]})
+
+    @staticmethod
+    async def push_changes(feed, since, receive, send):
+        """Push SSE changes as they are recorded until the client disconnects"""
+        async def push(since):
+            await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+            while True:
+                if not await feed.wait_async(since, STREAM_KEEPALIVE):
+                    text = ': keep-alive\n\n'
+                else:
+                    text, since = sse_changes(feed, since)
+                await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+        pusher = asyncio.ensure_future(push(since))
+        try:
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+        finally:
+            pusher.cancel()
+
+    @staticmethod
+    def environ(scope, body):
+        """The WSGI environ of an ASGI HTTP request"""
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False
+        }
+        for name, value in scope['headers']:
+            name, value = name.decode('latin-1').upper().replace('-', '_'), value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = 'HTTP_' + name
+                environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    async def call_wsgi(self, scope, receive, send):
+        """Run the Flask app in a worker thread, streaming its body back chunk by chunk"""
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        environ = self.environ(scope, body)
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                  for name, value in headers]
+
+        def begin():
+            result = self.app(environ, start_response)
+            return result, iter(result)
+
+        # Streamed views keep their request context across the threads producing their chunks
+        run = self.runner()
+        result, chunks = await run(begin)
+        try:
+            chunk = await run(next, chunks, None)
+            await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+            while chunk is not None:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await run(next, chunks, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await run(result.close)
+
+
+app = create_app()
+# ASGI entry point, e.g. uvicorn app:asgi_app
+asgi_app = ASGIApp(app)
+
 if __name__ == '__main__':
     print("🚀 Starting Event Scheduler System...")
     print("📅 Web interface available at http://localhost:5000")
     print("🔗 API endpoints available at http://localhost:5000/api")
-    print("🔔 Reminder system is active (checking every minute)")
+    print("🔔 Reminder system is active")
     print("📧 Email notifications are disabled by default")
     print("💡 Use Ctrl+C to stop the server")
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # The reloader's child process serves requests; load now so reminders start without waiting for one
+        app.extensions['calendars'].load()
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""Time to add a batch of events to a large store, as POST /api/events/bulk and .ics imports do.
+
+Run from the project root:
+
+    python benchmarks/bench_bulk.py [store size] [batch sizes...]
+
+The whole batch runs under the write lock, blocking every reader and writer.
+Its events are merged into the time and interval indexes in one pass each, so
+a batch should cost about the same per event whatever the store size, rather
+than shifting the indexes once per event.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import Event, EventScheduler  # noqa: E402
+from bench_lookup import make_events  # noqa: E402
+
+STORE_SIZE = 1_000_000
+BATCH_SIZES = [100, 1_000, 20_000]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else STORE_SIZE
+    batch_sizes = [int(arg) for arg in sys.argv[2:]] or BATCH_SIZES
+    print(f"{'events':>10} | {'batch':>6} | {'add_events (ms)':>15} | {'import_events (ms)':>18} | {'per event (us)':>14}")
+    with tempfile.TemporaryDirectory() as workdir:
+        scheduler = EventScheduler(events_file=os.path.join(workdir, 'events.json'),
+                                   storage_config={'mode': 'wal', 'compact_interval': 3600,
+                                                   'compact_threshold': 10 ** 9},
+                                   run_reminders=False)
+        scheduler.store.events = [Event.from_dict(data) for data in make_events(n)]
+        scheduler.store._rebuild_index()
+        for size in batch_sizes:
+            # Early in the store's range, where inserting one by one would shift nearly the whole index
+            items = [{key: data[key] for key in ('title', 'description', 'start_time', 'end_time')}
+                     for data in make_events(size, datetime(2024, 1, 1, 0, 7))]
+            start = time.perf_counter()
+            scheduler.add_events(items)
+            add_ms = (time.perf_counter() - start) * 1000
+
+            events = [Event.from_dict(data) for data in make_events(size, datetime(2024, 1, 1, 0, 11))]
+            start = time.perf_counter()
+            scheduler.import_events(events)
+            import_ms = (time.perf_counter() - start) * 1000
+            print(f"{len(scheduler.store):>10} | {size:>6} | {add_ms:>15.0f} | {import_ms:>18.0f} | "
+                  f"{add_ms * 1000 / size:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Read/write throughput of EventScheduler under concurrent threads.
+
+Run from the project root:
+
+    python benchmarks/bench_concurrency.py [events]
+
+Readers share the read lock, so read throughput should hold steady (or grow
+where work releases the GIL, as with the SQLite backend) as threads are added,
+while the writer thread keeps making progress.
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import Event, EventScheduler  # noqa: E402
+from bench_lookup import make_events  # noqa: E402
+
+THREADS = [1, 2, 4, 8]
+DURATION = 2.0
+
+
+def run(scheduler, ids, threads):
+    stop = threading.Event()
+    reads = [0] * threads
+    writes = [0]
+
+    def reader(n):
+        while not stop.is_set():
+            event_id = random.choice(ids)
+            scheduler.get_event_by_id(event_id)
+            scheduler.get_events_page(limit=20)
+            scheduler.search_events('event 12')
+            reads[n] += 3
+
+    def writer():
+        while not stop.is_set():
+            event_id = random.choice(ids)
+            scheduler.update_event(event_id, title=f'Event {random.randint(0, 10 ** 6)}')
+            writes[0] += 1
+
+    workers = [threading.Thread(target=reader, args=(n,)) for n in range(threads)]
+    workers.append(threading.Thread(target=writer))
+    for worker in workers:
+        worker.start()
+    time.sleep(DURATION)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(reads) / DURATION, writes[0] / DURATION
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    print(f"{'backend':>8} | {'readers':>7} | {'reads/s':>9} | {'writes/s':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in ('json', 'sqlite'):
+            scheduler = EventScheduler(events_file=os.path.join(workdir, f'{backend}.json'),
+                                       storage_config={'backend': backend, 'mode': 'wal',
+                                                       'compact_interval': 3600, 'compact_threshold': 10 ** 9})
+            for data in make_events(n):
+                scheduler.store.insert(Event.from_dict(data))
+            ids = [event['id'] for event in scheduler.get_all_events()]
+            for threads in THREADS:
+                reads, writes = run(scheduler, ids, threads)
+                print(f"{backend:>8} | {threads:>7} | {reads:>9.0f} | {writes:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
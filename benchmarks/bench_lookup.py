@@ -0,0 +1,80 @@
+"""Per-request latency of id lookups, updates and deletes as the store grows.
+
+Run from the project root:
+
+    python benchmarks/bench_lookup.py [sizes...]
+
+With the id index the median latency should stay flat from 1k to 1M events.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import Event, EventScheduler  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+OPERATIONS = 2_000
+
+
+def make_events(n, base=datetime(2024, 1, 1)):
+    """Generate n synthetic events in their JSON (dict) form, one every 15 minutes from base"""
+    events = []
+    for i in range(n):
+        start = base + timedelta(minutes=15 * i)
+        events.append({
+            'id': str(uuid.uuid4()),
+            'title': f'Event {i}',
+            'description': f'Synthetic event number {i}',
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(minutes=30)).isoformat(),
+            'recurring': None,
+            'created_at': base.isoformat()
+        })
+    return events
+
+
+def time_each(func, args):
+    """Return per-call latencies in microseconds"""
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        func(arg)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def bench(n, workdir):
+    # wal mode keeps persistence O(1) so the numbers reflect the lookup itself
+    scheduler = EventScheduler(events_file=os.path.join(workdir, f'events-{n}.json'),
+                               storage_config={'mode': 'wal', 'compact_interval': 3600,
+                                               'compact_threshold': 10 ** 9})
+    store = scheduler.store
+    store.events = [Event.from_dict(data) for data in make_events(n)]
+    store._rebuild_index()
+    ids = [event.id for event in random.sample(store.events, min(OPERATIONS, n))]
+
+    results = {
+        'get': time_each(scheduler.get_event_by_id, ids),
+        'update': time_each(lambda event_id: scheduler.update_event(event_id, title='Renamed'), ids),
+        'delete': time_each(scheduler.delete_event, ids),
+    }
+    return {op: (statistics.median(s), sorted(s)[int(len(s) * 0.99)]) for op, s in results.items()}
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'events':>10} | {'op':>6} | {'p50 (us)':>9} | {'p99 (us)':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            for op, (p50, p99) in bench(n, workdir).items():
+                print(f"{n:>10} | {op:>6} | {p50:>9.2f} | {p99:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
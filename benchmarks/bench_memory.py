@@ -0,0 +1,69 @@
+"""Memory per event and sort cost of the dict layout versus slotted Event objects.
+
+Run from the project root:
+
+    python benchmarks/bench_memory.py [sizes...]
+
+The dict layout is what the store held before: one dict of ISO strings per
+event, re-parsed whenever times are compared. Event keeps the same strings in
+slots with the start and end parsed once, so it should need well under half
+the memory and sort without touching dateutil.
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import Event, to_timestamp  # noqa: E402
+from bench_lookup import make_events  # noqa: E402
+
+SIZES = [100_000, 1_000_000]
+
+
+def measure(build, lines):
+    """Return (bytes held by the built events, the events)"""
+    gc.collect()
+    tracemalloc.start()
+    events = build(lines)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, events
+
+
+def load_dicts(lines):
+    return [json.loads(line) for line in lines]
+
+
+def load_events(lines):
+    return [Event.from_dict(json.loads(line)) for line in lines]
+
+
+def time_sort(events, key):
+    start = time.perf_counter()
+    sorted(events, key=key)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'events':>10} | {'layout':>6} | {'MB':>8} | {'bytes/event':>11} | {'sort (ms)':>9}")
+    for n in sizes:
+        # Start from serialized lines so both layouts allocate their strings the same way
+        lines = [json.dumps(event) for event in make_events(n)]
+        layouts = [
+            ('dict', load_dicts, lambda event: to_timestamp(event['start_time'])),
+            ('Event', load_events, lambda event: event.start_ts),
+        ]
+        for name, build, key in layouts:
+            size, events = measure(build, lines)
+            sort_ms = time_sort(events, key)
+            print(f"{n:>10} | {name:>6} | {size / 2 ** 20:>8.1f} | {size / n:>11.0f} | {sort_ms:>9.1f}")
+            del events
+
+
+if __name__ == '__main__':
+    main()
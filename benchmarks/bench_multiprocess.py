@@ -0,0 +1,100 @@
+"""Throughput and reminder delivery of worker processes sharing one SQLite database.
+
+Run from the project root:
+
+    python benchmarks/bench_multiprocess.py [events]
+
+Each worker process opens the database in shared mode, as a gunicorn worker
+would, and runs a read-heavy mix of lookups, pages and windows with one write in
+ten. Every worker also creates events whose reminders fall due during the run.
+Reads happen in parallel across processes, so throughput should grow with the
+process count until writes (serialized by SQLite) dominate. Only the worker
+holding the reminder lease sends reminders, so each one is reported sent
+exactly once with no duplicates, however many workers there are.
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import Event, EventScheduler  # noqa: E402
+from bench_lookup import make_events  # noqa: E402
+
+PROCESSES = [1, 2, 4, 8]
+DURATION = 3.0
+REMINDERS_PER_WORKER = 5
+STORAGE = {'backend': 'sqlite', 'shared': True, 'sync_interval': 0.1, 'lease_ttl': 2}
+
+
+def worker(events_file, ids, start_at, results, sent):
+    scheduler = EventScheduler(events_file=events_file, storage_config=STORAGE, run_reminders=True)
+    scheduler.send_reminder = lambda event, start_ts, fire_ts: sent.put((event['id'], start_ts))
+    rng = random.Random(os.getpid())
+    # Reminders due in the middle of the run, created by every worker
+    due = datetime.fromtimestamp(start_at) + timedelta(seconds=DURATION / 2)
+    for i in range(REMINDERS_PER_WORKER):
+        start = due + timedelta(milliseconds=rng.randint(0, 500))
+        scheduler.add_event(f'Reminder {os.getpid()}-{i}', 'Due during the run', start.isoformat(),
+                            (start + timedelta(minutes=30)).isoformat(), reminders=[0])
+    time.sleep(max(start_at - time.time(), 0))
+    operations = 0
+    window = datetime(2024, 1, 1).timestamp()
+    while time.time() < start_at + DURATION:
+        roll = rng.random()
+        if roll < 0.1:
+            scheduler.update_event(rng.choice(ids), title=f'Event {rng.randint(0, 10 ** 6)}')
+        elif roll < 0.5:
+            scheduler.get_event_by_id(rng.choice(ids))
+        elif roll < 0.8:
+            scheduler.get_events_page(limit=20)
+        else:
+            lo = window + rng.randint(0, 30) * 86400
+            scheduler.get_occurrences(lo, lo + 86400)
+        operations += 1
+    # Stay up long enough for the lease to be renewed past every reminder's deadline
+    time.sleep(1)
+    results.put(operations)
+
+
+def run(workdir, n, processes):
+    events_file = os.path.join(workdir, f'shared-{processes}.json')
+    seeder = EventScheduler(events_file=events_file, storage_config=dict(STORAGE, sync_interval=None),
+                            run_reminders=False)
+    seeder.store.import_events(Event.from_dict(data) for data in make_events(n))
+    ids = [event['id'] for event in seeder.get_all_events()]
+    context = multiprocessing.get_context('spawn')
+    results, sent = context.Queue(), context.Queue()
+    start_at = time.time() + 2 + processes * 0.25  # time for every worker to start and open the database
+    workers = [context.Process(target=worker, args=(events_file, ids, start_at, results, sent))
+               for _ in range(processes)]
+    for process in workers:
+        process.start()
+    operations = sum(results.get() for _ in workers)
+    for process in workers:
+        process.join()
+    reminders = Counter()
+    while not sent.empty():
+        reminders[sent.get()] += 1
+    duplicates = sum(count - 1 for count in reminders.values())
+    return operations / DURATION, len(reminders), processes * REMINDERS_PER_WORKER, duplicates
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    print(f"{'processes':>9} | {'ops/s':>9} | {'speedup':>7} | {'reminders':>9} | {'duplicates':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        baseline = None
+        for processes in PROCESSES:
+            throughput, reminded, expected, duplicates = run(workdir, n, processes)
+            baseline = baseline or throughput
+            print(f"{processes:>9} | {throughput:>9.0f} | {throughput / baseline:>6.2f}x | "
+                  f"{reminded:>4}/{expected:<4} | {duplicates:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Micro-benchmarks of the EventScheduler read and write paths as the store grows.
+
+Run from the project root:
+
+    python benchmarks/bench_scheduler.py [--sizes 1000 10000 100000 1000000] [--output results.json]
+
+Events are spread evenly around the current time, so upcoming and conflict
+queries return a realistic handful. Write paths are measured in both storage
+modes: 'json' rewrites the snapshot through save_events on every change and
+'wal' appends to the log. Pass --output and compare files from two commits with
+benchmarks/compare.py.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app import Event, EventScheduler  # noqa: E402
+from bench_lookup import make_events  # noqa: E402
+import results  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SEED = 1234
+
+
+def time_calls(func, count):
+    """Per-call latencies of func(i) in microseconds"""
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def scheduler_with(n, workdir, mode):
+    """A scheduler whose in-memory store holds n events centred on now"""
+    scheduler = EventScheduler(events_file=os.path.join(workdir, f'{mode}-{n}.json'),
+                               storage_config={'mode': mode, 'compact_interval': 3600, 'compact_threshold': 10 ** 9},
+                               run_reminders=False)
+    base = datetime.now() - timedelta(minutes=15 * (n // 2))
+    scheduler.store.events = [Event.from_dict(data) for data in make_events(n, base)]
+    scheduler.store._rebuild_index()
+    return scheduler
+
+
+def bench_reads(n, workdir):
+    rng = random.Random(SEED)
+    scheduler = scheduler_with(n, workdir, 'wal')
+    ids = [event.id for event in rng.sample(scheduler.store.events, min(n, 1000))]
+    now = time.time()
+    # Whole-store operations take seconds at 1M, so they run fewer times as the store grows
+    full = max(3, min(100, 1_000_000 // n))
+
+    start = time.perf_counter()
+    scheduler.search_events('warm up')
+    entries = [results.summarize('search_index_build', n, [(time.perf_counter() - start) * 1e6])]
+    start = time.perf_counter()
+    scheduler.span_stats([now, now + 1])
+    entries.append(results.summarize('stats_projection_build', n, [(time.perf_counter() - start) * 1e6]))
+    month_of_days = [now - 15 * 86400 + day * 86400 for day in range(31)]
+    year_of_hours = [now - 183 * 86400 + hour * 3600 for hour in range(366 * 24 + 1)]
+    cases = [
+        ('get_event_by_id', 1000, lambda i: scheduler.get_event_by_id(ids[i % len(ids)])),
+        ('get_events_page', 200, lambda i: scheduler.get_events_page(limit=100)),
+        ('get_all_events', full, lambda i: scheduler.get_all_events()),
+        ('get_upcoming_events', 200, lambda i: scheduler.get_upcoming_events(hours=24)),
+        ('find_conflicts', 200, lambda i: scheduler.find_conflicts(now + i * 60, now + i * 60 + 3600)),
+        ('search_events', full, lambda i: scheduler.search_events(f'number {rng.randrange(n)}', limit=20)),
+        ('span_stats_days', 200, lambda i: scheduler.span_stats(month_of_days)),
+        ('span_stats_hours', 20, lambda i: scheduler.span_stats(year_of_hours)),
+    ]
+    for name, count, func in cases:
+        entries.append(results.summarize(name, n, time_calls(func, count)))
+    return entries
+
+
+def bench_writes(n, workdir):
+    entries = []
+    for mode in ('wal', 'json'):
+        scheduler = scheduler_with(n, workdir, mode)
+        ids = [event.id for event in random.Random(SEED).sample(scheduler.store.events, min(n, 200))]
+        # In json mode every write rewrites the whole snapshot
+        count = 200 if mode == 'wal' else max(3, min(100, 100_000 // n))
+        start = datetime.now()
+        cases = [
+            ('add_event', lambda i: scheduler.add_event(
+                'Benchmark', 'Added by the benchmark', (start + timedelta(minutes=i)).isoformat(),
+                (start + timedelta(minutes=i + 30)).isoformat(), reminders=[])),
+            ('update_event', lambda i: scheduler.update_event(ids[i], title=f'Renamed {i}')),
+            ('delete_event', lambda i: scheduler.delete_event(ids[i])),
+        ]
+        for name, func in cases:
+            entries.append(results.summarize(f'{name} ({mode})', n, time_calls(func, count)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--output', help='write results JSON to this path')
+    args = parser.parse_args()
+
+    entries = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            entries.extend(bench_reads(n, workdir))
+            entries.extend(bench_writes(n, workdir))
+            results.print_table([entry for entry in entries if entry['size'] == n])
+    if args.output:
+        results.write(args.output, entries)
+
+
+if __name__ == '__main__':
+    main()
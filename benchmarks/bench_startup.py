@@ -0,0 +1,51 @@
+"""Startup cost: app creation, then loading the store from a JSON or binary snapshot.
+
+Run from the project root:
+
+    python benchmarks/bench_startup.py [sizes...]
+
+create_app should stay flat as the store grows, since nothing is read until
+the first request. The binary snapshot should load several times faster than
+events.json because it skips JSON and datetime parsing.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import Event, EventScheduler, create_app, write_json_atomic, write_snapshot  # noqa: E402
+from bench_lookup import make_events  # noqa: E402
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'events':>10} | {'create_app (ms)':>15} | {'load json (ms)':>14} | {'load binary (ms)':>16}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            events = [Event.from_dict(data) for data in make_events(n)]
+            json_file = os.path.join(workdir, f'json-{n}.json')
+            binary_file = os.path.join(workdir, f'binary-{n}.json')
+            write_json_atomic(json_file, events, compact=True)
+            write_snapshot(binary_file + '.bin', events)
+            del events
+
+            create_ms = timed(lambda: create_app(events_file=json_file, run_reminders=False))
+            json_ms = timed(lambda: EventScheduler(events_file=json_file, storage_config={'mode': 'wal'},
+                                                   run_reminders=False))
+            binary_ms = timed(lambda: EventScheduler(events_file=binary_file,
+                                                     storage_config={'mode': 'wal', 'snapshot': 'binary'},
+                                                     run_reminders=False))
+            print(f"{n:>10} | {create_ms:>15.2f} | {json_ms:>14.0f} | {binary_ms:>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Compare two benchmark results files and flag regressions.
+
+Run from the project root:
+
+    python benchmarks/compare.py baseline.json candidate.json [--metric p50_us] [--threshold 0.2]
+
+Prints the change of every (name, size) present in both files and exits with
+status 1 if any got slower by more than the threshold (20% by default), so it
+can gate CI or a bisect.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import results  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--metric', default='p50_us', choices=['mean_us', 'p50_us', 'p90_us', 'p99_us', 'max_us'])
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown as a fraction')
+    args = parser.parse_args()
+
+    baseline, candidate = results.load(args.baseline), results.load(args.candidate)
+    before = {(r['name'], r['size']): r for r in baseline['results']}
+    print(f"baseline {baseline['meta'].get('commit')} -> candidate {candidate['meta'].get('commit')}, "
+          f"metric {args.metric}")
+    print(f"{'name':<32} | {'size':>9} | {'before':>10} | {'after':>10} | {'change':>8}")
+    regressions = 0
+    for result in candidate['results']:
+        old = before.get((result['name'], result['size']))
+        if old is None:
+            continue
+        change = result[args.metric] / old[args.metric] - 1 if old[args.metric] else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{result['name']:<32} | {result['size']:>9} | {old[args.metric]:>10.1f} | "
+              f"{result[args.metric]:>10.1f} | {change:>+8.1%}{flag}")
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""HTTP load generator reporting latency percentiles per endpoint.
+
+Run from the project root:
+
+    python benchmarks/loadgen.py [--url http://localhost:5000] [--events 10000]
+                                 [--concurrency 8] [--duration 10] [--output results.json]
+
+Without --url it serves a fresh app on an ephemeral local port, seeded with
+--events synthetic events (reminders off). With --url it targets a running server
+and only adds the events it creates. Each client thread keeps one HTTP/1.1
+connection open and picks requests from a fixed read-heavy mix.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import results  # noqa: E402
+
+# (name, weight): the share of requests each endpoint gets
+MIX = [
+    ('GET /api/events?limit=100', 20),
+    ('GET /api/events/<id>', 25),
+    ('GET /api/events/search', 15),
+    ('GET /api/events/upcoming', 10),
+    ('GET /api/events/conflicts', 10),
+    ('POST /api/events', 10),
+    ('PUT /api/events/<id>', 10),
+]
+
+
+def local_server(events, workdir):
+    """Serve a seeded app in a background thread; returns its base URL"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import create_app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    from bench_lookup import make_events
+
+    app = create_app(events_file=os.path.join(workdir, 'events.json'), storage_config={'mode': 'wal'},
+                     run_reminders=False)
+    base = datetime.now() - timedelta(minutes=15 * (events // 2))
+    app.extensions['scheduler'].add_events(
+        {key: data[key] for key in ('title', 'description', 'start_time', 'end_time')}
+        for data in make_events(events, base))
+    # Measure the server rather than the per-calendar request quota
+    app.extensions['calendars'].configure('default', {'max_concurrent': None})
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+class Client:
+    """One keep-alive connection issuing requests from the mix"""
+
+    def __init__(self, url, ids, rng):
+        parts = urlsplit(url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        self.ids = ids
+        self.rng = rng
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = self.connection.getresponse()
+        data = response.read()
+        return response.status, data
+
+    def call(self, name):
+        rng, now = self.rng, datetime.now()
+        start = now + timedelta(minutes=rng.randrange(-600, 600))
+        window = f"start={quote(start.isoformat())}&end={quote((start + timedelta(hours=1)).isoformat())}"
+        if name == 'GET /api/events?limit=100':
+            return self.request('GET', '/api/events?limit=100')
+        if name == 'GET /api/events/<id>':
+            return self.request('GET', f'/api/events/{rng.choice(self.ids)}')
+        if name == 'GET /api/events/search':
+            return self.request('GET', f'/api/events/search?q=number%20{rng.randrange(1000)}&limit=20')
+        if name == 'GET /api/events/upcoming':
+            return self.request('GET', '/api/events/upcoming?hours=24')
+        if name == 'GET /api/events/conflicts':
+            return self.request('GET', f'/api/events/conflicts?{window}')
+        if name == 'POST /api/events':
+            return self.request('POST', '/api/events', {
+                'title': 'Load test', 'description': 'Created by loadgen', 'start_time': start.isoformat(),
+                'end_time': (start + timedelta(minutes=30)).isoformat(), 'reminders': []})
+        return self.request('PUT', f'/api/events/{rng.choice(self.ids)}', {'title': f'Load test {rng.random()}'})
+
+
+def run(url, ids, concurrency, duration):
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = Client(url, ids, rng)
+        local = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status, _ = client.call(name)
+            except (OSError, http.client.HTTPException):
+                status = None
+                client = Client(url, ids, rng)
+            elapsed = (time.perf_counter() - start) * 1e6
+            if status is None or status >= 400:
+                local_errors[name] += 1
+            else:
+                local[name].append(elapsed)
+        with lock:
+            for name in names:
+                samples[name].extend(local[name])
+                errors[name] += local_errors[name]
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='target server (default: start a local one)')
+    parser.add_argument('--events', type=int, default=10_000, help='events to seed a local server with')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--output', help='write results JSON to this path')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = args.url or local_server(args.events, workdir)
+        status, data = Client(url, [], random.Random()).request('GET', '/api/events?limit=1000&fields=id')
+        if status != 200:
+            sys.exit(f'{url} answered {status} to GET /api/events')
+        ids = [event['id'] for event in json.loads(data)['events']]
+        if not ids:
+            sys.exit(f'{url} has no events to read; seed it first')
+
+        samples, errors = run(url, ids, args.concurrency, args.duration)
+    entries = [results.summarize(f'http {name}', args.events, latencies, errors=errors[name],
+                                 rps=round(len(latencies) / args.duration, 1))
+               for name, latencies in samples.items() if latencies]
+    results.print_table(entries)
+    total = sum(len(latencies) for latencies in samples.values())
+    print(f"{total / args.duration:.0f} requests/s over {args.concurrency} connections, "
+          f"{sum(errors.values())} error(s)")
+    if args.output:
+        results.write(args.output, entries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark results format shared by the suite, comparable across commits.
+
+A results file is JSON:
+
+    {"meta": {"commit": "...", "dirty": false, "python": "3.11.4", "platform": "...", "time": "..."},
+     "results": [{"name": "search_events", "size": 10000, "samples": 200,
+                  "mean_us": ..., "p50_us": ..., "p90_us": ..., "p99_us": ..., "max_us": ...}]}
+
+Entries are keyed by (name, size); compare.py diffs two files on that key.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    """Where and on what code the results were produced"""
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds')
+    }
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(name, size, samples, **extra):
+    """One result entry from per-call latencies in microseconds"""
+    ordered = sorted(samples)
+    return dict({
+        'name': name,
+        'size': size,
+        'samples': len(ordered),
+        'mean_us': round(statistics.fmean(ordered), 2),
+        'p50_us': round(percentile(ordered, 0.50), 2),
+        'p90_us': round(percentile(ordered, 0.90), 2),
+        'p99_us': round(percentile(ordered, 0.99), 2),
+        'max_us': round(ordered[-1], 2)
+    }, **extra)
+
+
+def print_table(results):
+    print(f"{'name':<32} | {'size':>9} | {'samples':>7} | {'p50 (us)':>10} | {'p90 (us)':>10} | {'p99 (us)':>10}")
+    for result in results:
+        print(f"{result['name']:<32} | {result['size']:>9} | {result['samples']:>7} | {result['p50_us']:>10.1f} | "
+              f"{result['p90_us']:>10.1f} | {result['p99_us']:>10.1f}")
+
+
+def write(path, results):
+    with open(path, 'w') as f:
+        json.dump({'meta': metadata(), 'results': results}, f, indent=2)
+    print(f"Results written to {path}")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
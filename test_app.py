@@ -1,20 +1,114 @@
 import pytest
+import asyncio
+import itertools
 import json
+import logging
 import os
-from datetime import datetime, timedelta
-from app import app, EventScheduler
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from dateutil import tz
+from flask import Response
+from werkzeug.test import EnvironBuilder
+from app import (app, EventScheduler, EventLog, ChangeFeed, RecurrenceEngine, EmailDelivery, LocalTransport,
+                 RateLimiter, EMAIL_CONFIG, SQLiteStore, ReadWriteLock, Event, create_app, read_snapshot,
+                 StructuredFormatter, ASGIApp, parse_datetime, ReminderActions, SortedColumn,
+                 StatsProjection)
+import app as app_module
 
-@pytest.fixture
-def client():
-    """Create a test client"""
-    app.config['TESTING'] = True
-    with app.test_client() as client:
+class ASGITestClient:
+    """Sends requests built like the Flask test client's through the ASGI entry point.
+
+    The app runs on an event loop in a background thread, so streamed bodies
+    arrive chunk by chunk; closing the response disconnects the client.
+    """
+    
+    def __init__(self, asgi):
+        self.asgi = asgi
+    
+    def open(self, path, method='GET', **kwargs):
+        request = EnvironBuilder(path=path, method=method, **kwargs).get_request()
+        scope = {
+            'type': 'http', 'http_version': '1.1', 'method': request.method, 'scheme': 'http',
+            'path': request.path, 'root_path': '', 'query_string': request.query_string,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in request.headers.items()],
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 50000)
+        }
+        messages = queue.Queue()
+        connection = {}
+        thread = threading.Thread(target=asyncio.run, args=(self.serve(scope, request.get_data(), messages, connection),),
+                                  daemon=True)
+        thread.start()
+        start = messages.get(timeout=10)
+        
+        def body():
+            while True:
+                chunk = messages.get(timeout=10)
+                if chunk is None:
+                    return
+                yield chunk
+        
+        headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in start['headers']]
+        response = Response(body(), status=start['status'], headers=headers)
+        response.call_on_close(connection['disconnect'])
+        return response
+    
+    async def serve(self, scope, body, messages, connection):
+        loop = asyncio.get_running_loop()
+        disconnected = asyncio.Event()
+        connection['disconnect'] = lambda: loop.call_soon_threadsafe(disconnected.set)
+        requests = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        
+        async def receive():
+            if requests:
+                return requests.pop()
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+        
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                messages.put(message)
+            elif message.get('body'):
+                messages.put(message['body'])
+        
+        try:
+            await self.asgi(scope, receive, send)
+        finally:
+            messages.put(None)
+    
+    def get(self, path, **kwargs):
+        return self.open(path, 'GET', **kwargs)
+    
+    def post(self, path, **kwargs):
+        return self.open(path, 'POST', **kwargs)
+    
+    def put(self, path, **kwargs):
+        return self.open(path, 'PUT', **kwargs)
+    
+    def delete(self, path, **kwargs):
+        return self.open(path, 'DELETE', **kwargs)
+
+@pytest.fixture(params=['wsgi', 'asgi'])
+def client(request, tmp_path):
+    """Create a test client for an app with its own store, served through WSGI and through ASGI"""
+    test_app = create_app(events_file=str(tmp_path / 'events.json'), run_reminders=False)
+    test_app.config['TESTING'] = True
+    if request.param == 'asgi':
+        yield ASGITestClient(ASGIApp(test_app))
+        return
+    with test_app.test_client() as client:
         yield client
 
 @pytest.fixture
-def scheduler():
+def scheduler(tmp_path):
     """Create a test scheduler instance"""
-    return EventScheduler()
+    return EventScheduler(events_file=str(tmp_path / 'events.json'))
 
 @pytest.fixture
 def sample_event_data():
@@ -86,6 +180,29 @@ class TestEventScheduler:
         assert len(scheduler.events) == initial_count - 1
         assert scheduler.get_event_by_id(event['id']) is None
     
+    def test_index_stays_in_sync_after_delete(self, scheduler, sample_event_data):
+        """Test that deleting from the middle keeps every id lookup correct"""
+        added = [scheduler.add_event(**sample_event_data) for _ in range(5)]
+        
+        assert scheduler.delete_event(added[1]['id']) is True
+        assert scheduler.delete_event(added[1]['id']) is False
+        
+        for event in added[:1] + added[2:]:
+            assert scheduler.get_event_by_id(event['id']) is event
+        store = scheduler.store
+        assert len(store.index) == len(store.events)
+        assert all(store.events[pos]['id'] == event_id for event_id, pos in store.index.items())
+    
+    def test_update_cannot_change_id(self, scheduler, sample_event_data):
+        """Test that the id field is not overwritten by updates"""
+        event = scheduler.add_event(**sample_event_data)
+        
+        updated = scheduler.update_event(event['id'], id='other-id')
+        
+        assert updated['id'] == event['id']
+        assert scheduler.get_event_by_id(event['id']) == event
+        assert scheduler.get_event_by_id('other-id') is None
+    
     def test_search_events(self, scheduler, sample_event_data):
         """Test searching events"""
         event = scheduler.add_event(**sample_event_data)
@@ -100,6 +217,31 @@ class TestEventScheduler:
         assert len(results) >= 1
         assert 'unit testing' in results[0]['description'].lower()
     
+    def test_search_prefix_and_terms(self, scheduler, sample_event_data):
+        """Test multi-term prefix queries, ranking and limits"""
+        standup = scheduler.add_event(**dict(sample_event_data, title='Daily standup', description='Team sync'))
+        review = scheduler.add_event(**dict(sample_event_data, title='Design review', description='Daily design sync'))
+        scheduler.add_event(**dict(sample_event_data, title='Lunch', description='Food'))
+        
+        # Every term must prefix a word, in any order
+        assert {e['id'] for e in scheduler.search_events('sync dai')} == {standup['id'], review['id']}
+        assert scheduler.search_events('sync lunch') == []
+        # Title matches outrank description matches
+        assert [e['id'] for e in scheduler.search_events('daily')] == [standup['id'], review['id']]
+        assert len(scheduler.search_events('daily', limit=1)) == 1
+        # Plain substrings inside words still match
+        assert [e['id'] for e in scheduler.search_events('andu')] == [standup['id']]
+    
+    def test_search_index_follows_updates(self, scheduler, sample_event_data):
+        """Test that updated and deleted events are reflected in search"""
+        event = scheduler.add_event(**dict(sample_event_data, title='Quarterly planning zzq'))
+        scheduler.update_event(event['id'], title='Retrospective zzq')
+        
+        assert scheduler.search_events('planning zzq') == []
+        assert [e['id'] for e in scheduler.search_events('retro zzq')] == [event['id']]
+        scheduler.delete_event(event['id'])
+        assert scheduler.search_events('zzq') == []
+    
     def test_get_upcoming_events(self, scheduler, sample_event_data):
         """Test getting upcoming events"""
         # Event in next hour
@@ -116,9 +258,1898 @@ class TestEventScheduler:
         upcoming = scheduler.get_upcoming_events(hours=1)
         assert len(upcoming) >= 1
 
+    def test_get_all_events_orders_by_parsed_time(self, scheduler, sample_event_data):
+        """Test that listing follows actual start time rather than string order"""
+        sample_event_data['start_time'] = '2030-01-01T10:00:00+00:00'
+        late = scheduler.add_event(**sample_event_data)
+        sample_event_data['start_time'] = '2030-01-01T11:00:00+05:00'  # 06:00 UTC
+        early = scheduler.add_event(**sample_event_data)
+        
+        assert [e['id'] for e in scheduler.get_all_events()] == [early['id'], late['id']]
+        
+        scheduler.update_event(early['id'], start_time='2030-01-01T12:00:00+00:00')
+        assert [e['id'] for e in scheduler.get_all_events()] == [late['id'], early['id']]
+    
+    def test_upcoming_events_window(self, scheduler, sample_event_data):
+        """Test that only events starting inside the window are returned"""
+        now = datetime.now()
+        inside = scheduler.add_event(**dict(sample_event_data, start_time=(now + timedelta(minutes=30)).isoformat()))
+        scheduler.add_event(**dict(sample_event_data, start_time=(now - timedelta(minutes=5)).isoformat()))
+        scheduler.add_event(**dict(sample_event_data, start_time=(now + timedelta(hours=3)).isoformat()))
+        deleted = scheduler.add_event(**dict(sample_event_data, start_time=(now + timedelta(minutes=40)).isoformat()))
+        scheduler.delete_event(deleted['id'])
+        
+        assert [e['id'] for e in scheduler.get_upcoming_events(hours=1)] == [inside['id']]
+        assert len(scheduler.get_upcoming_events(hours=4)) == 2
+
+class TestEventModel:
+    """Test cases for the slotted Event model"""
+    
+    def test_times_parsed_once_and_on_replace(self, sample_event_data):
+        """Test that timestamps are cached and recomputed only for changed times"""
+        event = Event.from_dict(dict(sample_event_data, id='e1', unknown='dropped'))
+        assert event.start_ts == datetime.fromisoformat(sample_event_data['start_time']).timestamp()
+        assert 'unknown' not in event.to_dict() and not hasattr(event, '__dict__')
+        
+        moved = event.replace(start_time='2030-01-01T10:00:00+00:00')
+        assert moved.start_ts == datetime(2030, 1, 1, 10, tzinfo=timezone.utc).timestamp()
+        assert moved.end_ts == event.end_ts
+        assert event['start_time'] == sample_event_data['start_time']
+    
+    def test_dict_access_and_equality(self, sample_event_data):
+        """Test that events read like their JSON form"""
+        event = Event.from_dict(dict(sample_event_data, id='e1'))
+        assert event['title'] == 'Test Meeting' and event.get('reminders') is None
+        assert event.get('start_ts') is None
+        with pytest.raises(KeyError):
+            event['start_ts']
+        assert event == event.to_dict() == dict(event)
+    
+    def test_json_round_trip(self, tmp_path, sample_event_data):
+        """Test that events are persisted as plain JSON and reloaded as Event objects"""
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        event = scheduler.add_event(**sample_event_data, reminders=[10])
+        
+        stored = json.loads((tmp_path / 'events.json').read_text())
+        assert stored == [event.to_dict()]
+        reloaded = EventScheduler(events_file=str(tmp_path / 'events.json')).get_event_by_id(event['id'])
+        assert isinstance(reloaded, Event) and reloaded == event
+    
+    def test_update_validates_field_types(self, client, sample_event_data):
+        """Test that updates reject unknown fields and wrongly typed values"""
+        event = json.loads(client.post('/api/events', data=json.dumps(sample_event_data),
+                                       content_type='application/json').data)['event']
+        
+        for body in ({'colour': 'red'}, {'title': 42}, {'recurring': ['daily']}):
+            response = client.put(f"/api/events/{event['id']}", data=json.dumps(body),
+                                  content_type='application/json')
+            assert response.status_code == 400
+        response = client.put(f"/api/events/{event['id']}", data=json.dumps(dict(event, title='Echoed')),
+                              content_type='application/json')
+        assert response.status_code == 200
+        assert json.loads(response.data)['event']['created_at'] == event['created_at']
+
+class CountingRules:
+    """A rule set wrapper that records every walk started from dtstart"""
+    
+    def __init__(self, rules, walked):
+        self.rules, self.walked = rules, walked
+    
+    def __iter__(self):
+        self.walked.append(1)
+        return iter(self.rules)
+
+
+class TestRecurrence:
+    """Test cases for recurring event expansion"""
+    
+    def window(self, start, days):
+        start = datetime.fromisoformat(start)
+        return start.timestamp(), (start + timedelta(days=days)).timestamp()
+    
+    def test_rrule_with_exceptions_and_end(self, scheduler, sample_event_data):
+        """Test RRULE expansion honouring exceptions and the series end"""
+        event = scheduler.add_event(**dict(sample_event_data,
+                                           start_time='2030-01-01T09:00:00', end_time='2030-01-01T09:30:00',
+                                           recurring='FREQ=DAILY;INTERVAL=2',
+                                           exceptions=['2030-01-05T09:00:00'],
+                                           recurrence_end='2030-01-09T23:59:59'))
+        
+        occurrences = [e for e in scheduler.get_occurrences(*self.window('2030-01-01T00:00:00', 30))
+                       if e['id'] == event['id']]
+        
+        assert [e['start_time'] for e in occurrences] == [
+            '2030-01-01T09:00:00', '2030-01-03T09:00:00', '2030-01-07T09:00:00', '2030-01-09T09:00:00']
+        assert occurrences[1]['end_time'] == '2030-01-03T09:30:00'
+    
+    def test_expansion_is_memoized_and_bounded(self, sample_event_data):
+        """Test that repeated window queries reuse cached windows within the size bound"""
+        engine = RecurrenceEngine(cache_size=50)
+        event = dict(sample_event_data, id='series', start_time='2030-01-01T09:00:00',
+                     end_time='2030-01-01T10:00:00', recurring='daily')
+        engine.add(event)
+        start, end = self.window('2030-01-01T00:00:00', 20)
+        
+        first = list(engine.iter_between('series', start, end))
+        cached = dict(engine.cache)
+        assert list(engine.iter_between('series', start, end)) == first
+        assert dict(engine.cache) == cached
+        assert len(first) == 20
+        
+        assert len(list(engine.iter_between('series', *self.window('2030-01-01T00:00:00', 365)))) == 365
+        assert len(engine.cache) == 50
+    
+    def test_window_expansion_walks_series_once(self, sample_event_data):
+        """Test that a range query walks an old series once and later ranges resume its cursor"""
+        engine = RecurrenceEngine()
+        engine.add(dict(sample_event_data, id='series', start_time='2021-01-01T09:00:00',
+                        end_time='2021-01-01T10:00:00', recurring='FREQ=HOURLY'))
+        walked = []
+        rules = engine.series['series'][0]
+        engine.series['series'] = (CountingRules(rules, walked),) + engine.series['series'][1:]
+        
+        assert len(list(engine.iter_between('series', *self.window('2026-01-01T00:00:00', 365)))) == 365 * 24 + 1
+        assert len(walked) == 1
+        assert len(list(engine.iter_between('series', *self.window('2027-01-01T00:00:00', 30)))) == 30 * 24 + 1
+        assert len(walked) == 1
+        assert engine.is_occurrence('series', datetime.fromisoformat('2021-06-01T05:00:00').timestamp())
+        assert len(walked) == 2
+    
+    def test_upcoming_includes_later_occurrences(self, scheduler, sample_event_data):
+        """Test that a daily event that started yesterday is upcoming today"""
+        start = datetime.now() - timedelta(days=1) + timedelta(minutes=30)
+        event = scheduler.add_event(**dict(sample_event_data, start_time=start.isoformat(),
+                                           end_time=(start + timedelta(hours=1)).isoformat(), recurring='daily'))
+        
+        upcoming = [e for e in scheduler.get_upcoming_events(hours=1) if e['id'] == event['id']]
+        
+        assert len(upcoming) == 1
+        assert upcoming[0]['start_time'] == (start + timedelta(days=1)).replace(microsecond=0).isoformat()
+    
+    def test_invalid_rule_rejected(self):
+        """Test that malformed rules raise ValueError"""
+        with pytest.raises(ValueError):
+            RecurrenceEngine.build({'start_time': '2030-01-01T09:00:00', 'recurring': 'FREQ=SOMETIMES'})
+        assert RecurrenceEngine.build({'start_time': '2030-01-01T09:00:00', 'recurring': None}) is None
+    
+    def test_recurring_reminders_fire_per_occurrence(self, tmp_path, sample_event_data):
+        """Test that each occurrence of a series gets its own reminder"""
+        fired = []
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        scheduler.send_reminder = lambda event, start_ts, fire_ts: fired.append(event['start_time'])
+        start = (datetime.now() + timedelta(seconds=1)).replace(microsecond=0)
+        scheduler.add_event(**dict(sample_event_data, start_time=start.isoformat(),
+                                   recurring='FREQ=SECONDLY;COUNT=3'), reminders=[0])
+        
+        deadline = time.time() + 6
+        while len(fired) < 3 and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.2)
+        assert fired == [(start + timedelta(seconds=i)).isoformat() for i in range(3)]
+
+class TestEmailDelivery:
+    """Test cases for queued, pooled email delivery"""
+    
+    def make_delivery(self, factory, **config):
+        settings = dict(EMAIL_CONFIG, workers=2, pool_size=2, rate_per_minute=6000, retry_backoff=0.01)
+        settings.update(config)
+        return EmailDelivery(settings, transport_factory=factory)
+    
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+    
+    def test_delivers_over_pooled_connections(self):
+        """Test that many messages reuse at most pool_size connections"""
+        outbox = []
+        created = []
+        
+        def factory():
+            created.append(1)
+            return LocalTransport(outbox)
+        
+        delivery = self.make_delivery(factory)
+        for i in range(20):
+            assert delivery.submit('me@example.com', ['me@example.com'], f'message {i}')
+        
+        assert self.wait_for(lambda: delivery.metrics()['sent'] == 20)
+        assert len(outbox) == 20
+        assert len(created) <= 2
+        metrics = delivery.metrics()
+        assert metrics['queue_depth'] == 0
+        assert metrics['latency_ms']['max'] >= metrics['latency_ms']['avg']
+    
+    def test_retries_then_fails(self):
+        """Test backoff retries and giving up after max_retries"""
+        attempts = []
+        
+        class FlakyTransport(LocalTransport):
+            def send(self, sender, recipients, message):
+                attempts.append(message)
+                if message == 'always fails' or len(attempts) == 1:
+                    raise OSError('connection refused')
+                super().send(sender, recipients, message)
+        
+        outbox = []
+        delivery = self.make_delivery(lambda: FlakyTransport(outbox), max_retries=2)
+        delivery.submit('me@example.com', ['me@example.com'], 'eventually sent')
+        assert self.wait_for(lambda: delivery.metrics()['sent'] == 1)
+        delivery.submit('me@example.com', ['me@example.com'], 'always fails')
+        assert self.wait_for(lambda: delivery.metrics()['failed'] == 1)
+        
+        metrics = delivery.metrics()
+        assert metrics['retried'] == 3
+        assert attempts.count('always fails') == 3
+        assert [message for _, _, message in outbox] == ['eventually sent']
+    
+    def test_full_queue_drops(self):
+        """Test that submissions beyond the queue bound are rejected"""
+        release = threading.Event()
+        
+        class BlockingTransport(LocalTransport):
+            def send(self, sender, recipients, message):
+                release.wait()
+        
+        delivery = self.make_delivery(lambda: BlockingTransport([]), queue_size=2, workers=1)
+        results = [delivery.submit('a', ['b'], str(i)) for i in range(5)]
+        release.set()
+        
+        assert results.count(False) >= 2
+        assert delivery.metrics()['dropped'] == results.count(False)
+    
+    def test_rate_limiter_waits_for_tokens(self):
+        """Test that an empty bucket delays the next operation"""
+        limiter = RateLimiter(per_minute=600)
+        limiter.tokens = 0
+        
+        started = time.monotonic()
+        limiter.acquire()
+        assert time.monotonic() - started >= 0.09
+    
+    def test_scheduler_queues_notification(self, tmp_path, sample_event_data):
+        """Test that reminder emails go through the delivery queue"""
+        outbox = []
+        delivery = self.make_delivery(lambda: LocalTransport(outbox))
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'), email=delivery)
+        event = scheduler.add_event(**sample_event_data, reminders=[])
+        
+        scheduler.send_email_notification(event)
+        
+        assert self.wait_for(lambda: outbox)
+        assert 'Event Reminder: Test Meeting' in outbox[0][2]
+
+class TestReminderActions:
+    """Test cases for the background reminder action pipeline"""
+    
+    REMINDER = {'calendar': 'default', 'event': {'id': 'e1', 'title': 'Standup'}, 'start_ts': 0, 'fire_ts': 0}
+    
+    def make_actions(self, tmp_path, actions, **config):
+        settings = dict({'retry_backoff': 0.01}, **config)
+        return ReminderActions(None, actions, str(tmp_path / 'events.json.actions'),
+                               str(tmp_path / 'events.json.deadletter'), settings)
+    
+    def recording_type(self, calls, wait=None):
+        class RecordingAction:
+            def __init__(self, config, scheduler):
+                self.name = config.get('name')
+            
+            def run(self, reminder, timeout):
+                if wait is not None:
+                    wait.wait()
+                calls.append((self.name, reminder['event']['id']))
+        return RecordingAction
+    
+    def dead_letters(self, tmp_path):
+        path = tmp_path / 'events.json.deadletter'
+        return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+    
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+    
+    def test_slow_action_does_not_hold_up_others(self, tmp_path, monkeypatch):
+        """Test that each action runs on its own pool, off the submitting thread"""
+        release, calls = threading.Event(), []
+        monkeypatch.setitem(app_module.ACTION_TYPES, 'slow', self.recording_type(calls, release))
+        monkeypatch.setitem(app_module.ACTION_TYPES, 'fast', self.recording_type(calls))
+        actions = self.make_actions(tmp_path, [{'type': 'slow', 'name': 'slow'}, {'type': 'fast', 'name': 'fast'}],
+                                    workers=1)
+        
+        started = time.perf_counter()
+        for i in range(5):
+            actions.submit(dict(self.REMINDER, event={'id': f'e{i}'}))
+        assert time.perf_counter() - started < 0.5
+        assert self.wait_for(lambda: len(calls) == 5)
+        assert {name for name, _ in calls} == {'fast'}
+        release.set()
+        assert self.wait_for(lambda: len(calls) == 10)
+    
+    def test_webhook_posts_reminder(self, tmp_path):
+        """Test that the webhook action POSTs the reminder as JSON"""
+        received = []
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append((self.headers['Content-Type'],
+                                 json.loads(self.rfile.read(int(self.headers['Content-Length'])))))
+                self.send_response(204)
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            actions = self.make_actions(tmp_path, [{'type': 'webhook',
+                                                    'url': f'http://127.0.0.1:{server.server_port}/hook'}])
+            actions.submit(self.REMINDER)
+            assert self.wait_for(lambda: received)
+        finally:
+            server.shutdown()
+        assert received == [('application/json', self.REMINDER)]
+    
+    def test_command_gets_reminder_on_stdin(self, tmp_path):
+        """Test that the command action pipes the reminder to the command"""
+        output = tmp_path / 'reminder.json'
+        script = f'import sys; open({str(output)!r}, "w").write(sys.stdin.read())'
+        actions = self.make_actions(tmp_path, [{'type': 'command', 'args': [sys.executable, '-c', script]}])
+        
+        actions.submit(self.REMINDER)
+        
+        assert self.wait_for(lambda: output.exists() and output.read_text())
+        assert json.loads(output.read_text()) == self.REMINDER
+    
+    def test_failures_retry_then_dead_letter(self, tmp_path):
+        """Test backoff retries, then the dead-letter file once max_retries attempts also failed"""
+        actions = self.make_actions(tmp_path, [{'type': 'command', 'args': [sys.executable, '-c', 'exit(3)']}],
+                                    max_retries=2)
+        
+        actions.submit(self.REMINDER)
+        
+        assert self.wait_for(lambda: self.dead_letters(tmp_path))
+        [letter] = self.dead_letters(tmp_path)
+        assert letter['attempt'] == 2
+        assert letter['reminder'] == self.REMINDER
+        assert 'Exit status 3' in letter['error']
+        assert actions.metrics()['retrying'] == 0
+        assert json.loads((tmp_path / 'events.json.actions').read_text()) == []
+    
+    def test_timeout_fails_the_attempt(self, tmp_path):
+        """Test that an action running past its timeout counts as failed"""
+        actions = self.make_actions(tmp_path, [{'type': 'command', 'timeout': 0.1,
+                                                'args': [sys.executable, '-c', 'import time; time.sleep(5)']}],
+                                    max_retries=0)
+        
+        actions.submit(self.REMINDER)
+        
+        assert self.wait_for(lambda: self.dead_letters(tmp_path), timeout=3)
+        assert 'TimeoutExpired' in self.dead_letters(tmp_path)[0]['error']
+    
+    def test_pending_retries_survive_restart(self, tmp_path, monkeypatch):
+        """Test that retries persisted by one process are run by the next"""
+        calls = []
+        monkeypatch.setitem(app_module.ACTION_TYPES, 'record', self.recording_type(calls))
+        job = {'id': 'j1', 'action': 'restarted', 'reminder': self.REMINDER, 'attempt': 1, 'due': time.time(),
+               'error': 'connection refused'}
+        (tmp_path / 'events.json.actions').write_text(json.dumps([job]))
+        
+        actions = self.make_actions(tmp_path, [{'type': 'record', 'name': 'restarted'}])
+        
+        assert self.wait_for(lambda: calls)
+        assert calls == [('restarted', 'e1')]
+        assert self.wait_for(lambda: json.loads((tmp_path / 'events.json.actions').read_text()) == [])
+        assert actions.metrics()['retrying'] == 0
+    
+    def test_full_queue_parks_jobs_as_retries(self, tmp_path, monkeypatch):
+        """Test that jobs beyond an action's queue bound wait in the retry queue instead of blocking"""
+        release, calls = threading.Event(), []
+        monkeypatch.setitem(app_module.ACTION_TYPES, 'slow', self.recording_type(calls, release))
+        actions = self.make_actions(tmp_path, [{'type': 'slow'}], queue_size=1, retry_backoff=0.2)
+        
+        for i in range(3):
+            actions.submit(dict(self.REMINDER, event={'id': f'e{i}'}))
+        
+        assert actions.metrics()['retrying'] == 2
+        release.set()
+        assert self.wait_for(lambda: len(calls) == 3)
+    
+    def test_scheduler_runs_configured_actions(self, tmp_path, sample_event_data, monkeypatch):
+        """Test that sent reminders are handed to the actions in REMINDER_CONFIG"""
+        calls = []
+        monkeypatch.setitem(app_module.ACTION_TYPES, 'record', self.recording_type(calls))
+        monkeypatch.setitem(app_module.REMINDER_CONFIG, 'actions', [{'type': 'record', 'name': 'record'}])
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        start = datetime.now() + timedelta(seconds=0.2)
+        event = scheduler.add_event(**dict(sample_event_data, recurring=None, start_time=start.isoformat()),
+                                    reminders=[0])
+        
+        assert self.wait_for(lambda: calls)
+        assert calls == [('record', event['id'])]
+
+class TestAvailability:
+    """Test cases for conflict detection and free-busy queries"""
+    
+    def add(self, scheduler, start, minutes, **fields):
+        start = datetime(2030, 1, 1) + timedelta(minutes=start)
+        return scheduler.add_event(title=fields.pop('title', 'Busy'), description='', start_time=start.isoformat(),
+                                   end_time=(start + timedelta(minutes=minutes)).isoformat(), reminders=[], **fields)
+    
+    @pytest.mark.parametrize('backend', ['json', 'sqlite'])
+    def test_overlaps_match_brute_force(self, tmp_path, backend):
+        """Test that the interval index finds exactly the overlapping events, long ones included"""
+        rng = random.Random(7)
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'), storage_config={'backend': backend})
+        events = [self.add(scheduler, rng.randrange(0, 20000), rng.choice([0, 15, 30, 90, 600, 5000]))
+                  for _ in range(300)]
+        for event in events[::3]:
+            scheduler.delete_event(event['id'])
+        for event in events[1::3]:
+            scheduler.update_event(event['id'], end_time=event['start_time'])
+        remaining = scheduler.get_all_events()
+        
+        base = datetime(2030, 1, 1).timestamp()
+        for _ in range(50):
+            lo = base + rng.randrange(0, 20000) * 60
+            hi = lo + rng.choice([0, 60, 3600, 86400])
+            expected = {e['id'] for e in remaining if e.start_ts < hi and e.end_ts > lo}
+            assert {e['id'] for e in scheduler.find_conflicts(lo, hi)} == expected
+    
+    def test_conflicts_and_freebusy_endpoints(self, tmp_path, monkeypatch, client):
+        """Test that touching events do not conflict and busy intervals are merged"""
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        monkeypatch.setattr(app_module, 'scheduler', scheduler)
+        first = self.add(scheduler, 60, 60)     # 01:00-02:00
+        self.add(scheduler, 90, 60)             # 01:30-02:30
+        self.add(scheduler, 150, 30)            # 02:30-03:00, touches the previous one
+        self.add(scheduler, 300, 60)            # 05:00-06:00, outside the window
+        
+        response = client.get('/api/events/conflicts?start=2030-01-01T00:00:00&end=2030-01-01T01:00:00')
+        assert json.loads(response.data) == {'success': True, 'free': True, 'events': []}
+        data = json.loads(client.get('/api/events/conflicts?start=2030-01-01T00:30:00&end=2030-01-01T01:15:00').data)
+        assert [e['id'] for e in data['events']] == [first['id']]
+        
+        data = json.loads(client.get('/api/events/freebusy?start=2030-01-01T00:00:00&end=2030-01-01T04:00:00').data)
+        assert data['busy'] == [{'start': '2030-01-01T01:00:00', 'end': '2030-01-01T03:00:00'}]
+        assert data['free'] == [{'start': '2030-01-01T00:00:00', 'end': '2030-01-01T01:00:00'},
+                                {'start': '2030-01-01T03:00:00', 'end': '2030-01-01T04:00:00'}]
+        assert client.get('/api/events/freebusy?start=2030-01-02&end=2030-01-01').status_code == 400
+    
+    def test_recurring_occurrences_conflict(self, tmp_path):
+        """Test that occurrences of a series are busy and a new series is checked against events"""
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        standup = self.add(scheduler, 9 * 60, 15, recurring='daily')
+        third_day = datetime(2030, 1, 3, 9, 5).timestamp()
+        assert [e['id'] for e in scheduler.find_conflicts(third_day, third_day + 60)] == [standup['id']]
+        
+        later = self.add(scheduler, 10 * 24 * 60 + 9 * 60, 60)
+        with pytest.raises(app_module.ConflictError) as error:
+            self.add(scheduler, 9 * 60 + 30, 60, recurring='FREQ=DAILY;INTERVAL=5', reject_conflicts=True)
+        assert [e['id'] for e in error.value.events] == [later['id']]
+    
+    def test_series_conflicts_checked_outside_write_lock(self, tmp_path, monkeypatch):
+        """Test that a series is expanded without the write lock and writes made meanwhile are re-checked"""
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        moved = self.add(scheduler, 20 * 24 * 60 + 9 * 60, 60)
+        overlapping, read = scheduler._overlapping, scheduler.lock.read
+        pending = [lambda: self.add(scheduler, 40 * 24 * 60 + 9 * 60, 45),
+                   lambda: scheduler.update_event(moved['id'], start_time='2030-01-21T12:00:00',
+                                                  end_time='2030-01-21T13:00:00')]
+        
+        def expand(start_ts, end_ts):
+            assert not scheduler.lock.writing
+            return overlapping(start_ts, end_ts)
+        
+        @contextmanager
+        def read_then_write():
+            with read():
+                yield
+            while pending:
+                pending.pop()()
+        
+        monkeypatch.setattr(scheduler, '_overlapping', expand)
+        monkeypatch.setattr(scheduler.lock, 'read', read_then_write)
+        with pytest.raises(app_module.ConflictError) as error:
+            self.add(scheduler, 9 * 60 + 30, 60, recurring='FREQ=DAILY;INTERVAL=10', reject_conflicts=True)
+        assert [e['start_time'] for e in error.value.events] == ['2030-02-10T09:00:00']
+    
+    def test_create_event_rejects_conflicts(self, tmp_path, monkeypatch, client, sample_event_data):
+        """Test that reject_conflicts refuses an overlapping event with 409 and lists the conflicts"""
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        monkeypatch.setattr(app_module, 'scheduler', scheduler)
+        body = dict(sample_event_data, recurring=None, reject_conflicts=True)
+        assert client.post('/api/events', data=json.dumps(body), content_type='application/json').status_code == 201
+        
+        response = client.post('/api/events', data=json.dumps(body), content_type='application/json')
+        assert response.status_code == 409
+        assert len(json.loads(response.data)['conflicts']) == 1
+        body['reject_conflicts'] = False
+        assert client.post('/api/events', data=json.dumps(body), content_type='application/json').status_code == 201
+        body['reject_conflicts'] = 'yes'
+        assert client.post('/api/events', data=json.dumps(body), content_type='application/json').status_code == 400
+
+class TestChangeFeed:
+    """Test cases for the change sequence"""
+    
+    def test_since_returns_ordered_deltas(self):
+        """Test that changes after a sequence number are returned in order"""
+        feed = ChangeFeed()
+        start = feed.seq
+        feed.record('put', {'id': 'a', 'title': 'A'})
+        feed.record('delete', {'id': 'a'})
+        
+        changes = feed.since(start)
+        assert [c['seq'] for c in changes] == [start + 1, start + 2]
+        assert changes[0]['event']['title'] == 'A'
+        assert changes[1] == {'seq': start + 2, 'op': 'delete', 'id': 'a'}
+        assert feed.since(start + 2) == []
+    
+    def test_since_requires_reset_when_out_of_range(self):
+        """Test that trimmed or future sequence numbers ask the client to reload"""
+        feed = ChangeFeed(maxlen=2)
+        start = feed.seq
+        for i in range(3):
+            feed.record('put', {'id': str(i)})
+        
+        assert feed.since(start) is None
+        assert len(feed.since(start + 1)) == 2
+        assert feed.since(feed.seq + 1) is None
+    
+    def test_wait_wakes_on_change(self):
+        """Test that waiters return as soon as a change is recorded"""
+        feed = ChangeFeed()
+        start = feed.seq
+        
+        assert feed.wait(start, timeout=0.01) is False
+        threading.Timer(0.05, feed.record, ('put', {'id': 'x'})).start()
+        assert feed.wait(start, timeout=5) is True
+
+class TestTimezones:
+    """Test cases for time normalization and DST boundaries (America/New_York changes on 2030-03-10 and 2030-11-03)"""
+    
+    ZONE = 'America/New_York'
+    
+    def utc(self, *args):
+        return datetime(*args, tzinfo=timezone.utc).timestamp()
+    
+    def add(self, scheduler, start, end, **fields):
+        return scheduler.add_event(title='Standup', description='', start_time=start, end_time=end,
+                                   **dict({'timezone': self.ZONE, 'reminders': []}, **fields))
+    
+    def test_times_stored_in_original_zone_with_utc_instant(self, scheduler):
+        """Test that naive times are wall-clock times in the zone and offsets are converted into it"""
+        winter = self.add(scheduler, '2030-01-15T09:00:00', '2030-01-15T10:00:00')
+        summer = self.add(scheduler, '2030-07-01T16:00:00Z', '2030-07-01 17:00:00+00:00')
+        
+        assert (winter['start_time'], winter['timezone']) == ('2030-01-15T09:00:00-05:00', self.ZONE)
+        assert winter.start_ts == self.utc(2030, 1, 15, 14)
+        assert (summer['start_time'], summer['end_time']) == ('2030-07-01T12:00:00-04:00', '2030-07-01T13:00:00-04:00')
+        assert summer.start_ts == self.utc(2030, 7, 1, 16)
+    
+    def test_skipped_and_repeated_wall_times(self, scheduler):
+        """Test that a time in the spring gap moves forward and one in the autumn overlap takes its first instant"""
+        gap = self.add(scheduler, '2030-03-10T02:30:00', '2030-03-10T04:00:00')
+        overlap = self.add(scheduler, '2030-11-03T01:30:00', '2030-11-03T03:00:00')
+        
+        assert gap['start_time'] == '2030-03-10T03:30:00-04:00' and gap.start_ts == self.utc(2030, 3, 10, 7, 30)
+        assert overlap['start_time'] == '2030-11-03T01:30:00-04:00' and overlap.start_ts == self.utc(2030, 11, 3, 5, 30)
+        assert overlap.end_ts - overlap.start_ts == 2.5 * 3600  # 01:30 EDT to 03:00 EST spans the repeated hour
+    
+    @pytest.mark.parametrize('start, utc_hours', [('2030-03-08', [14, 14, 13, 13]), ('2030-11-01', [13, 13, 14, 14])])
+    def test_series_keeps_wall_clock_across_dst(self, scheduler, start, utc_hours):
+        """Test that a daily 09:00 series stays at 09:00 local, so its UTC instant shifts by an hour"""
+        series = self.add(scheduler, f'{start}T09:00:00', f'{start}T09:30:00', recurring='daily')
+        first = parse_datetime(series['start_time']).timestamp()
+        
+        occurrences = scheduler.get_occurrences(first, first + 3.5 * 86400)
+        assert [parse_datetime(e['start_time']).strftime('%H:%M') for e in occurrences] == ['09:00'] * 4
+        assert [datetime.fromtimestamp(parse_datetime(e['start_time']).timestamp(), timezone.utc).hour
+                for e in occurrences] == utc_hours
+        assert all(parse_datetime(e['end_time']).strftime('%H:%M') == '09:30' for e in occurrences)
+        after = list(itertools.islice(scheduler.recurrence.iter_after(series['id'], first - 1), 4))
+        assert [datetime.fromtimestamp(ts, timezone.utc).hour for ts in after] == utc_hours
+    
+    def test_exceptions_and_end_are_in_the_zone(self, scheduler):
+        """Test that naive exceptions and series ends are wall-clock times in the event's zone"""
+        series = self.add(scheduler, '2030-03-08T09:00:00', '2030-03-08T09:30:00', recurring='daily',
+                          exceptions=['2030-03-11T09:00:00'], recurrence_end='2030-03-12T09:00:00')
+        
+        assert series['exceptions'] == ['2030-03-11T09:00:00-04:00']
+        occurrences = scheduler.get_occurrences(self.utc(2030, 3, 8), self.utc(2030, 3, 20))
+        assert [e['start_time'][:10] for e in occurrences] == ['2030-03-08', '2030-03-09', '2030-03-10', '2030-03-12']
+    
+    def test_windows_order_mixed_naive_and_aware_events(self, scheduler):
+        """Test that naive, offset and zoned events share one timeline compared by UTC instant"""
+        start = datetime.now().replace(microsecond=0) + timedelta(minutes=10)
+        naive = scheduler.add_event('Naive', '', start.isoformat(), (start + timedelta(hours=1)).isoformat(), reminders=[])
+        utc_start = datetime.fromtimestamp(start.timestamp() - 60, timezone.utc)
+        aware = scheduler.add_event('Aware', '', utc_start.isoformat(), (utc_start + timedelta(hours=1)).isoformat(),
+                                    reminders=[])
+        zoned = self.add(scheduler, (utc_start + timedelta(minutes=2)).isoformat(), (utc_start + timedelta(hours=1)).isoformat(),
+                         timezone='Asia/Tokyo')
+        
+        assert [e['title'] for e in scheduler.get_upcoming_events(hours=1)] == ['Aware', 'Naive', 'Standup']
+        assert zoned['start_time'].endswith('+09:00') and naive['start_time'] == start.isoformat()
+        assert aware.start_ts == start.timestamp() - 60
+    
+    def test_reminders_fire_at_the_utc_instant(self, tmp_path):
+        """Test that reminder deadlines are computed from the stored instant, not the wall-clock string"""
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=2)
+        event = self.add(scheduler, start.astimezone(tz.gettz('Asia/Tokyo')).replace(tzinfo=None).isoformat(),
+                         (start + timedelta(hours=1)).isoformat(), timezone='Asia/Tokyo', reminders=[10])
+        
+        assert event.start_ts == start.timestamp()
+        assert [entry[0] for entry in scheduler.reminders.heap] == [start.timestamp() - 600]
+    
+    def test_unparseable_times_are_errors(self, tmp_path, sample_event_data):
+        """Test that bad times raise instead of sorting last, and loading skips only the bad event"""
+        with pytest.raises(ValueError):
+            app_module.to_timestamp('not a date')
+        with pytest.raises(ValueError):
+            Event(id='bad', title='', description='', start_time='soon', end_time='later')
+        
+        good = dict(sample_event_data, id='good')
+        (tmp_path / 'events.json').write_text(json.dumps([dict(good, id='bad', start_time='soon'), good]))
+        assert [e['id'] for e in EventScheduler(events_file=str(tmp_path / 'events.json')).events] == ['good']
+    
+    def test_api_validates_and_updates_timezone(self, client, sample_event_data):
+        """Test that unknown zones are rejected and changing the zone re-expresses naive wall-clock times"""
+        body = dict(sample_event_data, start_time='2030-01-15T09:00:00', end_time='2030-01-15T10:00:00')
+        response = client.post('/api/events', data=json.dumps(dict(body, timezone='Mars/Olympus')),
+                               content_type='application/json')
+        assert response.status_code == 400
+        
+        event = client.post('/api/events', data=json.dumps(body), content_type='application/json').get_json()['event']
+        assert event['start_time'] == '2030-01-15T09:00:00' and event['timezone'] is None
+        updated = client.put(f"/api/events/{event['id']}", data=json.dumps({'timezone': 'Asia/Tokyo'}),
+                             content_type='application/json').get_json()['event']
+        assert (updated['start_time'], updated['end_time']) == ('2030-01-15T09:00:00+09:00', '2030-01-15T10:00:00+09:00')
+        moved = client.put(f"/api/events/{event['id']}", data=json.dumps({'start_time': '2030-01-15T08:00:00'}),
+                           content_type='application/json').get_json()['event']
+        assert moved['start_time'] == '2030-01-15T08:00:00+09:00'
+    
+    def test_ics_round_trip_keeps_zone(self, client, sample_event_data):
+        """Test that a zoned series is exported with its TZID and imported back unchanged"""
+        client.post('/api/events', content_type='application/json', data=json.dumps(dict(
+            sample_event_data, start_time='2030-03-08T09:00:00', end_time='2030-03-08T09:30:00',
+            recurring='daily', exceptions=['2030-03-11T09:00:00'], timezone=self.ZONE)))
+        feed = client.get('/api/calendar.ics').data.decode()
+        assert 'DTSTART;TZID=America/New_York:20300308T090000\r\n' in feed
+        assert 'EXDATE;TZID=America/New_York:20300311T090000\r\n' in feed
+        
+        client.post('/api/calendar/import', data=feed, content_type='text/calendar', headers={'X-Calendar': 'copy'})
+        copy, = client.get('/api/events', headers={'X-Calendar': 'copy'}).get_json()['events']
+        original, = client.get('/api/events').get_json()['events']
+        assert dict(copy, created_at=None) == dict(original, created_at=None)
+
+class TestReminderDispatcher:
+    """Test cases for heap-based reminder dispatch"""
+    
+    def make_scheduler(self, tmp_path, fired):
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        scheduler.send_reminder = lambda event, start_ts, fire_ts: fired.append((event['id'], time.time() - fire_ts))
+        return scheduler
+    
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+    
+    def test_fires_at_offset_once(self, tmp_path, sample_event_data):
+        """Test that a reminder fires on time and not again after a restart"""
+        fired = []
+        scheduler = self.make_scheduler(tmp_path, fired)
+        start = datetime.now() + timedelta(minutes=1)
+        event = scheduler.add_event(**dict(sample_event_data, start_time=start.isoformat()), reminders=[59.995 / 60])
+        
+        assert self.wait_for(lambda: fired)
+        assert fired[0][0] == event['id']
+        assert fired[0][1] < 1  # fired within a second of its deadline
+        
+        refired = []
+        self.make_scheduler(tmp_path, refired)
+        time.sleep(0.2)
+        assert refired == []
+    
+    def test_update_to_earlier_time_wakes_dispatcher(self, tmp_path, sample_event_data):
+        """Test that moving an event earlier re-arms the sleeping dispatcher"""
+        fired = []
+        scheduler = self.make_scheduler(tmp_path, fired)
+        event = scheduler.add_event(**dict(sample_event_data, recurring=None), reminders=[0])
+        time.sleep(0.05)
+        
+        start = datetime.now() + timedelta(seconds=0.2)
+        scheduler.update_event(event['id'], start_time=start.isoformat())
+        
+        assert self.wait_for(lambda: fired)
+        assert [event_id for event_id, _ in fired] == [event['id']]
+    
+    def test_deleted_event_does_not_fire(self, tmp_path, sample_event_data):
+        """Test that reminders of deleted events are discarded"""
+        fired = []
+        scheduler = self.make_scheduler(tmp_path, fired)
+        start = datetime.now() + timedelta(seconds=0.2)
+        event = scheduler.add_event(**dict(sample_event_data, start_time=start.isoformat()), reminders=[0])
+        scheduler.delete_event(event['id'])
+        
+        time.sleep(0.4)
+        assert fired == []
+    
+    def test_create_event_rejects_bad_reminders(self, client, sample_event_data):
+        """Test validation of reminder offsets"""
+        response = client.post('/api/events',
+                             data=json.dumps(dict(sample_event_data, reminders=[-5])),
+                             content_type='application/json')
+        
+        assert response.status_code == 400
+        assert 'Invalid reminders' in json.loads(response.data)['error']
+
+class TestEventStorage:
+    """Test cases for snapshot and write-ahead log persistence"""
+    
+    def wal_scheduler(self, tmp_path, **config):
+        config.setdefault('mode', 'wal')
+        return EventScheduler(events_file=str(tmp_path / 'events.json'), storage_config=config)
+    
+    def test_json_mode_writes_atomically(self, tmp_path, sample_event_data):
+        """Test that json mode leaves a complete snapshot and no temp files"""
+        events_file = tmp_path / 'events.json'
+        scheduler = EventScheduler(events_file=str(events_file))
+        event = scheduler.add_event(**sample_event_data, reminders=[])
+        
+        assert json.loads(events_file.read_text())[0]['id'] == event['id']
+        assert os.listdir(tmp_path) == ['events.json']
+    
+    def test_wal_replay_on_startup(self, tmp_path, sample_event_data):
+        """Test that logged mutations are replayed by a new scheduler"""
+        scheduler = self.wal_scheduler(tmp_path)
+        kept = scheduler.add_event(**sample_event_data)
+        removed = scheduler.add_event(**sample_event_data)
+        scheduler.update_event(kept['id'], title='Renamed')
+        scheduler.delete_event(removed['id'])
+        scheduler.store.log.sync()
+        
+        assert not (tmp_path / 'events.json').exists()
+        reloaded = self.wal_scheduler(tmp_path)
+        assert [e['id'] for e in reloaded.events] == [kept['id']]
+        assert reloaded.events[0]['title'] == 'Renamed'
+    
+    def test_wal_ignores_torn_record(self, tmp_path, sample_event_data):
+        """Test that a partially written final record is skipped"""
+        scheduler = self.wal_scheduler(tmp_path)
+        event = scheduler.add_event(**sample_event_data)
+        scheduler.store.log.sync()
+        with open(scheduler.store.wal_file, 'a') as f:
+            f.write('{"op":"put","event":{"id":')
+        
+        reloaded = self.wal_scheduler(tmp_path)
+        assert [e['id'] for e in reloaded.events] == [event['id']]
+    
+    def test_compaction_folds_log_into_snapshot(self, tmp_path, sample_event_data):
+        """Test that compaction writes a snapshot and empties the log"""
+        scheduler = self.wal_scheduler(tmp_path)
+        event = scheduler.add_event(**sample_event_data)
+        scheduler.store.compact()
+        
+        assert scheduler.store.log.records == 0
+        assert list(EventLog.replay(scheduler.store.wal_file)) == []
+        snapshot = json.loads((tmp_path / 'events.json').read_text())
+        assert [e['id'] for e in snapshot] == [event['id']]
+        assert [e['id'] for e in self.wal_scheduler(tmp_path).events] == [event['id']]
+    
+    def test_interrupted_compaction_recovers(self, tmp_path, sample_event_data):
+        """Test that a log left aside by a crashed compaction is still replayed"""
+        scheduler = self.wal_scheduler(tmp_path)
+        first = scheduler.add_event(**sample_event_data)
+        scheduler.store.log.rotate()
+        second = scheduler.add_event(**sample_event_data)
+        scheduler.store.log.sync()
+        
+        reloaded = self.wal_scheduler(tmp_path)
+        assert {e['id'] for e in reloaded.events} == {first['id'], second['id']}
+        assert not os.path.exists(reloaded.store.wal_file + '.old')
+    
+    def test_json_mode_folds_leftover_log(self, tmp_path, sample_event_data):
+        """Test that switching from wal to json mode replays the log into events.json"""
+        scheduler = self.wal_scheduler(tmp_path)
+        first = scheduler.add_event(**sample_event_data)
+        scheduler.store.log.rotate()
+        second = scheduler.add_event(**sample_event_data)
+        scheduler.store.log.sync()
+        
+        reloaded = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        assert {e['id'] for e in reloaded.events} == {first['id'], second['id']}
+        assert not any(name.startswith('events.json.wal') for name in os.listdir(tmp_path))
+        reloaded.update_event(first['id'], title='Renamed')
+        assert EventScheduler(events_file=str(tmp_path / 'events.json')).get_event_by_id(first['id'])['title'] == 'Renamed'
+    
+    def test_threshold_triggers_background_compaction(self, tmp_path, sample_event_data):
+        """Test that reaching the record threshold compacts without waiting for the interval"""
+        scheduler = self.wal_scheduler(tmp_path, compact_threshold=3)
+        for _ in range(3):
+            scheduler.add_event(**sample_event_data)
+        
+        for _ in range(100):
+            if (tmp_path / 'events.json').exists():
+                break
+            time.sleep(0.01)
+        assert len(json.loads((tmp_path / 'events.json').read_text())) == 3
+
+    def test_binary_snapshot_round_trip(self, tmp_path, sample_event_data):
+        """Test that the binary snapshot replaces events.json and reloads with parsed times"""
+        events_file = tmp_path / 'events.json'
+        legacy = EventScheduler(events_file=str(events_file))
+        first = legacy.add_event(**sample_event_data)
+        
+        scheduler = self.wal_scheduler(tmp_path, snapshot='binary')
+        assert [e['id'] for e in scheduler.events] == [first['id']]  # migrated from events.json
+        second = scheduler.add_event(**sample_event_data)
+        scheduler.store.compact()
+        
+        snapshot = read_snapshot(str(events_file) + '.bin')
+        assert [e.id for e in snapshot] == [first['id'], second['id']]
+        assert snapshot[1].start_ts == second.start_ts and snapshot[1] == second
+        reloaded = self.wal_scheduler(tmp_path, snapshot='binary')
+        assert {e['id'] for e in reloaded.events} == {first['id'], second['id']}
+    
+    @pytest.mark.parametrize('mode', ['json', 'wal'])
+    def test_switching_back_to_json_snapshot(self, tmp_path, sample_event_data, mode):
+        """Test that a json store reads a newer binary snapshot and then removes it"""
+        events_file = tmp_path / 'events.json'
+        first = EventScheduler(events_file=str(events_file)).add_event(**sample_event_data)
+        time.sleep(0.01)
+        scheduler = self.wal_scheduler(tmp_path, snapshot='binary')
+        second = scheduler.add_event(**sample_event_data)
+        scheduler.store.compact()
+        
+        switched = self.wal_scheduler(tmp_path, mode=mode)
+        assert {e['id'] for e in switched.events} == {first['id'], second['id']}
+        switched.delete_event(first['id'])
+        switched.store.save_events()
+        assert not os.path.exists(str(events_file) + '.bin')
+        assert [e['id'] for e in self.wal_scheduler(tmp_path, mode=mode).events] == [second['id']]
+    
+    def test_corrupt_binary_snapshot_is_rejected(self, tmp_path):
+        """Test that a file without the snapshot header is not decoded"""
+        path = tmp_path / 'events.json.bin'
+        path.write_bytes(b'not a snapshot at all')
+        with pytest.raises(ValueError):
+            read_snapshot(str(path))
+    
+    @pytest.mark.parametrize('magic, row_slice', [(b'EVSNAP01', lambda row: row[:9] + row[11:]),
+                                                   (b'EVSNAP02', lambda row: row[:10] + row[11:])])
+    def test_legacy_binary_snapshot_is_read(self, tmp_path, sample_event_data, magic, row_slice):
+        """Test that snapshots written before events had recipients or a timezone still load"""
+        import marshal
+        event = EventScheduler(events_file=str(tmp_path / 'events.json')).add_event(**sample_event_data)
+        path = tmp_path / 'legacy.bin'
+        path.write_bytes(app_module.SNAPSHOT_HEADER.pack(magic, marshal.version, 1) +
+                         marshal.dumps([row_slice(event.row())]))
+        
+        loaded, = read_snapshot(str(path))
+        assert loaded == event and loaded.recipients is None and loaded.timezone is None
+    
+    def test_search_index_built_on_first_search(self, tmp_path, sample_event_data):
+        """Test that loading skips the text index until something is searched"""
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        scheduler.add_event(**sample_event_data)
+        reloaded = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        assert reloaded.store.search_index is None
+        
+        reloaded.add_event(**dict(sample_event_data, title='Planning'))
+        assert [e['title'] for e in reloaded.search_events('planning')] == ['Planning']
+        assert len(reloaded.store.search_index.docs) == 2
+
+class TestStartup:
+    """Test cases for the application factory and lazy loading"""
+    
+    def test_factory_defers_loading_until_first_request(self, tmp_path, sample_event_data):
+        """Test that creating the app touches no files and the first request loads the store"""
+        events_file = tmp_path / 'events.json'
+        events_file.write_text(json.dumps([dict(sample_event_data, id='e1')]))
+        app = create_app(events_file=str(events_file), run_reminders=False)
+        assert app.extensions['scheduler']._store is None
+        
+        response = app.test_client().get('/api/events/e1')
+        assert response.status_code == 200
+        assert app.extensions['scheduler']._store is not None
+        assert app.extensions['scheduler'].reminders is None
+    
+    def test_single_process_reminders(self, tmp_path, monkeypatch):
+        """Test that only the process holding the reminder lock runs the dispatcher"""
+        monkeypatch.setitem(app_module.REMINDER_CONFIG, 'single_process', True)
+        events_file = str(tmp_path / 'events.json')
+        first = EventScheduler(events_file=events_file, storage_config={'mode': 'wal'})
+        second = EventScheduler(events_file=events_file, storage_config={'mode': 'wal'})
+        
+        assert first.reminders is not None
+        assert second.reminders is None
+
+class TestSQLiteStore:
+    """Test cases for the SQLite storage backend"""
+    
+    def sqlite_scheduler(self, tmp_path):
+        return EventScheduler(events_file=str(tmp_path / 'events.json'), storage_config={'backend': 'sqlite'})
+    
+    def add(self, scheduler, sample_event_data, **fields):
+        return scheduler.add_event(**dict(sample_event_data, recurring=None, **fields), reminders=[])
+    
+    def test_crud_persists_across_restart(self, tmp_path, sample_event_data):
+        """Test that writes land in events.db and survive reopening"""
+        scheduler = self.sqlite_scheduler(tmp_path)
+        kept = self.add(scheduler, sample_event_data)
+        removed = self.add(scheduler, sample_event_data)
+        scheduler.update_event(kept['id'], title='Renamed')
+        assert scheduler.delete_event(removed['id']) is True
+        assert scheduler.delete_event(removed['id']) is False
+        
+        reopened = self.sqlite_scheduler(tmp_path)
+        assert (tmp_path / 'events.db').exists()
+        assert not (tmp_path / 'events.json').exists()
+        assert reopened.get_event_by_id(kept['id'])['title'] == 'Renamed'
+        assert reopened.get_event_by_id(removed['id']) is None
+        assert len(reopened.store) == 1
+    
+    def test_ordering_pages_and_ranges(self, tmp_path, sample_event_data):
+        """Test start time ordering, keyset pages and windows"""
+        scheduler = self.sqlite_scheduler(tmp_path)
+        scheduler.store.CHUNK_SIZE = 2
+        starts = ['2030-01-01T12:00:00', '2030-01-01T09:00:00', '2030-01-02T09:00:00', '2030-01-01T10:00:00']
+        for start in starts:
+            self.add(scheduler, sample_event_data, start_time=start)
+        
+        assert [e['start_time'] for e in scheduler.get_all_events()] == sorted(starts)
+        page, next_key = scheduler.get_events_page(limit=3)
+        rest, last_key = scheduler.get_events_page(next_key, limit=3)
+        assert [e['start_time'] for e in page + rest] == sorted(starts)
+        assert last_key is None
+        
+        window = scheduler.get_occurrences(datetime(2030, 1, 1, 9, 30).timestamp(),
+                                           datetime(2030, 1, 1, 23, 0).timestamp())
+        assert [e['start_time'] for e in window] == ['2030-01-01T10:00:00', '2030-01-01T12:00:00']
+    
+    def test_search_uses_full_text_index(self, tmp_path, sample_event_data):
+        """Test substring, prefix and ranking semantics match the JSON backend"""
+        scheduler = self.sqlite_scheduler(tmp_path)
+        assert scheduler.store.fts is True
+        standup = self.add(scheduler, sample_event_data, title='Daily standup', description='Team sync')
+        review = self.add(scheduler, sample_event_data, title='Design review', description='Daily design sync')
+        
+        assert {e['id'] for e in scheduler.search_events('sync dai')} == {standup['id'], review['id']}
+        assert [e['id'] for e in scheduler.search_events('daily')] == [standup['id'], review['id']]
+        assert [e['id'] for e in scheduler.search_events('andu')] == [standup['id']]
+        assert len(scheduler.search_events('daily', limit=1)) == 1
+        
+        scheduler.update_event(review['id'], description='Quarterly')
+        assert [e['id'] for e in scheduler.search_events('sync dai')] == [standup['id']]
+    
+    def test_connections_are_per_thread(self, tmp_path):
+        """Test that each thread reuses its own connection"""
+        store = SQLiteStore(str(tmp_path / 'events.json'), {})
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(store.connection()))
+        thread.start()
+        thread.join()
+        
+        assert store.connection() is store.connection()
+        assert connections[0] is not store.connection()
+    
+    def test_import_json_command(self, tmp_path, sample_event_data):
+        """Test migrating an events.json store (with its log) into SQLite"""
+        source = EventScheduler(events_file=str(tmp_path / 'events.json'), storage_config={'mode': 'wal'})
+        for i in range(3):
+            self.add(source, sample_event_data, title=f'Imported {i}')
+        source.store.log.sync()
+        
+        result = app.test_cli_runner().invoke(args=['import-json', str(tmp_path / 'events.json')])
+        
+        assert result.exit_code == 0
+        assert 'Imported 3 event(s)' in result.output
+        imported = self.sqlite_scheduler(tmp_path)
+        assert sorted(e['title'] for e in imported.get_all_events()) == ['Imported 0', 'Imported 1', 'Imported 2']
+
+class TestSharedStore:
+    """Test cases for several processes sharing one SQLite database"""
+    
+    def shared_scheduler(self, tmp_path, fired=None, **config):
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'), run_reminders=fired is not None,
+                                   storage_config=dict({'backend': 'sqlite', 'shared': True,
+                                                        'sync_interval': None}, **config))
+        if fired is not None:
+            scheduler.send_reminder = lambda event, start_ts, fire_ts: fired.append(event['id'])
+        return scheduler
+    
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+    
+    def test_processes_see_each_others_writes(self, tmp_path, sample_event_data):
+        """Test that writes, recurrence and the change feed carry over to the other process"""
+        first, second = self.shared_scheduler(tmp_path), self.shared_scheduler(tmp_path)
+        seq = second.changes.seq
+        event = first.add_event(**dict(sample_event_data, recurring='daily', start_time='2030-01-01T09:00:00',
+                                       end_time='2030-01-01T10:00:00'), reminders=[])
+        
+        second.sync()
+        assert second.changes.seq == first.changes.seq
+        assert [change['op'] for change in second.changes.since(seq)] == ['put']
+        window = (datetime(2030, 1, 1, 9).timestamp(), datetime(2030, 1, 3, 9).timestamp())
+        assert len(second.get_occurrences(*window)) == 3
+        
+        second.update_event(event['id'], recurring=None)
+        second.delete_event(first.add_event(**dict(sample_event_data, recurring=None), reminders=[])['id'])
+        first.sync()
+        assert len(first.get_occurrences(*window)) == 1
+        assert first.changes.since(seq) == second.changes.since(seq)
+        assert len(first.changes.since(seq)) == 4
+    
+    def test_process_behind_the_trimmed_log_reloads(self, tmp_path, sample_event_data):
+        """Test that a process missing trimmed changes rebuilds and makes clients reload"""
+        first, second = self.shared_scheduler(tmp_path), self.shared_scheduler(tmp_path)
+        seq = second.changes.seq
+        event = first.add_event(**dict(sample_event_data, recurring='weekly'), reminders=[])
+        first.add_event(**dict(sample_event_data, recurring=None), reminders=[])
+        first.store.trim_changes(1)
+        
+        second.sync()
+        assert second.changes.seq == first.changes.seq
+        assert second.changes.since(seq) is None
+        assert event['id'] in second.recurrence.series
+    
+    def test_requires_sqlite_backend(self, tmp_path):
+        """Test that a shared JSON store is refused"""
+        with pytest.raises(ValueError):
+            EventScheduler(events_file=str(tmp_path / 'events.json'), storage_config={'shared': True})
+    
+    def test_reminder_lease_fails_over(self, tmp_path, sample_event_data):
+        """Test that one process leads reminders and another takes over once its lease lapses"""
+        fired = []
+        leader = self.shared_scheduler(tmp_path, fired, lease_ttl=0.2)
+        standby = self.shared_scheduler(tmp_path, fired, lease_ttl=5)
+        assert leader.reminders is not None and leader.leads_reminders()
+        assert standby.reminders is None and not standby.leads_reminders()
+        
+        standby._lead_reminders()
+        assert standby.reminders is None
+        time.sleep(0.25)  # the leader stops renewing, as if it had died
+        standby._lead_reminders()
+        assert standby.leads_reminders() and not leader.leads_reminders()
+        
+        start = datetime.now() + timedelta(seconds=0.2)
+        event = leader.add_event(**dict(sample_event_data, recurring=None, start_time=start.isoformat()), reminders=[0])
+        standby.sync()
+        assert self.wait_for(lambda: fired)
+        assert fired == [event['id']]
+    
+    def test_stale_leader_sends_no_duplicates(self, tmp_path, sample_event_data):
+        """Test that a leader unaware its lease was taken cannot repeat the new leader's reminders"""
+        fired = []
+        stale = self.shared_scheduler(tmp_path, fired, lease_ttl=0.2)
+        time.sleep(0.25)
+        leader = self.shared_scheduler(tmp_path, fired, lease_ttl=5)
+        assert leader.reminders is not None
+        stale.lease_expires = float('inf')
+        
+        start = datetime.now() + timedelta(seconds=0.2)
+        event = stale.add_event(**dict(sample_event_data, recurring=None, start_time=start.isoformat()), reminders=[0])
+        leader.sync()
+        time.sleep(0.5)
+        assert fired == [event['id']]
+        assert len(stale.reminders.fired) == len(leader.reminders.fired) == 1
+    
+    def test_api_workers_share_writes_and_etags(self, tmp_path, sample_event_data):
+        """Test that a write through one worker is served, with the same ETag, by another"""
+        config = {'backend': 'sqlite', 'shared': True, 'sync_interval': None}
+        workers = [create_app(events_file=str(tmp_path / 'events.json'), storage_config=config,
+                              run_reminders=False).test_client() for _ in range(2)]
+        response = workers[0].post('/api/events', data=json.dumps(sample_event_data), content_type='application/json')
+        assert response.status_code == 201
+        
+        listings = [worker.get('/api/events') for worker in workers]
+        assert [len(listing.get_json()['events']) for listing in listings] == [1, 1]
+        assert listings[0].headers['ETag'] == listings[1].headers['ETag']
+    
+    def test_sync_thread_wakes_change_waiters(self, tmp_path, sample_event_data):
+        """Test that the background poll delivers another process's write to waiting streams"""
+        first = self.shared_scheduler(tmp_path)
+        second = self.shared_scheduler(tmp_path, sync_interval=0.05)
+        seq = second.changes.seq
+        first.add_event(**dict(sample_event_data, recurring=None), reminders=[])
+        
+        assert second.changes.wait(seq, 5)
+        assert second.changes.since(seq)[0]['op'] == 'put'
+
+class TestConcurrency:
+    """Test cases for concurrent access"""
+    
+    def test_readers_share_and_writers_exclude(self):
+        """Test that readers overlap while a writer waits for them"""
+        lock = ReadWriteLock()
+        events = []
+        
+        def reader():
+            with lock.read():
+                events.append('read-start')
+                time.sleep(0.1)
+                events.append('read-end')
+        
+        def writer():
+            with lock.write():
+                events.append('write')
+        
+        readers = [threading.Thread(target=reader) for _ in range(3)]
+        for thread in readers:
+            thread.start()
+        time.sleep(0.02)
+        writer_thread = threading.Thread(target=writer)
+        writer_thread.start()
+        for thread in readers + [writer_thread]:
+            thread.join()
+        
+        assert events[:3] == ['read-start'] * 3
+        assert events[-1] == 'write'
+    
+    def test_crud_stress_keeps_store_consistent(self, tmp_path, sample_event_data):
+        """Test that many threads hammering the API leave every index in sync"""
+        test_app = create_app(events_file=str(tmp_path / 'events.json'), storage_config={'mode': 'wal'},
+                              run_reminders=False)
+        test_app.extensions['calendars'].configure('default', {'max_concurrent': None})
+        scheduler = test_app.extensions['scheduler']
+        kept, errors = [], []
+        
+        def worker(n):
+            client = test_app.test_client()
+            try:
+                for i in range(40):
+                    body = json.dumps(dict(sample_event_data, title=f'Stress {n}-{i}', reminders=[]))
+                    event_id = json.loads(client.post('/api/events', data=body,
+                                                      content_type='application/json').data)['event']['id']
+                    client.put(f'/api/events/{event_id}', data=json.dumps({'title': f'Stress {n}-{i} updated'}),
+                               content_type='application/json')
+                    assert client.get('/api/events?limit=5').status_code == 200
+                    assert client.get('/api/events/search?q=stress').status_code == 200
+                    if i % 2:
+                        assert client.delete(f'/api/events/{event_id}').status_code == 200
+                    else:
+                        kept.append(event_id)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        store = scheduler.store
+        ids = {event['id'] for event in store.events}
+        assert ids == set(kept)
+        assert set(store.index) == ids and set(store.time_index.times) == ids and set(store.search_index.docs) == ids
+        assert all(store.events[pos]['id'] == event_id for event_id, pos in store.index.items())
+        assert len(store.time_index.keys) == len(ids)
+        assert all(event['title'].endswith('updated') for event in store.events)
+        store.log.sync()
+        reloaded = EventScheduler(events_file=str(tmp_path / 'events.json'), storage_config={'mode': 'wal'})
+        assert {event['id'] for event in reloaded.events} == ids
+
+class TestCalendars:
+    """Test cases for per-calendar partitioning, recipients and quotas"""
+    
+    @pytest.fixture
+    def app_client(self, tmp_path):
+        app = create_app(events_file=str(tmp_path / 'events.json'), run_reminders=False)
+        with app.test_client() as client:
+            yield app, client
+    
+    def post(self, client, data, calendar=None, **kwargs):
+        headers = {'X-Calendar': calendar} if calendar else {}
+        return client.post('/api/events', data=json.dumps(data), content_type='application/json',
+                           headers=headers, **kwargs)
+    
+    def test_calendars_are_isolated(self, app_client, tmp_path, sample_event_data):
+        """Test that each calendar sees only its own events, stored in its own shard"""
+        app, client = app_client
+        self.post(client, dict(sample_event_data, title='Ops standup'), calendar='ops')
+        client.post('/api/events?calendar=sales', data=json.dumps(dict(sample_event_data, title='Sales call')),
+                    content_type='application/json')
+        
+        ops = client.get('/api/events', headers={'X-Calendar': 'ops'}).get_json()['events']
+        sales = client.get('/api/events?calendar=sales').get_json()['events']
+        assert [e['title'] for e in ops] == ['Ops standup']
+        assert [e['title'] for e in sales] == ['Sales call']
+        assert client.get('/api/events').get_json()['events'] == []
+        assert client.get('/api/events/search?q=call', headers={'X-Calendar': 'ops'}).get_json()['events'] == []
+        assert (tmp_path / 'calendars' / 'ops' / 'events.json').exists()
+        assert not (tmp_path / 'events.json').exists()
+        
+        names = [c['name'] for c in client.get('/api/calendars').get_json()['calendars']]
+        assert names == ['default', 'ops', 'sales']
+    
+    def test_unknown_calendar_reads_leave_no_shard(self, app_client, tmp_path, sample_event_data):
+        """Test that reading an unknown calendar is a 404 that creates nothing, and adding events creates it"""
+        app, client = app_client
+        for path in ('/api/events', '/api/events/search?q=x', '/api/events/upcoming', '/api/calendars/ghost'):
+            assert client.get(path, headers={'X-Calendar': 'ghost'}).status_code == 404
+        assert client.delete('/api/events/missing', headers={'X-Calendar': 'ghost'}).status_code == 404
+        assert not (tmp_path / 'calendars').exists()
+        assert 'ghost' not in app.extensions['calendars'].schedulers
+        assert [c['name'] for c in client.get('/api/calendars').get_json()['calendars']] == ['default']
+        
+        assert self.post(client, sample_event_data, calendar='ghost').status_code == 201
+        assert len(client.get('/api/events', headers={'X-Calendar': 'ghost'}).get_json()['events']) == 1
+        client.put('/api/calendars/empty', data=json.dumps({'max_events': 5}), content_type='application/json')
+        assert client.get('/api/events', headers={'X-Calendar': 'empty'}).get_json()['events'] == []
+        names = [c['name'] for c in client.get('/api/calendars').get_json()['calendars']]
+        assert names == ['default', 'empty', 'ghost']
+    
+    def test_invalid_calendar_name(self, app_client):
+        """Test that calendar names cannot escape the calendars directory"""
+        app, client = app_client
+        response = client.get('/api/events', headers={'X-Calendar': '../etc'})
+        assert response.status_code == 400
+    
+    def test_max_events_quota(self, app_client, tmp_path, sample_event_data):
+        """Test that a calendar cannot grow past its max_events setting, which persists"""
+        app, client = app_client
+        response = client.put('/api/calendars/ops', data=json.dumps({'max_events': 1}),
+                              content_type='application/json')
+        assert response.get_json()['calendar']['max_events'] == 1
+        
+        assert self.post(client, sample_event_data, calendar='ops').status_code == 201
+        response = self.post(client, sample_event_data, calendar='ops')
+        assert response.status_code == 403
+        assert 'quota' in response.get_json()['error']
+        assert self.post(client, sample_event_data).status_code == 201  # other calendars are unaffected
+        
+        reopened = create_app(events_file=str(tmp_path / 'events.json'), run_reminders=False)
+        assert reopened.extensions['calendars'].settings('ops')['max_events'] == 1
+    
+    def test_max_events_count_is_kept_not_recounted(self, tmp_path, monkeypatch, sample_event_data):
+        """Test that calendars are unlimited by default and a quota counts the store once, then keeps the count"""
+        calendars = app_module.Calendars(str(tmp_path / 'events.json'), run_reminders=False,
+                                         storage_config={'backend': 'sqlite'})
+        assert calendars.settings('default')['max_events'] is None
+        calendars.configure('ops', {'max_events': 2})
+        scheduler = calendars.get('ops')
+        counts = []
+        store_len = type(scheduler.store).__len__
+        monkeypatch.setattr(type(scheduler.store), '__len__', lambda store: counts.append(1) or store_len(store))
+        
+        first = scheduler.add_event(**sample_event_data)
+        scheduler.add_events([sample_event_data])
+        with pytest.raises(app_module.QuotaError):
+            scheduler.add_event(**sample_event_data)
+        scheduler.delete_event(first['id'])
+        scheduler.add_event(**sample_event_data)
+        assert len(counts) == 1
+    
+    def test_invalid_settings(self, app_client):
+        """Test that unknown fields and bad quota values are rejected"""
+        app, client = app_client
+        for body in ({'color': 'red'}, {'max_events': 0}, {'recipients': 'ops@example.com'}, {}):
+            response = client.put('/api/calendars/ops', data=json.dumps(body), content_type='application/json')
+            assert response.status_code == 400
+    
+    def test_request_rate_quota(self, app_client):
+        """Test that a calendar over its request rate gets 429 while others are served"""
+        app, client = app_client
+        client.put('/api/calendars/busy', data=json.dumps({'requests_per_second': 1}),
+                   content_type='application/json')
+        
+        statuses = [client.get('/api/events', headers={'X-Calendar': 'busy'}).status_code for _ in range(5)]
+        assert statuses[0] == 200 and 429 in statuses
+        response = client.get('/api/events', headers={'X-Calendar': 'busy'})
+        assert response.status_code == 429 and int(response.headers['Retry-After']) >= 1
+        assert client.get('/api/events', headers={'X-Calendar': 'default'}).status_code == 200
+    
+    def test_concurrency_quota(self, tmp_path):
+        """Test that a calendar's request slots are limited and given back"""
+        calendars = app_module.Calendars(str(tmp_path / 'events.json'), run_reminders=False)
+        calendars.configure('ops', {'max_concurrent': 1, 'requests_per_second': None})
+        
+        slot, wait = calendars.admit('ops')
+        assert wait == 0
+        assert calendars.admit('ops') == (None, 1)
+        assert calendars.admit('default')[1] == 0
+        slot.release()
+        assert calendars.admit('ops')[1] == 0
+    
+    @pytest.mark.parametrize('serve', ['wsgi', 'asgi'])
+    def test_waiting_requests_do_not_hold_slots(self, tmp_path, serve, sample_event_data):
+        """Test that long polls and streams waiting for changes leave the calendar's slots to other requests"""
+        test_app = create_app(events_file=str(tmp_path / 'events.json'), run_reminders=False)
+        test_app.extensions['calendars'].configure('default', {'max_concurrent': 2})
+        asgi = ASGIApp(test_app)
+        new_client = test_app.test_client if serve == 'wsgi' else lambda: ASGITestClient(asgi)
+        seq = new_client().get('/api/events/changes').get_json()['seq']
+        polls = [threading.Thread(target=new_client().get, args=(f'/api/events/changes?since={seq}&wait=2',))
+                 for _ in range(2)]
+        for poll in polls:
+            poll.start()
+        stream = new_client().get('/api/events/stream')
+        time.sleep(0.2)
+        
+        client = new_client()
+        assert client.get('/api/events').status_code == 200
+        response = client.post('/api/events', data=json.dumps(sample_event_data), content_type='application/json')
+        assert response.status_code == 201
+        stream.close()
+        for poll in polls:
+            poll.join()
+    
+    def test_reminder_recipients(self, tmp_path, sample_event_data):
+        """Test that reminder emails go to the event's recipients, else the calendar's"""
+        outbox = []
+        delivery = EmailDelivery(dict(EMAIL_CONFIG, workers=1, pool_size=1, rate_per_minute=6000),
+                                 transport_factory=lambda: LocalTransport(outbox))
+        calendars = app_module.Calendars(str(tmp_path / 'events.json'), run_reminders=False, email=delivery)
+        calendars.configure('ops', {'recipients': ['team@example.com']})
+        scheduler = calendars.get('ops')
+        
+        own = scheduler.add_event(**sample_event_data, recipients=['lead@example.com'])
+        scheduler.send_email_notification(own)
+        scheduler.send_email_notification(scheduler.add_event(**sample_event_data))
+        
+        deadline = time.time() + 5
+        while len(outbox) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert sorted(recipients for _, recipients, _ in outbox) == [['lead@example.com'], ['team@example.com']]
+        assert scheduler.get_event_by_id(own['id'])['recipients'] == ['lead@example.com']
+
+class TestResponseCache:
+    """Test cases for the serialized response cache"""
+    
+    @pytest.fixture
+    def app_client(self, tmp_path):
+        app = create_app(events_file=str(tmp_path / 'events.json'), run_reminders=False)
+        with app.test_client() as client:
+            yield app, client
+    
+    def counts(self, app, endpoint):
+        return app.extensions['response_cache'].metrics()['endpoints'].get(endpoint, {'hit': 0, 'miss': 0})
+    
+    def test_writes_invalidate_cached_list(self, app_client, sample_event_data):
+        """Test that repeated reads hit and every kind of write makes the next read miss"""
+        app, client = app_client
+        post = lambda: client.post('/api/events', data=json.dumps(sample_event_data), content_type='application/json')
+        event_id = post().get_json()['event']['id']
+        
+        first = client.get('/api/events').get_json()
+        assert client.get('/api/events').get_json() == first
+        assert self.counts(app, 'events') == {'hit': 1, 'miss': 1}
+        
+        client.put(f'/api/events/{event_id}', data=json.dumps({'title': 'Renamed'}), content_type='application/json')
+        assert [e['title'] for e in client.get('/api/events').get_json()['events']] == ['Renamed']
+        post()
+        assert len(client.get('/api/events').get_json()['events']) == 2
+        client.delete(f'/api/events/{event_id}')
+        assert len(client.get('/api/events').get_json()['events']) == 1
+        assert self.counts(app, 'events') == {'hit': 1, 'miss': 4}
+    
+    def test_params_are_part_of_the_key(self, app_client, sample_event_data):
+        """Test that different pages and projections are cached separately, and search ignores case"""
+        app, client = app_client
+        for i in range(3):
+            client.post('/api/events', data=json.dumps(dict(sample_event_data, title=f'Meeting {i}')),
+                        content_type='application/json')
+        
+        assert len(client.get('/api/events?limit=1').get_json()['events']) == 1
+        assert len(client.get('/api/events?limit=2').get_json()['events']) == 2
+        assert list(client.get('/api/events?fields=id').get_json()['events'][0]) == ['id']
+        assert self.counts(app, 'events')['hit'] == 0
+        
+        client.get('/api/events/search?q=Meeting')
+        assert len(client.get('/api/events/search?q=meeting').get_json()['events']) == 3
+        assert self.counts(app, 'search') == {'hit': 1, 'miss': 1}
+    
+    def test_other_calendars_stay_cached(self, app_client, sample_event_data):
+        """Test that a write to one calendar leaves other calendars' entries valid"""
+        app, client = app_client
+        client.get('/api/events')
+        client.post('/api/events', data=json.dumps(sample_event_data), content_type='application/json',
+                    headers={'X-Calendar': 'ops'})
+        client.get('/api/events')
+        assert self.counts(app, 'events') == {'hit': 1, 'miss': 1}
+    
+    def test_upcoming_expires_at_next_minute(self, app_client, sample_event_data):
+        """Test that time-relative results are cached only until the minute turns"""
+        app, client = app_client
+        client.post('/api/events', data=json.dumps(sample_event_data), content_type='application/json')
+        client.get('/api/events/upcoming?hours=2')
+        client.get('/api/events/upcoming?hours=2')
+        assert self.counts(app, 'upcoming') == {'hit': 1, 'miss': 1}
+        
+        (key, (_, expires, _)), = [item for item in app.extensions['response_cache'].entries.items()
+                                   if item[0][0] == 'upcoming']
+        assert expires % 60 == 0 and 0 < expires - time.time() <= 60
+    
+    def test_lru_eviction_and_expiry(self):
+        """Test that the cache stays within its bounds, evicting the least recently used entry"""
+        cache = app_module.ResponseCache(max_entries=2, max_bytes=10)
+        cache.put(('a',), 1, b'1234')
+        cache.put(('b',), 1, b'1234')
+        assert cache.get(('a',), 1) == b'1234'
+        cache.put(('c',), 1, b'1234')
+        assert cache.get(('b',), 1) is None and cache.get(('a',), 1) == b'1234'
+        cache.put(('d',), 1, b'123456')
+        assert list(cache.entries) == [('a',), ('d',)] and cache.bytes == 10  # c went to stay within 10 bytes
+        assert cache.get(('d',), 2) is None  # built from an older version
+        cache.put(('e',), 1, b'1', expires=time.time() - 1)
+        assert cache.get(('e',), 1) is None
+        cache.put(('f',), 1, b'12345678901')
+        assert ('f',) not in cache.entries
+        assert cache.metrics() == {'entries': 1, 'bytes': 4, 'evictions': 2,
+                                   'endpoints': {'a': {'hit': 2, 'miss': 0}, 'b': {'hit': 0, 'miss': 1},
+                                                 'd': {'hit': 0, 'miss': 1}, 'e': {'hit': 0, 'miss': 1}}}
+    
+    def test_cache_metrics_exposed(self, app_client):
+        """Test that hit and miss counts appear in the JSON and Prometheus metrics"""
+        app, client = app_client
+        client.get('/api/events')
+        client.get('/api/events')
+        
+        data = client.get('/api/cache/metrics').get_json()
+        assert data['metrics']['endpoints']['events'] == {'hit': 1, 'miss': 1}
+        text = client.get('/api/metrics').get_data(as_text=True)
+        assert 'response_cache_requests_total{endpoint="events",result="hit"} 1' in text
+
+class TestASGI:
+    """Test cases specific to the ASGI entry point"""
+    
+    @pytest.fixture
+    def app_client(self, tmp_path):
+        app = create_app(events_file=str(tmp_path / 'events.json'), run_reminders=False)
+        yield app, ASGITestClient(ASGIApp(app))
+    
+    def test_lifespan_runs_reminders_as_task(self, tmp_path, sample_event_data):
+        """Test that after lifespan startup reminders fire from an asyncio task, which shutdown cancels"""
+        app = create_app(events_file=str(tmp_path / 'events.json'), run_reminders=True)
+        asgi = ASGIApp(app)
+        scheduler = app.extensions['scheduler']
+        fired = []
+        
+        async def main():
+            loop = asyncio.get_running_loop()
+            inbox, outbox = asyncio.Queue(), asyncio.Queue()
+            lifespan = asyncio.ensure_future(asgi({'type': 'lifespan'}, inbox.get, outbox.put))
+            await inbox.put({'type': 'lifespan.startup'})
+            assert (await outbox.get())['type'] == 'lifespan.startup.complete'
+            
+            scheduler.send_reminder = lambda event, start_ts, fire_ts: fired.append(event['id'])
+            await loop.run_in_executor(None, scheduler.load)
+            start = datetime.now() + timedelta(minutes=1)
+            event = await loop.run_in_executor(None, lambda: scheduler.add_event(
+                **dict(sample_event_data, start_time=start.isoformat()), reminders=[59.9 / 60]))
+            for _ in range(500):
+                if fired:
+                    break
+                await asyncio.sleep(0.01)
+            
+            assert fired == [event['id']]
+            assert scheduler.reminders.loop is loop and scheduler.reminder_task is not None
+            await inbox.put({'type': 'lifespan.shutdown'})
+            assert (await outbox.get())['type'] == 'lifespan.shutdown.complete'
+            await lifespan
+            await asyncio.sleep(0)
+            assert scheduler.reminder_task.cancelled()
+        
+        asyncio.run(main())
+    
+    def test_stream_goes_through_request_hooks(self, app_client, sample_event_data):
+        """Test that the natively served stream gets CORS, metrics and calendar quotas like any request"""
+        app, client = app_client
+        before = app_module.REQUESTS.values.get(('GET', '/api/events/stream', '200'), 0)
+        response = client.get('/api/events/stream', headers={'Origin': 'http://example.com'})
+        assert response.mimetype == 'text/event-stream'
+        assert 'Access-Control-Allow-Origin' in response.headers
+        assert next(iter(response.response)).startswith(b'retry:')
+        response.close()
+        assert app_module.REQUESTS.values[('GET', '/api/events/stream', '200')] == before + 1
+        
+        app.extensions['calendars'].configure('busy', {'requests_per_second': 1})
+        client.get('/api/events/stream', headers={'X-Calendar': 'busy'}).close()
+        assert client.get('/api/events/stream', headers={'X-Calendar': 'busy'}).status_code == 429
+        assert client.get('/api/events/stream?since=abc').status_code == 400
+    
+    def test_long_poll_waits_on_the_loop(self, app_client, sample_event_data):
+        """Test that a long poll returns as soon as a change is recorded"""
+        app, client = app_client
+        seq = client.get('/api/events/changes').get_json()['seq']
+        threading.Timer(0.2, app.extensions['scheduler'].add_event, kwargs=sample_event_data).start()
+        
+        started = time.time()
+        data = client.get(f'/api/events/changes?since={seq}&wait=10').get_json()
+        assert time.time() - started < 5
+        assert [change['seq'] for change in data['changes']] == [seq + 1]
+        
+        started = time.time()
+        data = client.get(f'/api/events/changes?since={seq + 1}&wait=0.2').get_json()
+        assert data['changes'] == [] and 0.2 <= time.time() - started < 5
+        assert client.get(f'/api/events/changes?since={seq}&wait=99').status_code == 400
+
+class TestBulkEndpoints:
+    """Test cases for bulk create, update, delete and export"""
+    
+    @pytest.fixture
+    def bulk_client(self, tmp_path, monkeypatch, client):
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        monkeypatch.setattr(app_module, 'scheduler', scheduler)
+        return client
+    
+    def post_bulk(self, client, items, method='post'):
+        return getattr(client, method)('/api/events/bulk', data=json.dumps(items), content_type='application/json')
+    
+    def test_batches_merge_into_indexes(self, tmp_path):
+        """Test that batches of every size land in the time and interval indexes where a rebuild puts them"""
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'))
+        rng = random.Random(3)
+        
+        def items(count):
+            starts = [datetime(2030, 1, 1) + timedelta(minutes=rng.randrange(10 ** 5)) for _ in range(count)]
+            return [{'title': 'Batch', 'description': '', 'start_time': start.isoformat(),
+                     'end_time': (start + timedelta(minutes=rng.choice([15, 90, 600]))).isoformat()}
+                    for start in starts]
+        
+        for count in (1000, 40, 5, 200):  # sorted in, merged, insorted, sorted in
+            scheduler.add_events(items(count))
+        store = scheduler.store
+        keys, buckets = list(store.time_index.keys), {b: list(e) for b, e in store.interval_index.buckets.items()}
+        store._rebuild_index()
+        assert keys == store.time_index.keys and len(keys) == 1245
+        assert buckets == store.interval_index.buckets
+    
+    def test_bulk_create_reports_errors_and_persists_once(self, bulk_client, monkeypatch, sample_event_data):
+        """Test that valid items are created in one write and invalid ones reported by index"""
+        saves = []
+        store = app_module.scheduler.store
+        original = store.save_events
+        monkeypatch.setattr(store, 'save_events', lambda: saves.append(1) or original())
+        items = [sample_event_data, dict(sample_event_data, start_time='not a date'),
+                 dict(sample_event_data, title='Second')]
+        
+        response = self.post_bulk(bulk_client, items)
+        data = json.loads(response.data)
+        
+        assert response.status_code == 201
+        assert data['success'] is False
+        assert [item['index'] for item in data['created']] == [0, 2]
+        assert data['errors'] == [{'index': 1, 'error': 'Invalid datetime format'}]
+        assert len(saves) == 1
+        assert len(json.loads(open(store.events_file).read())) == 2
+    
+    def test_bulk_create_ndjson(self, bulk_client, sample_event_data):
+        """Test that an NDJSON stream is parsed line by line"""
+        body = '\n'.join([json.dumps(sample_event_data), '{"title":', '', json.dumps(sample_event_data)]) + '\n'
+        response = bulk_client.post('/api/events/bulk', data=body, content_type='application/x-ndjson')
+        data = json.loads(response.data)
+        
+        assert [item['index'] for item in data['created']] == [0, 2]
+        assert data['errors'] == [{'index': 1, 'error': 'Invalid JSON'}]
+        assert len(app_module.scheduler.get_all_events()) == 2
+    
+    def test_bulk_create_rejects_bad_body(self, bulk_client):
+        """Test that a body that is neither an array nor NDJSON is rejected"""
+        assert self.post_bulk(bulk_client, {'title': 'x'}).status_code == 400
+        assert self.post_bulk(bulk_client, []).status_code == 400
+    
+    def test_bulk_update_and_delete(self, bulk_client, sample_event_data):
+        """Test that bulk updates and deletes apply per item and report missing events"""
+        created = json.loads(self.post_bulk(bulk_client, [sample_event_data] * 3).data)['created']
+        ids = [item['id'] for item in created]
+        
+        response = self.post_bulk(bulk_client, [{'id': ids[0], 'title': 'Renamed'}, {'id': 'missing', 'title': 'x'},
+                                                {'id': ids[1], 'end_time': 'bad'}], method='put')
+        data = json.loads(response.data)
+        assert response.status_code == 200
+        assert data['updated'] == [{'index': 0, 'id': ids[0]}]
+        assert data['errors'] == [{'index': 1, 'error': 'Event not found'},
+                                  {'index': 2, 'error': 'Invalid end_time format'}]
+        assert app_module.scheduler.get_event_by_id(ids[0])['title'] == 'Renamed'
+        
+        response = self.post_bulk(bulk_client, [ids[0], {'id': ids[1]}, 'missing'], method='delete')
+        data = json.loads(response.data)
+        assert [item['id'] for item in data['deleted']] == ids[:2]
+        assert data['errors'] == [{'index': 2, 'error': 'Event not found'}]
+        assert [event['id'] for event in app_module.scheduler.get_all_events()] == ids[2:]
+    
+    def test_export_round_trips(self, bulk_client, sample_event_data):
+        """Test that both export formats stream every event and can be re-imported"""
+        self.post_bulk(bulk_client, [sample_event_data, dict(sample_event_data, title='Other')])
+        
+        response = bulk_client.get('/api/events/export')
+        assert response.mimetype == 'application/x-ndjson'
+        assert 'attachment' in response.headers['Content-Disposition']
+        lines = response.data.decode().splitlines()
+        assert sorted(json.loads(line)['title'] for line in lines) == ['Other', 'Test Meeting']
+        
+        exported = json.loads(bulk_client.get('/api/events/export?format=json').data)
+        assert [event['id'] for event in exported] == [json.loads(line)['id'] for line in lines]
+        assert len(json.loads(self.post_bulk(bulk_client, exported).data)['created']) == 2
+        assert bulk_client.get('/api/events/export?format=xml').status_code == 400
+    
+    def test_export_empty_is_valid_json(self, bulk_client):
+        """Test that exporting no events as JSON yields an empty array"""
+        assert json.loads(bulk_client.get('/api/events/export?format=json').data) == []
+    
+    def test_sqlite_batch_is_one_transaction(self, tmp_path, sample_event_data):
+        """Test that a failing SQLite batch rolls back every write in it"""
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'), storage_config={'backend': 'sqlite'})
+        scheduler.add_events([dict(sample_event_data, recurring=None)] * 2)
+        assert len(scheduler.store) == 2
+        
+        with pytest.raises(RuntimeError):
+            with scheduler.store.batch():
+                scheduler.store.delete(scheduler.events[0]['id'])
+                raise RuntimeError('abort')
+        assert len(scheduler.store) == 2
+
+class TestICalendar:
+    """Test cases for the iCalendar feed and import"""
+    
+    FOREIGN = (b'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Other//EN\r\n'
+               b'BEGIN:VTIMEZONE\r\nTZID:Europe/Berlin\r\nEND:VTIMEZONE\r\n'
+               b'BEGIN:VEVENT\r\nUID:planning@example.com\r\nDTSTART;TZID=Europe/Berlin:20300701T100000\r\n'
+               b'DURATION:PT1H30M\r\nSUMMARY:Quarterly planning\\, with\r\n  a folded line\r\n'
+               b'BEGIN:VALARM\r\nACTION:DISPLAY\r\nTRIGGER:-PT15M\r\nEND:VALARM\r\nEND:VEVENT\r\n'
+               b'BEGIN:VEVENT\r\nUID:holiday@example.com\r\nDTSTART;VALUE=DATE:20301225\r\n'
+               b'SUMMARY:Old name\r\nEND:VEVENT\r\n'
+               b'BEGIN:VEVENT\r\nUID:holiday@example.com\r\nDTSTART;VALUE=DATE:20301225\r\n'
+               b'SUMMARY:Holiday\r\nRRULE:FREQ=YEARLY\r\nEND:VEVENT\r\n'
+               b'BEGIN:VEVENT\r\nUID:broken@example.com\r\nDTSTART:tomorrow\r\nEND:VEVENT\r\n'
+               b'END:VCALENDAR\r\n')
+    
+    def post(self, client, body, calendar=None):
+        headers = {'X-Calendar': calendar} if calendar else {}
+        return client.post('/api/calendar/import', data=body, content_type='text/calendar', headers=headers)
+    
+    def test_feed_keeps_series_whole_and_supports_conditional_get(self, client, sample_event_data):
+        """Test that a series is one VEVENT with its RRULE and that an unchanged feed is 304"""
+        client.post('/api/events', content_type='application/json', data=json.dumps(dict(
+            sample_event_data, start_time='2030-01-01T09:00:00', end_time='2030-01-01T09:30:00',
+            recurring='weekly', exceptions=['2030-01-08T09:00:00'], recurrence_end='2030-03-01T00:00:00',
+            reminders=[10], description='Agenda; notes, and\nmore ' * 5)))
+        
+        response = client.get('/api/calendar.ics')
+        text = response.data.decode()
+        assert response.status_code == 200 and response.mimetype == 'text/calendar'
+        assert text.count('BEGIN:VEVENT') == 1
+        assert 'RRULE:FREQ=WEEKLY;UNTIL=20300301T000000\r\n' in text
+        assert 'EXDATE:20300108T090000\r\n' in text and 'TRIGGER:-PT10M\r\n' in text
+        stamp = next(line for line in text.split('\r\n') if line.startswith('DTSTAMP:'))
+        assert datetime.strptime(stamp, 'DTSTAMP:%Y%m%dT%H%M%SZ')
+        assert all(len(line.encode()) <= 75 for line in text.split('\r\n'))
+        
+        etag = response.headers['ETag']
+        assert client.get('/api/calendar.ics', headers={'If-None-Match': etag}).status_code == 304
+        client.post('/api/events', data=json.dumps(sample_event_data), content_type='application/json')
+        response = client.get('/api/calendar.ics', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and response.data.decode().count('BEGIN:VEVENT') == 2
+    
+    def test_round_trip_is_idempotent(self, client, monkeypatch, sample_event_data):
+        """Test that importing our own feed recreates the events and importing it again changes nothing"""
+        client.post('/api/events', content_type='application/json', data=json.dumps(dict(
+            sample_event_data, start_time='2030-01-01T09:00:00', end_time='2030-01-01T09:30:00',
+            recurring='FREQ=DAILY;INTERVAL=2', exceptions=['2030-01-05T09:00:00'], reminders=[60, 5],
+            recipients=['team@example.com'], description='Line one\nLine two, with; punctuation')))
+        feed = client.get('/api/calendar.ics').data
+        monkeypatch.setattr(EventScheduler, 'add_event', None)  # imports go through one batch instead
+        
+        first = self.post(client, feed, calendar='copy').get_json()
+        assert len(first['created']) == 1 and first['errors'] == []
+        seq = client.get('/api/events', headers={'X-Calendar': 'copy'}).get_json()['seq']
+        again = self.post(client, feed, calendar='copy').get_json()
+        assert again['created'] == [] and again['updated'] == [] and again['unchanged'] == first['created']
+        
+        copy = client.get('/api/events', headers={'X-Calendar': 'copy'}).get_json()
+        original = client.get('/api/events').get_json()['events'][0]
+        assert copy['seq'] == seq
+        fields = ('id', 'title', 'description', 'start_time', 'end_time', 'recurring', 'exceptions',
+                  'reminders', 'recipients')
+        assert {field: copy['events'][0][field] for field in fields} == {field: original[field] for field in fields}
+    
+    def test_import_foreign_calendar(self, client):
+        """Test timezones, durations, all-day events, folding, duplicate UIDs and per-event errors"""
+        response = self.post(client, self.FOREIGN)
+        data = response.get_json()
+        assert response.status_code == 200 and len(data['created']) == 2
+        assert [error['uid'] for error in data['errors']] == ['broken@example.com']
+        
+        events = {e['title']: e for e in client.get('/api/events').get_json()['events']}
+        planning, holiday = events['Quarterly planning, with a folded line'], events['Holiday']
+        assert (planning['start_time'], planning['end_time']) == ('2030-07-01T10:00:00+02:00', '2030-07-01T11:30:00+02:00')
+        assert planning['reminders'] == [15]
+        assert (holiday['start_time'], holiday['end_time']) == ('2030-12-25T00:00:00', '2030-12-26T00:00:00')
+        assert holiday['recurring'] == 'yearly'
+        
+        assert self.post(client, b'BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n').status_code == 400
+
+class TestStats:
+    """Test cases for the /api/stats endpoints and the projection behind them"""
+    
+    def add(self, client, start, end, **fields):
+        body = dict({'title': 'Busy', 'description': 'Booked', 'start_time': start, 'end_time': end}, **fields)
+        return client.post('/api/events', data=json.dumps(body), content_type='application/json').get_json()['event']
+    
+    def stats(self, client, name, start, end, **params):
+        query = dict({'start': start, 'end': end, 'timezone': 'UTC'}, **params)
+        return client.get(f'/api/stats/{name}', query_string=query)
+    
+    def test_sorted_column_ranks_match_brute_force(self):
+        """Test counts and sums below points as values are added and removed across block splits"""
+        rng = random.Random(7)
+        values = [rng.randrange(10 ** 6) for _ in range(3000)]
+        column = SortedColumn(values[:1000])
+        for value in values[1000:]:
+            column.add(value)
+        for value in values[:1500]:
+            column.remove(value)
+        kept = values[1500:]
+        points = sorted(rng.randrange(-10, 10 ** 6 + 10) for _ in range(200))
+        assert len(column) == len(kept)
+        assert column.ranks(points) == [(sum(1 for v in kept if v < p), sum(v for v in kept if v < p)) for p in points]
+    
+    def test_projection_ranks(self):
+        """Test counts and sums of starts and ends below points, and that removing an event takes both out"""
+        projection = StatsProjection([('a', 10, 20), ('b', 15, 40), ('c', 30, 35)])
+        assert len(projection) == 3
+        assert projection.ranks([0, 15000, 32000, 50000]) == [
+            (0, 0, 0, 0), (1, 10000, 0, 0), (3, 55000, 1, 20000), (3, 55000, 3, 95000)]
+        projection.remove('b')
+        projection.remove('missing')
+        assert projection.ranks([50000]) == [(2, 40000, 2, 55000)]
+    
+    def test_projection_follows_writes(self, scheduler, sample_event_data):
+        """Test that the projection is kept in step with adds, updates, deletes and recurrence changes"""
+        day = datetime(2030, 1, 1).timestamp()
+        boundaries = [day, day + 86400, day + 2 * 86400]
+        event = scheduler.add_event(**dict(sample_event_data, recurring=None, start_time='2030-01-01T09:00:00',
+                                           end_time='2030-01-01T10:00:00'))
+        assert scheduler.span_stats(boundaries) == [(1, 3600.0), (0, 0.0)]
+        assert scheduler.stats()['stats_projection'] == 1
+        
+        scheduler.update_event(event['id'], start_time='2030-01-02T09:00:00', end_time='2030-01-02T11:00:00')
+        assert scheduler.span_stats(boundaries) == [(0, 0.0), (1, 7200.0)]
+        scheduler.update_event(event['id'], recurring='daily')
+        assert scheduler.span_stats(boundaries) == [(0, 0.0), (1, 7200.0)]
+        assert scheduler.stats()['stats_projection'] == 0
+        scheduler.update_event(event['id'], start_time='2030-01-01T23:00:00', end_time='2030-01-02T01:00:00')
+        assert scheduler.span_stats(boundaries) == [(1, 3600.0), (1, 7200.0)]
+        scheduler.delete_event(event['id'])
+        assert scheduler.span_stats(boundaries) == [(0, 0.0), (0, 0.0)]
+    
+    def test_counts_and_booked_time_per_period(self, client):
+        """Test days, weeks and months, with events clipped to their periods and to the window"""
+        self.add(client, '2030-01-01T09:00:00+00:00', '2030-01-01T10:00:00+00:00')
+        self.add(client, '2030-01-01T23:00:00+00:00', '2030-01-02T01:00:00+00:00')
+        self.add(client, '2030-01-03T12:00:00+00:00', '2030-01-03T12:30:00+00:00')
+        self.add(client, '2030-02-10T12:00:00+00:00', '2030-02-10T13:00:00+00:00')
+        
+        data = self.stats(client, 'events', '2030-01-01T00:00:00Z', '2030-01-04T00:00:00Z').get_json()
+        assert data['total'] == 3 and data['period'] == 'day'
+        assert [(b['start'], b['events']) for b in data['buckets']] == [
+            ('2030-01-01T00:00:00+00:00', 2), ('2030-01-02T00:00:00+00:00', 0), ('2030-01-03T00:00:00+00:00', 1)]
+        data = self.stats(client, 'booked', '2030-01-01T00:00:00Z', '2030-01-04T00:00:00Z').get_json()
+        assert [b['booked_seconds'] for b in data['buckets']] == [7200, 3600, 1800]
+        assert data['total_booked_seconds'] == 12600
+        
+        data = self.stats(client, 'booked', '2030-01-01T09:30:00Z', '2030-01-01T23:30:00Z').get_json()
+        assert data['total_booked_seconds'] == 3600
+        data = self.stats(client, 'events', '2030-01-01T00:00:00Z', '2030-03-01T00:00:00Z', period='month').get_json()
+        assert [(b['start'], b['events']) for b in data['buckets']] == [
+            ('2030-01-01T00:00:00+00:00', 3), ('2030-02-01T00:00:00+00:00', 1)]
+        data = self.stats(client, 'events', '2030-01-02T00:00:00Z', '2030-01-10T00:00:00Z', period='week').get_json()
+        assert [(b['start'], b['events']) for b in data['buckets']] == [
+            ('2029-12-31T00:00:00+00:00', 1), ('2030-01-07T00:00:00+00:00', 0)]
+    
+    def test_utilization_and_busiest_hours_include_occurrences(self, client):
+        """Test that occurrences of a series count, and that hours rank by events then booked time"""
+        self.add(client, '2030-01-01T09:00:00+00:00', '2030-01-01T09:30:00+00:00', recurring='daily')
+        self.add(client, '2030-01-02T14:00:00+00:00', '2030-01-02T16:00:00+00:00')
+        
+        data = self.stats(client, 'utilization', '2030-01-01T00:00:00Z', '2030-01-03T00:00:00Z').get_json()
+        assert [(b['booked_seconds'], b['utilization']) for b in data['buckets']] == [
+            (1800, round(1800 / 86400, 4)), (9000, round(9000 / 86400, 4))]
+        assert data['utilization'] == round(10800 / 172800, 4)
+        
+        hours = self.stats(client, 'busiest-hours', '2030-01-01T00:00:00Z', '2030-01-03T00:00:00Z').get_json()['hours']
+        assert len(hours) == 24
+        assert [(h['hour'], h['events'], h['booked_seconds']) for h in hours[:4]] == [
+            (9, 2, 3600), (14, 1, 3600), (15, 0, 3600), (0, 0, 0)]
+    
+    def test_days_follow_the_requested_timezone(self, client):
+        """Test that days are local days, including the 23-hour day of a DST change"""
+        self.add(client, '2030-03-10T01:30:00-05:00', '2030-03-10T03:30:00-04:00')
+        data = self.stats(client, 'utilization', '2030-03-10T00:00:00', '2030-03-12T00:00:00',
+                          timezone='America/New_York').get_json()
+        assert [b['start'] for b in data['buckets']] == ['2030-03-10T00:00:00-05:00', '2030-03-11T00:00:00-04:00']
+        assert data['buckets'][0]['booked_seconds'] == 3600
+        assert data['buckets'][0]['utilization'] == round(3600 / (23 * 3600), 4)
+        
+        hours = self.stats(client, 'busiest-hours', '2030-03-10T00:00:00', '2030-03-11T00:00:00',
+                           timezone='America/New_York').get_json()['hours']
+        assert hours[0]['hour'] == 1 and hours[0]['booked_seconds'] == 1800
+        assert {h['hour']: h['booked_seconds'] for h in hours}[3] == 1800
+    
+    def test_stats_are_cached_until_a_write(self, client):
+        """Test that a repeated query is served from the response cache and a write invalidates it"""
+        window = ('2030-01-01T00:00:00Z', '2030-01-02T00:00:00Z')
+        assert self.stats(client, 'events', *window).get_json()['total'] == 0
+        assert self.stats(client, 'events', *window).get_json()['total'] == 0
+        self.add(client, '2030-01-01T09:00:00+00:00', '2030-01-01T10:00:00+00:00')
+        assert self.stats(client, 'events', *window).get_json()['total'] == 1
+        metrics = client.get('/api/cache/metrics').get_json()
+        assert metrics['metrics']['endpoints']['stats-events'] == {'hit': 1, 'miss': 2}
+    
+    def test_invalid_requests(self, client):
+        """Test that a missing window, a bad period or timezone, or too many periods is a 400"""
+        assert client.get('/api/stats/events').status_code == 400
+        assert self.stats(client, 'booked', '2030-01-01', '2030-01-02', period='year').status_code == 400
+        assert self.stats(client, 'events', '2030-01-02', '2030-01-01').status_code == 400
+        assert self.stats(client, 'busiest-hours', '2030-01-01', '2030-01-02', timezone='Mars/Olympus').status_code == 400
+        assert self.stats(client, 'utilization', '2000-01-01', '2400-01-01').status_code == 400
+    
+    def test_shared_mode_sync_updates_projection(self, tmp_path, sample_event_data):
+        """Test that another process's writes reach the projection on sync"""
+        config = {'backend': 'sqlite', 'shared': True, 'sync_interval': None}
+        first, second = (EventScheduler(events_file=str(tmp_path / 'events.json'), storage_config=config,
+                                        run_reminders=False) for _ in range(2))
+        day = datetime(2030, 1, 1).timestamp()
+        assert second.span_stats([day, day + 86400]) == [(0, 0.0)]
+        event = first.add_event(**dict(sample_event_data, recurring=None, start_time='2030-01-01T09:00:00',
+                                       end_time='2030-01-01T10:00:00'))
+        second.sync()
+        assert second.span_stats([day, day + 86400]) == [(1, 3600.0)]
+        first.delete_event(event['id'])
+        second.sync()
+        assert second.span_stats([day, day + 86400]) == [(0, 0.0)]
+
 class TestAPIEndpoints:
     """Test cases for API endpoints"""
     
+    def test_get_event_occurrences(self, client, sample_event_data):
+        """Test expanding recurring events over a window via API"""
+        client.post('/api/events',
+                   data=json.dumps(dict(sample_event_data, title='Weekly sync', recurring='weekly',
+                                        start_time='2031-03-03T10:00:00', end_time='2031-03-03T11:00:00')),
+                   content_type='application/json')
+        
+        response = client.get('/api/events/occurrences?start=2031-03-01T00:00:00&end=2031-03-31T23:59:59')
+        data = json.loads(response.data)
+        
+        assert response.status_code == 200
+        weekly = [e['start_time'] for e in data['events'] if e['title'] == 'Weekly sync']
+        assert weekly[:5] == ['2031-03-03T10:00:00', '2031-03-10T10:00:00', '2031-03-17T10:00:00',
+                              '2031-03-24T10:00:00', '2031-03-31T10:00:00']
+        
+        response = client.get('/api/events/occurrences?start=2031-03-01')
+        assert response.status_code == 400
+    
+    def test_create_event_invalid_recurrence(self, client, sample_event_data):
+        """Test rejecting unparseable recurrence rules"""
+        response = client.post('/api/events',
+                             data=json.dumps(dict(sample_event_data, recurring='every other tuesday')),
+                             content_type='application/json')
+        
+        assert response.status_code == 400
+        assert 'Invalid recurring rule' in json.loads(response.data)['error']
+    
+    def test_email_metrics(self, client):
+        """Test the email delivery metrics endpoint"""
+        response = client.get('/api/email/metrics')
+        data = json.loads(response.data)
+        
+        assert response.status_code == 200
+        assert {'queue_depth', 'sent', 'failed', 'retried', 'dropped'} <= set(data['metrics'])
+    
     def test_health_check(self, client):
         """Test health check endpoint"""
         response = client.get('/api/health')
@@ -183,6 +2214,115 @@ class TestAPIEndpoints:
         assert 'events' in data
         assert len(data['events']) >= 1
     
+    def test_get_events_paginated(self, client, sample_event_data):
+        """Test walking all events page by page with a cursor"""
+        for _ in range(5):
+            client.post('/api/events',
+                       data=json.dumps(sample_event_data),
+                       content_type='application/json')
+        total = len(json.loads(client.get('/api/events').data)['events'])
+        
+        seen = []
+        url = '/api/events?limit=2&fields=id,start_time'
+        while url:
+            data = json.loads(client.get(url).data)
+            assert data['success'] is True
+            assert len(data['events']) <= 2
+            assert all(set(event) == {'id', 'start_time'} for event in data['events'])
+            seen.extend(data['events'])
+            url = f"/api/events?limit=2&fields=id,start_time&cursor={data['next_cursor']}" if data['next_cursor'] else None
+        
+        assert len(seen) == total
+        assert len({event['id'] for event in seen}) == total
+    
+    def test_get_events_ndjson(self, client, sample_event_data):
+        """Test streaming events as newline-delimited JSON"""
+        client.post('/api/events',
+                   data=json.dumps(sample_event_data),
+                   content_type='application/json')
+        
+        response = client.get('/api/events?format=ndjson&fields=title&limit=1')
+        lines = response.data.decode().splitlines()
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert len(lines) == 1
+        assert list(json.loads(lines[0])) == ['title']
+    
+    def test_get_events_invalid_parameters(self, client):
+        """Test rejecting bad cursors, limits and fields"""
+        for query in ('cursor=not-a-cursor', 'limit=0', 'fields=id,password'):
+            response = client.get(f'/api/events?{query}')
+            assert response.status_code == 400
+            assert json.loads(response.data)['success'] is False
+    
+    def test_get_events_etag(self, client, sample_event_data):
+        """Test that unchanged event lists return 304 Not Modified"""
+        response = client.get('/api/events')
+        etag = response.headers['ETag']
+        
+        response = client.get('/api/events', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        
+        client.post('/api/events',
+                   data=json.dumps(sample_event_data),
+                   content_type='application/json')
+        response = client.get('/api/events', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+    
+    def test_get_events_etag_varies_with_params_and_calendar(self, client, sample_event_data):
+        """Test that a list's ETag does not match other projections, pages or calendars"""
+        client.post('/api/events', data=json.dumps(sample_event_data), content_type='application/json')
+        client.post('/api/events', data=json.dumps(sample_event_data), content_type='application/json',
+                    headers={'X-Calendar': 'ops'})
+        response = client.get('/api/events')
+        etag = response.headers['ETag']
+        assert response.headers['Vary'] == 'X-Calendar'
+        
+        for query, headers in (('?fields=id', {}), ('?limit=1', {}), ('?format=ndjson', {}), ('', {'X-Calendar': 'ops'})):
+            response = client.get(f'/api/events{query}', headers=dict(headers, **{'If-None-Match': etag}))
+            assert response.status_code == 200 and response.data
+            assert response.headers['ETag'] != etag
+        assert client.get('/api/events?fields=password', headers={'If-None-Match': etag}).status_code == 400
+    
+    def test_get_event_changes(self, client, sample_event_data):
+        """Test fetching deltas since a sequence number"""
+        seq = json.loads(client.get('/api/events/changes').data)['seq']
+        create_response = client.post('/api/events',
+                                    data=json.dumps(sample_event_data),
+                                    content_type='application/json')
+        event_id = json.loads(create_response.data)['event']['id']
+        client.delete(f'/api/events/{event_id}')
+        
+        data = json.loads(client.get(f'/api/events/changes?since={seq}').data)
+        
+        assert data['reset'] is False
+        assert [c['op'] for c in data['changes']] == ['put', 'delete']
+        assert data['changes'][0]['event']['id'] == event_id
+        assert data['seq'] == seq + 2
+        
+        data = json.loads(client.get(f'/api/events/changes?since={seq + 100}').data)
+        assert data['reset'] is True
+    
+    def test_stream_event_changes(self, client, sample_event_data):
+        """Test that the SSE stream pushes recorded changes"""
+        seq = json.loads(client.get('/api/events/changes').data)['seq']
+        client.post('/api/events',
+                   data=json.dumps(sample_event_data),
+                   content_type='application/json')
+        
+        response = client.get(f'/api/events/stream?since={seq}')
+        assert response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b'retry:')
+        message = next(chunks).decode()
+        response.close()
+        
+        assert message.startswith(f'id: {seq + 1}\nevent: change\n')
+        data = json.loads(message.split('data: ', 1)[1])
+        assert data['event']['title'] == sample_event_data['title']
+    
     def test_get_event_by_id(self, client, sample_event_data):
         """Test getting specific event via API"""
         # Create an event
@@ -218,6 +2358,28 @@ class TestAPIEndpoints:
         assert data['success'] is True
         assert data['event']['title'] == 'Updated Title'
     
+    def test_partial_update_keeps_start_before_end(self, client, sample_event_data):
+        """Test that moving one bound past the stored other one is rejected, alone or in bulk"""
+        event = client.post('/api/events', data=json.dumps(dict(
+            sample_event_data, start_time='2030-01-01T09:00:00', end_time='2030-01-01T10:00:00')),
+            content_type='application/json').get_json()['event']
+        
+        for change in ({'start_time': '2030-01-01T11:00:00'}, {'end_time': '2030-01-01T09:00:00'},
+                       {'start_time': '2030-01-01T10:30:00+00:00', 'timezone': 'Asia/Tokyo'}):
+            response = client.put(f"/api/events/{event['id']}", data=json.dumps(change),
+                                  content_type='application/json')
+            assert response.status_code == 400
+            assert 'before end' in response.get_json()['error']
+        bulk = [{'id': event['id'], 'end_time': '2030-01-01T08:00:00'}]
+        response = client.put('/api/events/bulk', data=json.dumps(bulk), content_type='application/json')
+        assert response.get_json()['errors'][0]['index'] == 0
+        
+        stored = client.get(f"/api/events/{event['id']}").get_json()['event']
+        assert (stored['start_time'], stored['end_time']) == ('2030-01-01T09:00:00', '2030-01-01T10:00:00')
+        response = client.put(f"/api/events/{event['id']}", data=json.dumps({'end_time': '2030-01-01T12:00:00'}),
+                              content_type='application/json')
+        assert response.status_code == 200
+    
     def test_delete_event(self, client, sample_event_data):
         """Test deleting an event via API"""
         # Create an event
@@ -249,6 +2411,22 @@ class TestAPIEndpoints:
         assert data['success'] is True
         assert len(data['events']) >= 1
     
+    def test_search_events_limit(self, client, sample_event_data):
+        """Test limiting search results via API"""
+        for _ in range(3):
+            client.post('/api/events',
+                       data=json.dumps(sample_event_data),
+                       content_type='application/json')
+        
+        response = client.get('/api/events/search?q=Test Meeting&limit=2')
+        data = json.loads(response.data)
+        
+        assert response.status_code == 200
+        assert len(data['events']) == 2
+        
+        response = client.get('/api/events/search?q=Test&limit=abc')
+        assert response.status_code == 400
+    
     def test_search_events_no_query(self, client):
         """Test searching events without query parameter"""
         response = client.get('/api/events/search')
@@ -273,5 +2451,87 @@ class TestAPIEndpoints:
         assert data['success'] is True
         assert 'events' in data
 
+class TestObservability:
+    """Test cases for metrics, structured logging and request profiling"""
+    
+    @pytest.fixture
+    def app_client(self, tmp_path):
+        app = create_app(events_file=str(tmp_path / 'events.json'), run_reminders=False)
+        with app.test_client() as client:
+            yield app, client
+    
+    def test_metrics_endpoint(self, app_client, sample_event_data):
+        """Test that route latency, store sizes and email outcomes are exposed"""
+        app, client = app_client
+        client.post('/api/events', data=json.dumps(sample_event_data), content_type='application/json')
+        client.get('/api/events')
+        
+        response = client.get('/api/metrics')
+        text = response.get_data(as_text=True)
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        assert '# TYPE http_request_duration_seconds histogram' in text
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/events"}' in text
+        assert 'http_requests_total{method="POST",route="/api/events",status="201"}' in text
+        assert 'events{calendar="default"} 1' in text
+        assert 'index_entries{calendar="default",index="id"} 1' in text
+        assert 'email_messages_total{outcome="sent"}' in text
+        assert 'store_snapshot_write_seconds_count{format="json"}' in text
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that rendered buckets count every observation at or below their bound"""
+        histogram = app_module.Histogram('test_seconds', 'Test', buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value)
+        lines = histogram.render()
+        
+        assert 'test_seconds_bucket{le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{le="1"} 3' in lines
+        assert 'test_seconds_bucket{le="+Inf"} 4' in lines
+        assert 'test_seconds_count 4' in lines
+    
+    def test_reminder_lag_observed(self, tmp_path, sample_event_data):
+        """Test that a fired reminder records its lag"""
+        before = app_module.REMINDER_LAG.values.get((), [None, 0.0, 0])[2]
+        fired = []
+        scheduler = EventScheduler(events_file=str(tmp_path / 'events.json'), run_reminders=True)
+        scheduler.send_reminder = lambda event, start_ts, fire_ts: fired.append(event['id'])
+        start = datetime.now() + timedelta(minutes=1)
+        scheduler.add_event(**dict(sample_event_data, start_time=start.isoformat()), reminders=[59.99 / 60])
+        
+        deadline = time.time() + 5
+        while not fired and time.time() < deadline:
+            time.sleep(0.01)
+        
+        assert fired
+        assert app_module.REMINDER_LAG.values[()][2] == before + 1
+    
+    def test_profiling_hook(self, app_client):
+        """Test that a profile is returned only when profiling is enabled"""
+        app, client = app_client
+        response = client.get('/api/health', headers={'X-Profile': '1'})
+        assert response.is_json
+        
+        app.config['PROFILING'] = True
+        response = client.get('/api/health', headers={'X-Profile': '1'})
+        text = response.get_data(as_text=True)
+        
+        assert response.mimetype == 'text/plain'
+        assert response.headers['X-Profiled-Status'] == '200'
+        assert 'function calls' in text
+        assert client.get('/api/health').is_json
+    
+    def test_json_log_format(self):
+        """Test that extra fields are carried into JSON log lines"""
+        record = logging.LogRecord('event_scheduler', logging.INFO, __file__, 1, 'Reminder: %s', ('Standup',), None)
+        record.event_id = 'abc'
+        entry = json.loads(StructuredFormatter(json_lines=True).format(record))
+        
+        assert entry['level'] == 'INFO'
+        assert entry['message'] == 'Reminder: Standup'
+        assert entry['event_id'] == 'abc'
+        assert 'event_id=abc' in StructuredFormatter().format(record)
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v']) 
\ No newline at end of file